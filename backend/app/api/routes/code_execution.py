@@ -3,13 +3,26 @@ Code Execution API Routes
 Handles safe code execution in isolated environment
 """
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import Optional
-import subprocess
-import tempfile
+from typing import Dict, List, Optional
+import difflib
 import os
+import platform
+import shutil
+import signal
+import sys
+import time
 from loguru import logger
+from app.core.config import settings
+from app.services.execution_cache import execution_cache, is_deterministic, make_execution_key
+from app.services.execution_limiter import execution_limiter, interactive_limiter, QueueFull
+from app.services.preflight import code_preflight
+from app.services.python_pool import python_pool, PythonWorker, WorkerCrashed, WORKER_GRACE
+from app.services.runners import runner_registry, Runner
+from app.services.sandbox import run_process, sandbox_env, scratch_dir, SandboxLimits
+from app.services.sandbox_worker import normalize_output, one_shot_command
 
 router = APIRouter()
 
@@ -19,6 +32,7 @@ class CodeExecutionRequest(BaseModel):
     code: str
     language: str = "python"
     stdin: Optional[str] = None
+    cache: bool = True  # False always runs the code, e.g. when output depends on randomness
 
 
 class CodeExecutionResponse(BaseModel):
@@ -26,6 +40,54 @@ class CodeExecutionResponse(BaseModel):
     output: str
     error: Optional[str] = None
     execution_time: float
+    cpu_time: Optional[float] = None  # CPU seconds used by the program
+    peak_memory_kb: Optional[int] = None  # Peak resident memory of the program
+    queue_depth: int = 0  # Runs waiting ahead of this one when it was submitted
+    queue_wait: float = 0.0  # Seconds spent waiting for an execution slot
+    cached: bool = False  # Result of an earlier identical run (see EXECUTION_CACHE_ENABLED)
+    compile_time: Optional[float] = None  # Compiled languages: seconds spent building (or fetching the cached build)
+    compile_cached: bool = False  # The build came from the compile cache
+    run_time: Optional[float] = None  # Seconds the program itself ran
+    preflight: bool = False  # Rejected by static checks without running (see preflight.py)
+
+
+class TestCase(BaseModel):
+    """One input and the output it should produce"""
+    stdin: Optional[str] = None
+    expected_output: str
+
+
+class RunTestsRequest(BaseModel):
+    """Request model for running code against test cases"""
+    code: str
+    language: str = "python"
+    cases: List[TestCase]
+    stop_on_failure: bool = False
+
+
+class TestCaseResult(BaseModel):
+    """Outcome of one test case"""
+    index: int
+    passed: bool
+    output: str
+    expected_output: str
+    diff: Optional[str] = None  # Unified diff of expected vs actual output when they differ
+    error: Optional[str] = None
+    execution_time: float
+    cpu_time: Optional[float] = None
+    peak_memory_kb: Optional[int] = None
+
+
+class RunTestsResponse(BaseModel):
+    """Response model for a test run"""
+    passed: int
+    failed: int
+    skipped: int  # Not run because an earlier case failed with stop_on_failure
+    results: List[TestCaseResult]
+    execution_time: float
+    queue_depth: int = 0
+    queue_wait: float = 0.0
+    preflight: bool = False  # Rejected by static checks without running
 
 
 @router.post("/execute", response_model=CodeExecutionResponse)
@@ -40,23 +102,64 @@ async def execute_code(request: CodeExecutionRequest):
         Execution result with output and errors
     """
     try:
-        if request.language.lower() != "python":
+        language = request.language.lower()
+        runner = None
+        if language not in allowed_languages():
             raise HTTPException(
                 status_code=400,
-                detail=f"Language '{request.language}' not supported yet. Only Python is currently supported."
+                detail=f"Language '{request.language}' is not supported. Supported: {', '.join(allowed_languages())}"
             )
+        if language != "python":
+            runner = runner_registry.get(language)
+            if runner is None or not runner.available():
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Language '{request.language}' is not available on this server"
+                )
 
         # Validate code length
-        if len(request.code) > 10000:
+        if len(request.code) > settings.MAX_CODE_LENGTH:
             raise HTTPException(
                 status_code=400,
-                detail="Code is too long (max 10000 characters)"
+                detail=f"Code is too long (max {settings.MAX_CODE_LENGTH} characters)"
             )
 
-        # Execute Python code
-        result = await execute_python_code(request.code, request.stdin)
+        if runner:
+            async with execution_limiter.slot() as admission:
+                result = await execute_with_runner(runner, request.code, request.stdin)
+            result.queue_depth = admission.queue_depth
+            result.queue_wait = admission.wait_time
+            return result
+
+        # Syntax errors, forbidden imports and endless loops need no process
+        rejection = preflight_check(request.code)
+        if rejection:
+            return rejection
+
+        # Identical deterministic runs are answered without taking a slot
+        cache_key = execution_cache_key(request)
+        if cache_key:
+            cached = execution_cache.get(cache_key)
+            if cached:
+                result = build_response(cached, cached["wall_time"], SandboxLimits.from_settings())
+                result.cached = True
+                return result
+
+        # Execute Python code once a slot is free
+        async with execution_limiter.slot() as admission:
+            result = await execute_python_code(request.code, request.stdin, cache_key)
+
+        result.queue_depth = admission.queue_depth
+        result.queue_wait = admission.wait_time
         return result
 
+    except QueueFull as e:
+        logger.warning(f"Code execution rejected: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many code executions in progress, please try again shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -64,73 +167,482 @@ async def execute_code(request: CodeExecutionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def execute_python_code(code: str, stdin: Optional[str] = None) -> CodeExecutionResponse:
+@router.post("/run-tests", response_model=RunTestsResponse)
+async def run_tests(request: RunTestsRequest):
     """
-    Execute Python code safely
+    Run code against a list of test cases in one sandboxed worker
 
     Args:
-        code: Python code to execute
-        stdin: Optional standard input
+        request: Code, test cases and whether to stop at the first failure
 
     Returns:
-        Execution response with output and timing
+        Per-case pass/fail with output diffs and timing
     """
-    import time
+    try:
+        if request.language.lower() != "python":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Language '{request.language}' not supported yet. Only Python is currently supported."
+            )
 
-    start_time = time.time()
+        if len(request.code) > settings.MAX_CODE_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Code is too long (max {settings.MAX_CODE_LENGTH} characters)"
+            )
 
-    try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
+        if not request.cases or len(request.cases) > settings.MAX_TEST_CASES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Provide between 1 and {settings.MAX_TEST_CASES} test cases"
+            )
 
-        try:
-            # Execute with timeout and capture output
-            result = subprocess.run(
-                ['python3', temp_file],
-                input=stdin,
-                capture_output=True,
-                text=True,
-                timeout=5,  # 5 second timeout
-                env={**os.environ, 'PYTHONIOENCODING': 'utf-8'}
+        rejection = preflight_check(request.code)
+        if rejection:
+            # Every case would fail the same way
+            return RunTestsResponse(
+                passed=0,
+                failed=len(request.cases),
+                skipped=0,
+                results=[
+                    TestCaseResult(
+                        index=index,
+                        passed=False,
+                        output="",
+                        expected_output=case.expected_output,
+                        error=rejection.error,
+                        execution_time=0.0
+                    )
+                    for index, case in enumerate(request.cases)
+                ],
+                execution_time=rejection.execution_time,
+                preflight=True
             )
 
-            execution_time = time.time() - start_time
+        # The whole batch takes one execution slot
+        async with execution_limiter.slot() as admission:
+            result = await run_python_tests(request.code, request.cases, request.stop_on_failure)
 
-            # Combine stdout and stderr
-            output = result.stdout
-            error = result.stderr if result.returncode != 0 else None
+        result.queue_depth = admission.queue_depth
+        result.queue_wait = admission.wait_time
+        return result
 
-            if not output and not error:
-                output = "(No output)"
+    except QueueFull as e:
+        logger.warning(f"Test run rejected: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many code executions in progress, please try again shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        raise
+    except (WorkerCrashed, OSError) as e:
+        logger.error(f"Test run error: {e}")
+        raise HTTPException(status_code=500, detail=f"❌ Execution error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Test run error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-            logger.info(f"Code executed successfully in {execution_time:.2f}s")
 
-            return CodeExecutionResponse(
-                output=output,
-                error=error,
-                execution_time=execution_time
-            )
+@router.websocket("/stream")
+async def stream_code(websocket: WebSocket):
+    """
+    Run code interactively, streaming output as it is produced
 
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+    Client messages:
+        {"type": "run", "code": str, "language": "python", "stdin": str?}  (first)
+        {"type": "stdin", "data": str}  Input for the program, e.g. one line
+        {"type": "stdin_eof"}  Close the program's standard input
+        {"type": "cancel"}  Stop the program
 
-    except subprocess.TimeoutExpired:
-        execution_time = time.time() - start_time
-        logger.warning("Code execution timeout")
+    Server messages:
+        {"type": "started", "queue_depth": int, "queue_wait": float}
+        {"type": "stdout" | "stderr", "data": str}
+        {"type": "exit", "exit_code", "cancelled", "error", "execution_time", "cpu_time", "peak_memory_kb"}
+        {"type": "error", "message": str, "retry_after": int?}
+    """
+    await websocket.accept()
+    try:
+        message = await websocket.receive_json()
+    except (WebSocketDisconnect, ValueError):
+        return
+
+    code = message.get("code") or ""
+    language = str(message.get("language") or "python").lower()
+    if message.get("type") != "run":
+        problem = "Expected a run message"
+    elif language != "python":
+        problem = f"Language '{language}' not supported yet. Only Python is currently supported."
+    elif len(code) > settings.MAX_CODE_LENGTH:
+        problem = f"Code is too long (max {settings.MAX_CODE_LENGTH} characters)"
+    elif settings.SANDBOX_POOL_SIZE <= 0:
+        problem = "Interactive execution needs the worker pool (SANDBOX_POOL_SIZE > 0)"
+    else:
+        problem = None
+    if problem:
+        await websocket.send_json({"type": "error", "message": problem})
+        await websocket.close()
+        return
+
+    # The learner can cancel a streamed run, so endless loops are allowed here
+    rejection = preflight_check(code, endless_loops=False)
+    if rejection:
+        await websocket.send_json({
+            "type": "exit",
+            "exit_code": 1,
+            "cancelled": False,
+            "error": rejection.error,
+            "execution_time": rejection.execution_time,
+            "cpu_time": None,
+            "peak_memory_kb": None,
+            "preflight": True
+        })
+        await websocket.close()
+        return
+
+    limits = SandboxLimits.from_settings()._replace(timeout=settings.SANDBOX_INTERACTIVE_TIMEOUT)
+    client_gone = False
+
+    try:
+        async with interactive_limiter.slot() as admission:
+            start_time = time.time()
+            await websocket.send_json({
+                "type": "started",
+                "queue_depth": admission.queue_depth,
+                "queue_wait": admission.wait_time
+            })
+
+            async with python_pool.session(code, message.get("stdin"), limits.timeout, limits._asdict()) as session:
+
+                async def forward_input():
+                    """Relay stdin and cancel messages from the client to the run"""
+                    nonlocal client_gone
+                    try:
+                        while not session.finished:
+                            try:
+                                incoming = await websocket.receive_json()
+                            except ValueError:
+                                continue  # Not JSON; drop the frame, keep the run going
+                            kind = incoming.get("type") if isinstance(incoming, dict) else None
+                            if kind == "stdin":
+                                await session.send_stdin(str(incoming.get("data", "")))
+                            elif kind == "stdin_eof":
+                                await session.close_stdin()
+                            elif kind == "cancel":
+                                await session.cancel()
+                    except (WebSocketDisconnect, RuntimeError):
+                        client_gone = True
+                        await session.cancel()
+
+                forwarder = asyncio.create_task(forward_input())
+                try:
+                    async for event in session.events():
+                        if client_gone:
+                            continue
+                        try:
+                            await websocket.send_json(event)
+                        except (WebSocketDisconnect, RuntimeError):
+                            client_gone = True
+                            await session.cancel()
+                finally:
+                    forwarder.cancel()
+                    await asyncio.gather(forwarder, return_exceptions=True)
+
+        result = session.result
+        response = build_response(result, time.time() - start_time, limits)
+        if not client_gone:
+            await websocket.send_json({
+                "type": "exit",
+                "exit_code": result["exit_code"],
+                "cancelled": result.get("cancelled", False),
+                # Streamed stderr has already reached the client; only explain limits here
+                "error": response.error if response.error != result["stderr"] else None,
+                "execution_time": response.execution_time,
+                "cpu_time": response.cpu_time,
+                "peak_memory_kb": response.peak_memory_kb
+            })
+            await websocket.close()
+
+    except QueueFull as e:
+        logger.warning(f"Code execution rejected: {e}")
+        await websocket.send_json({
+            "type": "error",
+            "message": "Too many code executions in progress, please try again shortly",
+            "retry_after": e.retry_after
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Code stream client disconnected")
+    except (WorkerCrashed, OSError) as e:
+        logger.error(f"Python execution error: {e}")
+        if not client_gone:
+            await websocket.send_json({"type": "error", "message": f"❌ Execution error: {str(e)}"})
+            await websocket.close()
+
+
+@router.get("/stats")
+async def get_execution_stats():
+    """Worker pool and execution queue counters"""
+    return {
+        "pool": python_pool.status(),
+        "queue": execution_limiter.status(),
+        "interactive_queue": interactive_limiter.status(),
+        "cache": execution_cache.status(),
+        "runners": runner_registry.status(),
+        "preflight": code_preflight.status()
+    }
+
+
+def preflight_check(code: str, endless_loops: bool = True) -> Optional[CodeExecutionResponse]:
+    """Response for code the pre-flight checks reject, or None to run it"""
+    if not settings.PREFLIGHT_ENABLED:
+        return None
+    start_time = time.time()
+    problem = code_preflight.check(code, endless_loops=endless_loops)
+    if problem is None:
+        return None
+    logger.info(f"Code rejected by pre-flight: {problem.strip().splitlines()[-1]}")
+    return CodeExecutionResponse(
+        output="",
+        error=problem,
+        execution_time=time.time() - start_time,
+        preflight=True
+    )
+
+
+def allowed_languages() -> List[str]:
+    return [language.strip().lower() for language in settings.ALLOWED_LANGUAGES.split(",") if language.strip()]
+
+
+def python_interpreter() -> str:
+    """Identity of the interpreter that runs submissions, part of the cache key"""
+    if settings.SANDBOX_POOL_SIZE > 0:
+        return f"{sys.executable} {platform.python_version()}"
+    return os.path.realpath(shutil.which("python3") or "python3")
+
+
+def execution_cache_key(request: CodeExecutionRequest) -> Optional[str]:
+    """Cache key for a request, or None when its result must not be cached"""
+    if not settings.EXECUTION_CACHE_ENABLED or request.language.lower() != "python":
+        # The determinism heuristic only understands Python
+        return None
+    if not request.cache or not is_deterministic(request.code):
+        execution_cache.record_bypass()
+        return None
+    return make_execution_key(
+        request.code,
+        request.stdin,
+        request.language.lower(),
+        python_interpreter(),
+        SandboxLimits.from_settings()._asdict()
+    )
+
+
+async def execute_python_code(
+    code: str,
+    stdin: Optional[str] = None,
+    cache_key: Optional[str] = None
+) -> CodeExecutionResponse:
+    """
+    Execute Python code safely under the sandbox limits from settings
+    Runs on a warm worker from the pool, or in a fresh python3 process
+    when the pool is disabled (SANDBOX_POOL_SIZE=0)
+
+    Args:
+        code: Python code to execute
+        stdin: Optional standard input
+        cache_key: Store the result in the execution cache under this key
+
+    Returns:
+        Execution response with output, timing and resource usage
+    """
+    limits = SandboxLimits.from_settings()
+    start_time = time.time()
+
+    try:
+        if settings.SANDBOX_POOL_SIZE > 0:
+            result = await python_pool.run(code, stdin, timeout=limits.timeout, limits=limits._asdict())
+        else:
+            result = await execute_in_subprocess(code, stdin, limits)
+    except (WorkerCrashed, OSError) as e:
+        logger.error(f"Python execution error: {e}")
         return CodeExecutionResponse(
             output="",
-            error="⏱️ Execution timeout (5 seconds limit exceeded)",
-            execution_time=execution_time
+            error=f"❌ Execution error: {str(e)}",
+            execution_time=time.time() - start_time
         )
-    except Exception as e:
-        execution_time = time.time() - start_time
-        logger.error(f"Python execution error: {e}")
+
+    if cache_key:
+        execution_cache.put(cache_key, result)
+    return build_response(result, time.time() - start_time, limits)
+
+
+async def execute_with_runner(runner: Runner, code: str, stdin: Optional[str] = None) -> CodeExecutionResponse:
+    """
+    Execute code with a language runner under the sandbox limits from settings
+
+    Args:
+        runner: Runner for the submission's language
+        code: Source code to compile (if needed) and run
+        stdin: Optional standard input
+
+    Returns:
+        Execution response with compile and run time reported separately
+    """
+    limits = SandboxLimits.from_settings()
+    start_time = time.time()
+
+    try:
+        result = await runner.run(code, stdin, limits)
+    except OSError as e:
+        logger.error(f"{runner.language} execution error: {e}")
         return CodeExecutionResponse(
             output="",
             error=f"❌ Execution error: {str(e)}",
-            execution_time=execution_time
+            execution_time=time.time() - start_time
         )
+
+    return build_response(result, time.time() - start_time, limits)
+
+
+async def run_python_tests(code: str, cases: List[TestCase], stop_on_failure: bool) -> RunTestsResponse:
+    """
+    Run Python code once per test case inside a single worker
+    Uses the pool, or a one-off worker when the pool is disabled
+
+    Args:
+        code: Python code to test
+        cases: Inputs and expected outputs
+        stop_on_failure: Skip the remaining cases after the first failure
+
+    Returns:
+        Test run response with one result per executed case
+    """
+    limits = SandboxLimits.from_settings()
+    payload = [case.model_dump() for case in cases]
+    start_time = time.time()
+
+    if settings.SANDBOX_POOL_SIZE > 0:
+        runs = await python_pool.run_tests(code, payload, limits.timeout, limits._asdict(), stop_on_failure)
+    else:
+        worker = await PythonWorker.spawn()
+        try:
+            with scratch_dir() as workdir:
+                reply = await worker.request(
+                    {
+                        "code": code, "cases": payload, "timeout": limits.timeout,
+                        "limits": limits._asdict(), "stop_on_failure": stop_on_failure,
+                        "workdir": workdir
+                    },
+                    limits.timeout * len(cases) + WORKER_GRACE
+                )
+            runs = reply["cases"]
+        finally:
+            worker.terminate()
+            await worker.close()
+
+    results = []
+    for index, (case, run) in enumerate(zip(cases, runs)):
+        response = build_response(run, run["wall_time"], limits)
+        diff = None
+        if not run["passed"] and normalize_output(run["stdout"]) != normalize_output(case.expected_output):
+            diff = "\n".join(difflib.unified_diff(
+                normalize_output(case.expected_output).split("\n"),
+                normalize_output(run["stdout"]).split("\n"),
+                fromfile="expected", tofile="output", lineterm=""
+            ))
+        results.append(TestCaseResult(
+            index=index,
+            passed=run["passed"],
+            output=run["stdout"],
+            expected_output=case.expected_output,
+            diff=diff,
+            error=response.error,
+            execution_time=run["wall_time"],
+            cpu_time=response.cpu_time,
+            peak_memory_kb=response.peak_memory_kb
+        ))
+
+    passed = sum(1 for result in results if result.passed)
+    logger.info(f"Test run: {passed}/{len(cases)} cases passed")
+    return RunTestsResponse(
+        passed=passed,
+        failed=len(results) - passed,
+        skipped=len(cases) - len(results),
+        results=results,
+        execution_time=time.time() - start_time
+    )
+
+
+async def execute_in_subprocess(code: str, stdin: Optional[str], limits: SandboxLimits) -> Dict:
+    """
+    Execute Python code in a fresh python3 process
+
+    The program reaches the interpreter through an in-memory file (memfd) on
+    Linux, or inline on the command line elsewhere, so no source file is
+    written to disk and nothing is left behind if the server dies mid-run.
+    """
+    argv = one_shot_command('python3')
+    with scratch_dir() as workdir:
+        if not hasattr(os, 'memfd_create'):
+            return await run_process(argv + ['--code', code], limits, stdin=stdin, env=sandbox_env(workdir), cwd=workdir)
+
+        source = os.memfd_create('main.py')
+        try:
+            with open(source, 'wb', closefd=False) as f:
+                f.write(code.encode('utf-8'))
+            os.lseek(source, 0, os.SEEK_SET)
+            return await run_process(
+                argv + ['--fd', str(source)],
+                limits,
+                stdin=stdin,
+                env=sandbox_env(workdir),
+                cwd=workdir,
+                pass_fds=(source,)
+            )
+        finally:
+            os.close(source)
+
+
+def build_response(result: Dict, execution_time: float, limits: SandboxLimits) -> CodeExecutionResponse:
+    """Turn a sandbox result into the API response, explaining limit violations"""
+    output = result["stdout"]
+    error = result["stderr"] if result["exit_code"] != 0 else None
+
+    if result.get("compile_error"):
+        logger.info("Code compilation failed")
+        if result["timed_out"]:
+            error = f"🔨 Compilation timeout ({settings.SANDBOX_COMPILE_TIMEOUT} seconds limit exceeded)"
+        else:
+            error = f"🔨 Compilation failed:\n{result['stderr'] or result['stdout']}"
+        output = ""
+    elif result.get("cancelled"):
+        logger.info("Code execution cancelled")
+        error = "⏹️ Execution cancelled"
+    elif result["timed_out"]:
+        logger.warning("Code execution timeout")
+        error = f"⏱️ Execution timeout ({limits.timeout:g} seconds limit exceeded)"
+    elif result.get("output_truncated"):
+        logger.warning("Code execution output limit exceeded")
+        error = f"📄 Output limit exceeded ({limits.max_output_bytes} bytes), program stopped"
+    elif result["exit_code"] == -signal.SIGXCPU:
+        logger.warning("Code execution CPU limit exceeded")
+        error = f"⏱️ CPU time limit exceeded ({limits.cpu_seconds} seconds)"
+    elif result["exit_code"] == -signal.SIGKILL and not error:
+        error = "❌ Program was killed (memory or process limit exceeded?)"
+    else:
+        logger.info(f"Code executed successfully in {execution_time:.2f}s")
+
+    if not output and not error:
+        output = "(No output)"
+
+    return CodeExecutionResponse(
+        output=output,
+        error=error,
+        execution_time=execution_time,
+        cpu_time=result.get("cpu_time"),
+        peak_memory_kb=result.get("max_rss_kb"),
+        compile_time=result.get("compile_time"),
+        compile_cached=result.get("compile_cached", False),
+        run_time=None if result.get("compile_error") else result["wall_time"]
+    )
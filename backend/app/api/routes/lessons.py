@@ -3,17 +3,48 @@ Lessons API Routes
 Handles lesson retrieval and AI content generation
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Optional
+import asyncio
+import json
+from contextlib import aclosing
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional
 from pydantic import BaseModel
 from loguru import logger
 
 from app.services.xml_parser import xml_parser
 from app.services.ai_generator import ai_generator
+from app.services.lesson_content import lesson_content, CONTENT_KINDS
+from app.services.content_warmer import content_warmer
 
 
 router = APIRouter()
 
+# How often a pending generation checks whether the client has gone away
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+async def _cancel_on_disconnect(request: Request, awaitable: Awaitable[Any]) -> Any:
+    """
+    Await a generation, cancelling it if the client disconnects first
+
+    Raises:
+        HTTPException(499) when the client went away
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling generation for {request.url.path}")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
 
 # Pydantic Schemas
 class LessonResponse(BaseModel):
@@ -49,7 +80,8 @@ async def get_all_courses():
         List of courses with basic info
     """
     try:
-        courses = xml_parser.load_all_courses()
+        # Catalogue is loaded once at startup; this reads the current snapshot
+        courses = xml_parser.courses
 
         return [
             CourseListResponse(
@@ -115,11 +147,131 @@ async def get_course_modules(course_id: str):
         raise HTTPException(status_code=500, detail="Failed to fetch modules")
 
 
+@router.get("/topics", response_model=List[LessonResponse])
+async def find_topics(keyword: Optional[str] = None, difficulty: Optional[str] = None):
+    """
+    Find lessons by keyword and/or difficulty
+
+    Args:
+        keyword: Keyword to match (case-insensitive)
+        difficulty: beginner, intermediate, or advanced
+
+    Returns:
+        Matching lessons with their module and course ids
+    """
+    if keyword:
+        topics = xml_parser.get_topics_by_keyword(keyword)
+        if difficulty:
+            topics = [t for t in topics if t.difficulty.lower() == difficulty.strip().lower()]
+    elif difficulty:
+        topics = xml_parser.get_topics_by_difficulty(difficulty)
+    else:
+        topics = xml_parser.get_all_topics()
+
+    results = []
+    for topic in topics:
+        location = xml_parser.get_topic_location(topic.id)
+        results.append(LessonResponse(
+            id=topic.id,
+            title=topic.title,
+            keywords=topic.keywords,
+            difficulty=topic.difficulty,
+            module_id=location.module.id,
+            course_id=location.course.id
+        ))
+    return results
+
+
+@router.get("/stats")
+async def get_content_stats():
+    """
+    Get content cache and request coalescing counters
+
+    Returns:
+        Cache hit/miss counts and originated vs coalesced generation calls
+    """
+    return lesson_content.stats()
+
+
+@router.get("/metrics")
+async def get_model_metrics():
+    """
+    Get model call accounting
+
+    Returns:
+        Rate-limit capacity and queue, per-kind calls, retries, prompt/completion
+        tokens and latency, and the most recent calls
+    """
+    return ai_generator.call_metrics()
+
+
+@router.post("/warm", status_code=202)
+async def warm_content(
+    background_tasks: BackgroundTasks,
+    kinds: str = ",".join(CONTENT_KINDS),
+    concurrency: Optional[int] = None,
+    force: bool = False
+):
+    """
+    Pre-generate lesson content, quizzes and mini-games for every topic
+    Runs in the background; poll GET /warm for progress
+
+    Args:
+        kinds: Comma-separated content kinds (default: lesson,quiz,game)
+        concurrency: Maximum parallel generations (default: CONTENT_WARM_CONCURRENCY)
+        force: Regenerate entries that are already fresh
+
+    Returns:
+        Status message
+    """
+    if content_warmer.running:
+        raise HTTPException(status_code=409, detail="Content warming already running")
+
+    kind_list = [k.strip() for k in kinds.split(",") if k.strip()]
+    unknown = [k for k in kind_list if k not in CONTENT_KINDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown content kinds: {', '.join(unknown)}")
+
+    # Published now, so a second request sees this run before the task starts
+    topics, report = content_warmer.begin(kinds=kind_list)
+    options = {"topics": topics, "kinds": kind_list, "force": force, "report": report}
+    if concurrency:
+        options["concurrency"] = concurrency
+    background_tasks.add_task(content_warmer.warm_all, **options)
+
+    return {
+        "status": "accepted",
+        "kinds": kind_list,
+        "message": "Content warming started"
+    }
+
+
+@router.get("/warm")
+async def get_warm_status():
+    """
+    Get progress of the current or last content warming run
+
+    Returns:
+        Per-topic latency and failure report
+    """
+    if content_warmer.last_report is None:
+        return {"running": False, "message": "No warming run yet"}
+    return content_warmer.last_report.to_dict()
+
+
 @router.get("/{lesson_id}", response_model=LessonContentResponse)
-async def get_lesson(lesson_id: str, regenerate: bool = False):
+async def get_lesson(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    lesson_id: str,
+    regenerate: bool = False
+):
     """
     Get full lesson content with AI-generated materials
 
+    Stale cached content is returned immediately and regenerated after the
+    response is sent.
+
     Args:
         lesson_id: Lesson identifier
         regenerate: Force regenerate content (default: False, uses cache)
@@ -128,32 +280,28 @@ async def get_lesson(lesson_id: str, regenerate: bool = False):
         Complete lesson with AI-generated content
     """
     try:
-        # Get lesson metadata from XML
-        topic = xml_parser.get_topic_by_id(lesson_id)
+        # Get lesson metadata (with its module and course) from XML
+        location = xml_parser.get_topic_location(lesson_id)
 
-        if not topic:
+        if not location:
             raise HTTPException(status_code=404, detail="Lesson not found")
 
+        topic = location.topic
         logger.info(f"Fetching lesson: {topic.title}")
 
-        # TODO: Check cache first (Redis) unless regenerate=True
-        # For now, generate fresh content
-
-        # Generate AI content
-        content = ai_generator.generate_lesson_content(
-            title=topic.title,
-            keywords=topic.keywords,
-            difficulty=topic.difficulty
+        # Served from the content cache unless regenerate=True
+        content = await _cancel_on_disconnect(
+            request,
+            lesson_content.get_lesson_content(topic, regenerate=regenerate, schedule=background_tasks.add_task)
         )
 
-        # TODO: Find course_id and module_id (need to enhance XML parser)
         lesson_info = LessonResponse(
             id=topic.id,
             title=topic.title,
             keywords=topic.keywords,
             difficulty=topic.difficulty,
-            module_id="unknown",  # TODO: Get from parser
-            course_id="unknown"   # TODO: Get from parser
+            module_id=location.module.id,
+            course_id=location.course.id
         )
 
         return LessonContentResponse(
@@ -168,14 +316,84 @@ async def get_lesson(lesson_id: str, regenerate: bool = False):
         raise HTTPException(status_code=500, detail="Failed to generate lesson content")
 
 
+def _sse(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/{lesson_id}/stream")
+async def stream_lesson(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    lesson_id: str,
+    regenerate: bool = False
+):
+    """
+    Stream lesson content as server-sent events
+
+    Emits a "lesson_info" event, then one "section" event per lesson section
+    (explanation, analogy, code_example, ...) as soon as the model has finished
+    it, and finally a "done" event.
+
+    Args:
+        lesson_id: Lesson identifier
+        regenerate: Force regenerate content (default: False, uses cache)
+
+    Returns:
+        text/event-stream response
+    """
+    location = xml_parser.get_topic_location(lesson_id)
+
+    if not location:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+
+    topic = location.topic
+    logger.info(f"Streaming lesson: {topic.title}")
+
+    lesson_info = LessonResponse(
+        id=topic.id,
+        title=topic.title,
+        keywords=topic.keywords,
+        difficulty=topic.difficulty,
+        module_id=location.module.id,
+        course_id=location.course.id
+    )
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("lesson_info", lesson_info.model_dump())
+        items = lesson_content.stream_lesson_content(
+            topic, regenerate=regenerate, schedule=background_tasks.add_task
+        )
+        async with aclosing(items):
+            async for item in items:
+                if await request.is_disconnected():
+                    logger.info(f"Client disconnected, stopping lesson stream for {lesson_id}")
+                    return
+                event = item.pop("event")
+                yield _sse(event, item)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{lesson_id}/quiz")
-async def get_lesson_quiz(lesson_id: str, num_questions: int = 5):
+async def get_lesson_quiz(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    lesson_id: str,
+    num_questions: int = 5,
+    regenerate: bool = False
+):
     """
-    Get quiz for a lesson
+    Get quiz for a lesson (stale cached quizzes are served, then regenerated)
 
     Args:
         lesson_id: Lesson identifier
         num_questions: Number of questions (default: 5)
+        regenerate: Force regenerate quiz (default: False, uses cache)
 
     Returns:
         Quiz with multiple-choice questions
@@ -188,10 +406,11 @@ async def get_lesson_quiz(lesson_id: str, num_questions: int = 5):
 
         logger.info(f"Generating quiz for: {topic.title}")
 
-        quiz = ai_generator.generate_quiz(
-            title=topic.title,
-            keywords=topic.keywords,
-            num_questions=num_questions
+        quiz = await _cancel_on_disconnect(
+            request,
+            lesson_content.get_quiz(
+                topic, num_questions=num_questions, regenerate=regenerate, schedule=background_tasks.add_task
+            )
         )
 
         return {
@@ -208,12 +427,18 @@ async def get_lesson_quiz(lesson_id: str, num_questions: int = 5):
 
 
 @router.get("/{lesson_id}/game")
-async def get_lesson_game(lesson_id: str):
+async def get_lesson_game(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    lesson_id: str,
+    regenerate: bool = False
+):
     """
-    Get mini-game for practicing lesson concepts
+    Get mini-game for practicing lesson concepts (stale cached games are served, then regenerated)
 
     Args:
         lesson_id: Lesson identifier
+        regenerate: Force regenerate mini-game (default: False, uses cache)
 
     Returns:
         Mini-game description and starter code
@@ -226,9 +451,9 @@ async def get_lesson_game(lesson_id: str):
 
         logger.info(f"Generating mini-game for: {topic.title}")
 
-        game = ai_generator.generate_mini_game(
-            title=topic.title,
-            keywords=topic.keywords
+        game = await _cancel_on_disconnect(
+            request,
+            lesson_content.get_mini_game(topic, regenerate=regenerate, schedule=background_tasks.add_task)
         )
 
         return {
@@ -244,17 +469,90 @@ async def get_lesson_game(lesson_id: str):
         raise HTTPException(status_code=500, detail="Failed to generate mini-game")
 
 
+@router.get("/{lesson_id}/bundle")
+async def get_lesson_bundle(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    lesson_id: str,
+    num_questions: int = 5,
+    regenerate: bool = False
+):
+    """
+    Get lesson content, quiz and mini-game together
+
+    Whatever is not cached is generated in a single model call, and each piece
+    is cached for its own endpoint (/{lesson_id}, /quiz, /game) to serve.
+
+    Args:
+        lesson_id: Lesson identifier
+        num_questions: Number of quiz questions (default: 5)
+        regenerate: Force regenerate all three (default: False, uses cache)
+
+    Returns:
+        Lesson info, content, quiz and game, where each piece came from
+        (cache, bundle, single, stale or fallback), and for a bundle call the calls,
+        tokens and latency it took and saved compared with three separate calls
+    """
+    try:
+        location = xml_parser.get_topic_location(lesson_id)
+
+        if not location:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+
+        topic = location.topic
+        logger.info(f"Fetching lesson bundle: {topic.title}")
+
+        bundle = await _cancel_on_disconnect(
+            request,
+            lesson_content.get_bundle(
+                topic, num_questions=num_questions, regenerate=regenerate, schedule=background_tasks.add_task
+            )
+        )
+
+        lesson_info = LessonResponse(
+            id=topic.id,
+            title=topic.title,
+            keywords=topic.keywords,
+            difficulty=topic.difficulty,
+            module_id=location.module.id,
+            course_id=location.course.id
+        )
+
+        return {
+            "lesson_info": lesson_info,
+            "content": bundle["lesson"],
+            "quiz": bundle["quiz"],
+            "game": bundle["game"],
+            "sources": bundle["sources"],
+            "generation": bundle["generation"]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating lesson bundle: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate lesson bundle")
+
+
 @router.post("/reload")
-async def reload_topics():
+async def reload_topics(full: bool = False):
     """
     Reload all topics from XML files
     Useful for dynamic updates
 
+    Only files whose content changed are re-parsed (unless full=True). The new
+    catalogue is parsed in a worker thread and swapped in atomically; requests
+    keep reading the previous snapshot until then. Cached content for topics
+    whose title, keywords or difficulty changed is invalidated.
+
+    Args:
+        full: Re-parse every file (default: False, changed files only)
+
     Returns:
         Status message
     """
     try:
-        courses = xml_parser.reload_courses()
+        courses = await asyncio.to_thread(xml_parser.reload_courses, full)
         total_topics = len(xml_parser.get_all_topics())
 
         logger.success(f"Reloaded {len(courses)} courses with {total_topics} topics")
@@ -263,6 +561,8 @@ async def reload_topics():
             "status": "success",
             "courses_loaded": len(courses),
             "total_topics": total_topics,
+            "files": xml_parser.last_reload,
+            "duplicates": xml_parser.duplicates,
             "message": "Topics reloaded successfully"
         }
 
@@ -20,9 +20,22 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
-    # Google Gemini AI
-    GEMINI_API_KEY: str
+    # AI content generation (Google Gemini, or the offline stub)
+    LLM_BACKEND: str = "gemini"  # gemini, or stub for offline load testing
+    GEMINI_API_KEY: str = ""  # Required for the gemini backend
     GEMINI_MODEL: str = "gemini-2.5-flash"
+    GEMINI_MAX_CONCURRENCY: int = 8
+    GEMINI_TIMEOUT: int = 60
+    GEMINI_REQUESTS_PER_MINUTE: int = 60  # Token-bucket limits in front of the model; 0 = unlimited
+    GEMINI_TOKENS_PER_MINUTE: int = 250000
+    GEMINI_COMPLETION_TOKEN_ESTIMATE: int = 1500  # Charged up front, corrected from reported usage
+    GEMINI_MAX_RETRIES: int = 3  # On 429 and 5xx responses
+    GEMINI_RETRY_BASE_DELAY: float = 1.0  # Seconds, doubled per attempt and jittered
+    GEMINI_RETRY_MAX_DELAY: float = 30.0
+    LLM_STUB_LATENCY_MEDIAN: float = 1.5  # Seconds per stub call (log-normal)
+    LLM_STUB_LATENCY_SIGMA: float = 0.5
+    LLM_STUB_ERROR_RATES: str = ""  # e.g. "429:0.05,503:0.01,malformed:0.02"
+    LLM_STUB_SEED: int = 0
 
     # Database
     DATABASE_URL: str
@@ -30,12 +43,55 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
-    REDIS_CACHE_TTL: int = 3600
+    REDIS_CACHE_TTL: int = 3600  # How long cached AI content stays fresh (see CONTENT_CACHE_SOFT_TTL)
+
+    # Content Cache (AI-generated lessons, quizzes and games)
+    CONTENT_CACHE_BACKEND: str = "sqlite"  # sqlite, redis or memory
+    CONTENT_CACHE_PATH: str = "cache/content_cache.db"
+    CONTENT_CACHE_MEMORY_ITEMS: int = 256
+    CONTENT_CACHE_SOFT_TTL: int = 0  # 0 = REDIS_CACHE_TTL; older content is served stale while it regenerates
+    CONTENT_CACHE_HARD_TTL: int = 604800  # Content is dropped after this; requests then wait for generation
+    CONTENT_WARM_CONCURRENCY: int = 4
+
+    # Topic Catalogue
+    XML_LOADER: str = "iterparse"  # iterparse (streaming) or xmltodict
+    XML_PARALLEL_LOAD: bool = True  # Parse changed files across a process pool
+    XML_LOAD_WORKERS: int = 0  # 0 = one per CPU core
+    CATALOGUE_SNAPSHOT_PATH: str = "cache/catalogue.pickle"  # Signed with SECRET_KEY; empty = always parse XML
+    TOPICS_WATCH: bool = False  # Poll data/topics and reload changed files automatically
+    TOPICS_WATCH_INTERVAL: float = 2.0
 
     # Code Execution
     SANDBOX_TIMEOUT: int = 30
     MAX_CODE_LENGTH: int = 10000
     ALLOWED_LANGUAGES: str = "python,javascript,java,cpp"
+    SANDBOX_SCRATCH_DIR: str = ""  # Run directories; empty = /dev/shm (RAM) when available
+    SANDBOX_COMPILE_TIMEOUT: int = 30  # Compile step for java and cpp
+    SANDBOX_COMPILE_MEMORY_MB: int = 1024
+    COMPILE_CACHE_DIR: str = "cache/compiled"  # Build outputs keyed by source hash
+    COMPILE_CACHE_MAX_ENTRIES: int = 256
+    PREFLIGHT_ENABLED: bool = True  # Static checks on Python code before it is run
+    PREFLIGHT_FORBIDDEN_MODULES: str = "ctypes,importlib,multiprocessing,socket,subprocess"
+    PREFLIGHT_FORBIDDEN_BUILTINS: str = "__import__,breakpoint"
+    PREFLIGHT_REJECT_ENDLESS_LOOPS: bool = True
+    EXECUTION_CACHE_ENABLED: bool = False  # Reuse results of identical deterministic runs
+    EXECUTION_CACHE_MAX_ENTRIES: int = 1024
+    EXECUTION_CACHE_MAX_BYTES: int = 16777216  # Total cached stdout + stderr
+    MAX_TEST_CASES: int = 20  # Per /run-tests request
+    SANDBOX_INTERACTIVE_TIMEOUT: int = 300  # Wall clock for /stream runs, which wait on user input
+    SANDBOX_INTERACTIVE_MAX_SESSIONS: int = 2  # /stream runs at once, on workers added to the pool for them
+    SANDBOX_INTERACTIVE_MAX_QUEUE: int = 8  # /stream runs allowed to wait for a session
+    SANDBOX_POOL_SIZE: int = 4  # Warm Python workers; 0 = spawn python3 per run
+    SANDBOX_POOL_MAX_RUNS: int = 200  # Replace a worker after this many runs
+    SANDBOX_MAX_CONCURRENCY: int = 4  # Runs executing at once (keep <= pool size)
+    SANDBOX_MAX_QUEUE: int = 32  # Runs allowed to wait; beyond this /execute returns 429
+    SANDBOX_CPU_SECONDS: int = 0  # 0 = SANDBOX_TIMEOUT + 1
+    SANDBOX_MEMORY_MB: int = 256  # Address space per run
+    SANDBOX_MAX_PROCESSES: int = 64  # RLIMIT_NPROC, counted per OS user (run the server as a dedicated user)
+    SANDBOX_MAX_FILE_BYTES: int = 1048576  # Largest file a run may write
+    SANDBOX_MAX_OUTPUT_BYTES: int = 262144  # stdout + stderr; the run is killed beyond this
+    SANDBOX_NAMESPACES: bool = False  # Linux: no network/IPC via unprivileged user namespaces
+    SANDBOX_SECCOMP: bool = False  # Linux: syscall filter, needs the libseccomp Python bindings
 
     # Logging
     LOG_LEVEL: str = "INFO"
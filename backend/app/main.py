@@ -7,6 +7,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
+import asyncio
 import sys
 
 # Configure logger
@@ -43,7 +44,26 @@ async def startup_event():
     logger.info("📚 Initializing services...")
     # TODO: Initialize database connection
     # TODO: Initialize Redis connection
-    # TODO: Load XML topics
+
+    # Load the XML catalogue once; requests read the published snapshot
+    from app.core.config import settings
+    from app.services.xml_parser import xml_parser
+    courses = xml_parser.load_all_courses()
+    logger.info(f"📚 Loaded {len(courses)} courses with {len(xml_parser.get_all_topics())} topics")
+
+    if settings.TOPICS_WATCH:
+        app.state.topic_watcher = asyncio.create_task(xml_parser.watch(settings.TOPICS_WATCH_INTERVAL))
+
+    # Run directories orphaned by a previous crash
+    from app.services.sandbox import sweep_scratch
+    removed = sweep_scratch()
+    if removed:
+        logger.info(f"🧹 Removed {removed} stale sandbox run directories")
+
+    # Warm interpreters for /api/code/execute
+    if settings.SANDBOX_POOL_SIZE > 0:
+        from app.services.python_pool import python_pool
+        await python_pool.start()
     # TODO: Verify Gemini API connection
     logger.success("✅ All services initialized successfully")
 
@@ -51,6 +71,12 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 Shutting down AI Learn Programming Platform")
+    watcher = getattr(app.state, "topic_watcher", None)
+    if watcher:
+        watcher.cancel()
+
+    from app.services.python_pool import python_pool
+    await python_pool.close()
     # TODO: Close database connections
     # TODO: Close Redis connections
     logger.success("✅ Shutdown completed")
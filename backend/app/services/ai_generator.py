@@ -1,51 +1,212 @@
 """
 AI Content Generator Service
-Uses Google Gemini API to generate educational content
+Uses an LLM backend (Google Gemini by default) to generate educational content
 """
 
-import google.generativeai as genai
-from typing import Dict, Optional, List
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple, Type
 from loguru import logger
-from app.core.config import settings
+from pydantic import BaseModel, ValidationError
+from app.services.content_schemas import ContentBundle, LessonContent, MiniGame, Quiz
+from app.services.json_extract import IncrementalJSONObjectParser, json_object_candidates, JSONExtractionError
+from app.services.llm_backends import create_backend, LLMBackend
+from app.services.llm_scheduler import estimate_tokens, LLMScheduler
+
+
+# Bump whenever a prompt template changes so cached content is regenerated
+PROMPT_VERSION = "1"
+
+# Top-level keys of a lesson, in the order the prompt asks for them
+LESSON_SECTIONS = (
+    "explanation",
+    "analogy",
+    "why_it_matters",
+    "code_example",
+    "breakdown",
+    "common_mistakes",
+    "practice_challenge"
+)
+
+
+class GenerationError(Exception):
+    """Raised in strict mode when content could not be generated"""
+
+    def __init__(self, message: str, fallback: Dict):
+        super().__init__(message)
+        self.fallback = fallback
 
 
 class AIContentGenerator:
     """
-    Generates educational content using Google Gemini API
+    Generates educational content with an LLM backend (Google Gemini by default)
     Creates explanations, examples, analogies, quizzes, and practice exercises
+
+    The agenerate_* coroutines are the primary API; the generate_* methods are
+    synchronous wrappers for scripts. Every model call goes through the
+    scheduler for rate limiting, retries and accounting.
     """
 
-    def __init__(self):
-        """Initialize Gemini API"""
-        try:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
-            logger.success("✅ Gemini AI initialized successfully")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Gemini AI: {e}")
-            raise
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        """
+        Args:
+            backend: Model backend (default: the one named by settings.LLM_BACKEND)
+        """
+        self.backend = backend or create_backend()
+        self.scheduler = LLMScheduler()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        # Moving average of seconds per _generate_json call, by kind
+        self.latency: Dict[str, float] = {}
 
-    def generate_lesson_content(
+    async def _generate(self, prompt: str, kind: str = "text") -> Tuple[str, Dict[str, int]]:
+        """
+        Run one model call through the scheduler (rate limits, retries, metrics)
+
+        Returns:
+            (response text, {"prompt_tokens", "completion_tokens"} as reported by the backend)
+        """
+        return await self.scheduler.call(kind, prompt, lambda: self.backend.generate(prompt))
+
+    async def _stream_text(self, prompt: str) -> AsyncIterator[str]:
+        """Stream one model call through the scheduler, yielding text chunks as they arrive"""
+        async with self.scheduler.streaming("lesson_stream", prompt) as usage:
+            async with aclosing(self.backend.stream(prompt, usage)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    def _count(self, kind: str, field: str):
+        counters = self.stats.setdefault(
+            kind, {"calls": 0, "repaired": 0, "malformed": 0, "retries": 0, "retry_successes": 0, "failures": 0}
+        )
+        counters[field] += 1
+
+    def _parse(self, kind: str, response_text: str, schema: Type[BaseModel]) -> Dict:
+        """
+        Extract the JSON object from a response and validate it against the schema
+
+        Candidates are tried best first, so a truncated response falls back to
+        the longest repair that validates (e.g. a quiz without its half-written
+        last question). If none validates, the best candidate's error is raised.
+        """
+        first_error: Optional[ValidationError] = None
+        for data, repaired in json_object_candidates(response_text):
+            try:
+                content = schema.model_validate(data).model_dump()
+            except ValidationError as e:
+                first_error = first_error or e
+                continue
+            if repaired:
+                self._count(kind, "repaired")
+            return content
+        raise first_error
+
+    @staticmethod
+    def _describe_problem(error: Exception) -> str:
+        if isinstance(error, ValidationError):
+            return "; ".join(
+                f"{'.'.join(str(part) for part in problem['loc']) or 'response'}: {problem['msg']}"
+                for problem in error.errors()[:5]
+            )
+        return str(error)
+
+    def _add_usage(self, usage: Optional[Dict[str, int]], call_usage: Dict[str, int]):
+        if usage is not None:
+            usage["calls"] = usage.get("calls", 0) + 1
+            for field, tokens in call_usage.items():
+                usage[field] = usage.get(field, 0) + tokens
+
+    def _record_latency(self, kind: str, seconds: float):
+        previous = self.latency.get(kind)
+        self.latency[kind] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    async def _generate_json(
         self,
-        title: str,
-        keywords: List[str],
-        difficulty: str = "beginner"
+        kind: str,
+        prompt: str,
+        schema: Type[BaseModel],
+        usage: Optional[Dict[str, int]] = None
     ) -> Dict:
         """
-        Generate complete lesson content for a topic
+        Generate content as a JSON object matching schema
+
+        A response that cannot be parsed or does not match the schema gets one
+        retry that tells the model what was wrong with it.
 
         Args:
-            title: Lesson title
-            keywords: List of relevant keywords
-            difficulty: beginner, intermediate, or advanced
+            kind: Counter name (lesson, quiz, game, bundle)
+            prompt: Prompt asking for the object
+            schema: Model the object must validate against
+            usage: Optional dict that token counts of every call made are added to
 
-        Returns:
-            Dictionary containing lesson content
+        Raises:
+            JSONExtractionError, ValidationError: if the retry is unusable too
         """
+        self._count(kind, "calls")
+        start = time.monotonic()
+        response_text, call_usage = await self._generate(prompt, kind)
+        self._add_usage(usage, call_usage)
         try:
-            keywords_str = ", ".join(keywords)
+            content = self._parse(kind, response_text, schema)
+            self._record_latency(kind, time.monotonic() - start)
+            return content
+        except (JSONExtractionError, ValidationError) as e:
+            problem = self._describe_problem(e)
+            self._count(kind, "malformed")
+            logger.warning(f"⚠️ Malformed {kind} response ({problem}), retrying once")
+
+        content = await self._retry_json(kind, prompt, schema, problem, usage)
+        self._record_latency(kind, time.monotonic() - start)
+        return content
+
+    async def _retry_json(
+        self,
+        kind: str,
+        prompt: str,
+        schema: Type[BaseModel],
+        problem: str,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict:
+        """The one retry for an unusable response, telling the model what was wrong"""
+        self._count(kind, "retries")
+        retry_prompt = (
+            f"{prompt}\n\nYour previous answer could not be used: {problem}\n"
+            "Reply with only the complete JSON object described above: "
+            "no markdown fences, no commentary, every key present."
+        )
+        response_text, call_usage = await self._generate(retry_prompt, kind)
+        self._add_usage(usage, call_usage)
+        try:
+            content = self._parse(kind, response_text, schema)
+        except (JSONExtractionError, ValidationError):
+            self._count(kind, "failures")
+            raise
+        self._count(kind, "retry_successes")
+        return content
+
+    def generation_stats(self) -> Dict:
+        """Per-kind parse counters with malformed, retry and failure rates, and average latency"""
+        report = {}
+        for kind, counters in self.stats.items():
+            calls = counters["calls"] or 1
+            report[kind] = {
+                **counters,
+                "malformed_rate": counters["malformed"] / calls,
+                "retry_rate": counters["retries"] / calls,
+                "failure_rate": counters["failures"] / calls,
+                "avg_latency": self.latency.get(kind)
+            }
+        return report
 
-            prompt = f"""
+    def call_metrics(self) -> Dict:
+        """Rate-limit state, per-kind token and latency totals, and recent model calls"""
+        return self.scheduler.metrics()
+
+    def _build_lesson_prompt(self, title: str, keywords: List[str], difficulty: str) -> str:
+        """Prompt asking for a lesson as a single JSON object"""
+        keywords_str = ", ".join(keywords)
+
+        return f"""
 You are an expert programming teacher creating content for absolute beginners (even children can understand).
 
 Topic: {title}
@@ -100,41 +261,11 @@ Format your response as JSON with these keys:
 }}
 """
 
-            logger.info(f"Generating lesson content for: {title}")
-            response = self.model.generate_content(prompt)
-
-            # Parse response (assuming JSON format)
-            import json
-            content = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
-
-            logger.success(f"✅ Generated lesson content for: {title}")
-            return content
-
-        except Exception as e:
-            logger.error(f"❌ Error generating lesson content: {e}")
-            return self._get_fallback_content(title)
-
-    def generate_quiz(
-        self,
-        title: str,
-        keywords: List[str],
-        num_questions: int = 5
-    ) -> Dict:
-        """
-        Generate a quiz for a topic
-
-        Args:
-            title: Topic title
-            keywords: Relevant keywords
-            num_questions: Number of quiz questions
+    def _build_quiz_prompt(self, title: str, keywords: List[str], num_questions: int) -> str:
+        """Prompt asking for a quiz as a single JSON object"""
+        keywords_str = ", ".join(keywords)
 
-        Returns:
-            Dictionary containing quiz questions
-        """
-        try:
-            keywords_str = ", ".join(keywords)
-
-            prompt = f"""
+        return f"""
 Create a quiz for the topic: {title}
 Keywords: {keywords_str}
 
@@ -164,23 +295,240 @@ Format as JSON:
 }}
 """
 
-            logger.info(f"Generating quiz for: {title}")
-            response = self.model.generate_content(prompt)
+    def _build_game_prompt(self, title: str, keywords: List[str]) -> str:
+        """Prompt asking for a mini-game as a single JSON object"""
+        keywords_str = ", ".join(keywords)
+
+        return f"""
+Create a fun, simple mini-game that helps practice: {title}
+Keywords: {keywords_str}
+
+The game should:
+- Be playable in the terminal/browser
+- Reinforce the concept through interaction
+- Be fun and engaging
+- Include score/progress tracking
+
+Format as JSON:
+{{
+  "game_name": "...",
+  "description": "...",
+  "instructions": ["step1", "step2", ...],
+  "starter_code": "...",
+  "learning_goal": "..."
+}}
+"""
+
+    def _build_bundle_prompt(self, title: str, keywords: List[str], difficulty: str, num_questions: int) -> str:
+        """Prompt asking for a lesson, quiz and mini-game together as one JSON object"""
+        keywords_str = ", ".join(keywords)
+
+        return f"""
+You are an expert programming teacher creating content for absolute beginners (even children can understand).
+
+Topic: {title}
+Keywords: {keywords_str}
+Difficulty: {difficulty}
+
+Create three things for this topic:
+
+1. **Lesson**:
+   - Simple explanation (2-3 sentences, everyday language)
+   - A memorable real-world analogy
+   - Why the concept matters, with practical use cases
+   - A simple, well-commented, runnable Python code example
+   - A line-by-line breakdown of that example
+   - 3 common beginner mistakes and how to avoid them
+   - A simple practice challenge with clear instructions and expected output
+
+2. **Quiz**: {num_questions} multiple-choice questions that test understanding
+   - Mix of easy and challenging questions
+   - 4 options per question (A, B, C, D)
+   - Include explanation for correct answer
+
+3. **Mini-game**: a fun, simple game that helps practice the topic
+   - Playable in the terminal/browser, with score/progress tracking
+   - Reinforces the concept through interaction
+
+Format your response as one JSON object with these keys:
+{{
+  "lesson": {{
+    "explanation": "...",
+    "analogy": "...",
+    "why_it_matters": "...",
+    "code_example": "...",
+    "breakdown": ["step1", "step2", ...],
+    "common_mistakes": ["mistake1", "mistake2", "mistake3"],
+    "practice_challenge": {{
+      "description": "...",
+      "starter_code": "...",
+      "expected_output": "..."
+    }}
+  }},
+  "quiz": {{
+    "questions": [
+      {{
+        "question": "...",
+        "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}},
+        "correct_answer": "A",
+        "explanation": "..."
+      }}
+    ]
+  }},
+  "game": {{
+    "game_name": "...",
+    "description": "...",
+    "instructions": ["step1", "step2", ...],
+    "starter_code": "...",
+    "learning_goal": "..."
+  }}
+}}
+"""
+
+    async def agenerate_lesson_content(
+        self,
+        title: str,
+        keywords: List[str],
+        difficulty: str = "beginner",
+        strict: bool = False
+    ) -> Dict:
+        """
+        Generate complete lesson content for a topic
+
+        Args:
+            title: Lesson title
+            keywords: List of relevant keywords
+            difficulty: beginner, intermediate, or advanced
+            strict: Raise GenerationError instead of returning fallback content
+
+        Returns:
+            Dictionary containing lesson content
+        """
+        try:
+            prompt = self._build_lesson_prompt(title, keywords, difficulty)
+
+            logger.info(f"Generating lesson content for: {title}")
+            content = await self._generate_json("lesson", prompt, LessonContent)
+
+            logger.success(f"✅ Generated lesson content for: {title}")
+            return content
+
+        except Exception as e:
+            logger.error(f"❌ Error generating lesson content: {e}")
+            fallback = self._get_fallback_content(title)
+            if strict:
+                raise GenerationError(str(e), fallback) from e
+            return fallback
+
+    async def astream_lesson_content(
+        self,
+        title: str,
+        keywords: List[str],
+        difficulty: str = "beginner"
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream lesson sections as soon as each one is complete
+
+        Args:
+            title: Lesson title
+            keywords: List of relevant keywords
+            difficulty: beginner, intermediate, or advanced
+
+        Yields:
+            (section name, section value) pairs in the order the model writes them
+
+        Raises:
+            Exception: on model or parse errors; sections already yielded stay valid
+        """
+        prompt = self._build_lesson_prompt(title, keywords, difficulty)
+        parser = IncrementalJSONObjectParser()
+
+        self._count("lesson_stream", "calls")
+        logger.info(f"Streaming lesson content for: {title}")
+        async with aclosing(self._stream_text(prompt)) as chunks:
+            async for chunk in chunks:
+                for section in parser.feed(chunk):
+                    yield section
+                if parser.complete:
+                    break
+
+        if not parser.complete:
+            raise ValueError("Model response ended before the lesson JSON was complete")
+
+        logger.success(f"✅ Streamed lesson content for: {title}")
 
-            import json
-            quiz = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+    async def avalidate_streamed_lesson(
+        self,
+        title: str,
+        keywords: List[str],
+        difficulty: str,
+        content: Dict
+    ) -> Dict:
+        """
+        Validate a lesson assembled from astream_lesson_content
+
+        A lesson that does not match the schema gets the same targeted retry
+        as a generated one (a non-streamed call told what was wrong).
+
+        Returns:
+            Validated lesson content (the retry's content if it was needed)
+
+        Raises:
+            GenerationError: if the retry is unusable too
+        """
+        try:
+            return LessonContent.model_validate(content).model_dump()
+        except ValidationError as e:
+            problem = self._describe_problem(e)
+        self._count("lesson_stream", "malformed")
+        logger.warning(f"⚠️ Malformed streamed lesson ({problem}), retrying once")
+
+        prompt = self._build_lesson_prompt(title, keywords, difficulty)
+        try:
+            return await self._retry_json("lesson_stream", prompt, LessonContent, problem)
+        except Exception as e:
+            logger.error(f"❌ Error validating streamed lesson content: {e}")
+            raise GenerationError(str(e), self._get_fallback_content(title)) from e
+
+    async def agenerate_quiz(
+        self,
+        title: str,
+        keywords: List[str],
+        num_questions: int = 5,
+        strict: bool = False
+    ) -> Dict:
+        """
+        Generate a quiz for a topic
+
+        Args:
+            title: Topic title
+            keywords: Relevant keywords
+            num_questions: Number of quiz questions
+            strict: Raise GenerationError instead of returning an empty quiz
+
+        Returns:
+            Dictionary containing quiz questions
+        """
+        try:
+            prompt = self._build_quiz_prompt(title, keywords, num_questions)
+
+            logger.info(f"Generating quiz for: {title}")
+            quiz = await self._generate_json("quiz", prompt, Quiz)
 
             logger.success(f"✅ Generated quiz with {len(quiz['questions'])} questions")
             return quiz
 
         except Exception as e:
             logger.error(f"❌ Error generating quiz: {e}")
+            if strict:
+                raise GenerationError(str(e), {"questions": []}) from e
             return {"questions": []}
 
-    def generate_mini_game(
+    async def agenerate_mini_game(
         self,
         title: str,
-        keywords: List[str]
+        keywords: List[str],
+        strict: bool = False
     ) -> Dict:
         """
         Generate a mini-game concept for practicing the topic
@@ -188,46 +536,146 @@ Format as JSON:
         Args:
             title: Topic title
             keywords: Relevant keywords
+            strict: Raise GenerationError instead of returning an empty game
 
         Returns:
             Dictionary with game description and code
         """
         try:
-            keywords_str = ", ".join(keywords)
-
-            prompt = f"""
-Create a fun, simple mini-game that helps practice: {title}
-Keywords: {keywords_str}
-
-The game should:
-- Be playable in the terminal/browser
-- Reinforce the concept through interaction
-- Be fun and engaging
-- Include score/progress tracking
-
-Format as JSON:
-{{
-  "game_name": "...",
-  "description": "...",
-  "instructions": ["step1", "step2", ...],
-  "starter_code": "...",
-  "learning_goal": "..."
-}}
-"""
+            prompt = self._build_game_prompt(title, keywords)
 
             logger.info(f"Generating mini-game for: {title}")
-            response = self.model.generate_content(prompt)
-
-            import json
-            game = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+            game = await self._generate_json("game", prompt, MiniGame)
 
             logger.success(f"✅ Generated mini-game: {game.get('game_name', 'Unnamed')}")
             return game
 
         except Exception as e:
             logger.error(f"❌ Error generating mini-game: {e}")
+            if strict:
+                raise GenerationError(str(e), {}) from e
             return {}
 
+    async def agenerate_bundle(
+        self,
+        title: str,
+        keywords: List[str],
+        difficulty: str = "beginner",
+        num_questions: int = 5,
+        strict: bool = False
+    ) -> Tuple[Dict, Dict]:
+        """
+        Generate the lesson, quiz and mini-game for a topic in one model call
+
+        Args:
+            title: Topic title
+            keywords: Relevant keywords
+            difficulty: beginner, intermediate, or advanced
+            num_questions: Number of quiz questions
+            strict: Raise GenerationError (fallback holds all three artifacts)
+                instead of returning fallback content
+
+        Returns:
+            ({"lesson", "quiz", "game"}, report) where report holds the calls,
+            tokens and latency spent and an estimate of what three separate
+            calls would have cost
+        """
+        usage: Dict[str, int] = {}
+        start = time.monotonic()
+        try:
+            prompt = self._build_bundle_prompt(title, keywords, difficulty, num_questions)
+
+            logger.info(f"Generating lesson bundle for: {title}")
+            bundle = await self._generate_json("bundle", prompt, ContentBundle, usage)
+
+            logger.success(f"✅ Generated lesson, quiz and mini-game for: {title} in one call")
+        except Exception as e:
+            logger.error(f"❌ Error generating lesson bundle: {e}")
+            bundle = {
+                "lesson": self._get_fallback_content(title),
+                "quiz": {"questions": []},
+                "game": {}
+            }
+            if strict:
+                raise GenerationError(str(e), bundle) from e
+            return bundle, {**usage, "latency": time.monotonic() - start, "saved": None}
+
+        latency = time.monotonic() - start
+        separate_prompts = (
+            self._build_lesson_prompt(title, keywords, difficulty),
+            self._build_quiz_prompt(title, keywords, num_questions),
+            self._build_game_prompt(title, keywords)
+        )
+        return bundle, {
+            **usage,
+            "latency": latency,
+            "saved": self._bundle_savings(prompt, separate_prompts, usage, latency)
+        }
+
+    def _bundle_savings(
+        self,
+        prompt: str,
+        separate_prompts: Tuple[str, ...],
+        usage: Dict[str, int],
+        latency: float
+    ) -> Dict:
+        """
+        Estimate what one bundle call saved over one call per artifact
+
+        Prompt tokens of the separate prompts are scaled from the bundle
+        prompt's reported tokens per character (a local estimate when the
+        backend reports none, or the call was retried); completion tokens are
+        about the same either way. Nothing is counted over the network. Latency
+        is compared with the average latency of separate calls seen so far, so
+        it is None until each kind has run once.
+        """
+        spent = usage.get("prompt_tokens") or estimate_tokens(prompt)
+        if usage.get("prompt_tokens") and usage.get("calls") == 1:
+            tokens_per_char = spent / len(prompt)
+        else:
+            tokens_per_char = estimate_tokens(prompt) / len(prompt)
+        saved_tokens = round(sum(len(p) for p in separate_prompts) * tokens_per_char) - spent
+
+        saved_latency = None
+        if all(kind in self.latency for kind in ("lesson", "quiz", "game")):
+            separate_latency = self.latency["lesson"] + self.latency["quiz"] + self.latency["game"]
+            saved_latency = separate_latency - latency
+
+        return {
+            "calls": len(separate_prompts) - usage.get("calls", 0),
+            "prompt_tokens": saved_tokens,
+            "latency": saved_latency
+        }
+
+    def generate_lesson_content(
+        self,
+        title: str,
+        keywords: List[str],
+        difficulty: str = "beginner",
+        strict: bool = False
+    ) -> Dict:
+        """Blocking wrapper around agenerate_lesson_content (not for use inside an event loop)"""
+        return asyncio.run(self.agenerate_lesson_content(title, keywords, difficulty, strict))
+
+    def generate_quiz(
+        self,
+        title: str,
+        keywords: List[str],
+        num_questions: int = 5,
+        strict: bool = False
+    ) -> Dict:
+        """Blocking wrapper around agenerate_quiz (not for use inside an event loop)"""
+        return asyncio.run(self.agenerate_quiz(title, keywords, num_questions, strict))
+
+    def generate_mini_game(
+        self,
+        title: str,
+        keywords: List[str],
+        strict: bool = False
+    ) -> Dict:
+        """Blocking wrapper around agenerate_mini_game (not for use inside an event loop)"""
+        return asyncio.run(self.agenerate_mini_game(title, keywords, strict))
+
     def _get_fallback_content(self, title: str) -> Dict:
         """Fallback content if AI generation fails"""
         return {
@@ -0,0 +1,322 @@
+"""
+Content Cache Service
+Two-tier cache for AI-generated content: in-process LRU in front of a durable store
+(SQLite by default, Redis when configured)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from loguru import logger
+from app.core.config import settings
+
+
+def make_cache_key(kind: str, **params) -> str:
+    """
+    Build a content-addressed cache key
+
+    Args:
+        kind: Content kind (lesson, quiz, game)
+        **params: Everything that influences the generated content
+                  (model, prompt version, title, keywords, ...)
+
+    Returns:
+        Key of the form "<kind>:<sha256>"
+    """
+    payload = json.dumps({"kind": kind, **params}, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class CacheEntry:
+    """A cached value with its creation and expiry timestamps and an optional tag"""
+
+    def __init__(self, value: Dict, created_at: float, expires_at: float, tag: Optional[str] = None):
+        self.value = value
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.tag = tag
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+    def is_stale(self, soft_ttl: float, now: Optional[float] = None) -> bool:
+        """Older than soft_ttl: still servable, but due to be regenerated"""
+        return (now or time.time()) >= self.created_at + soft_ttl
+
+    def __repr__(self):
+        return f"CacheEntry(created_at={self.created_at}, expires_at={self.expires_at})"
+
+
+class MemoryStore:
+    """Bounded in-process LRU store"""
+
+    def __init__(self, max_items: int = 256):
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.is_expired():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_tag(self, tag: str) -> int:
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.tag == tag]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """Durable store backed by a local SQLite database"""
+
+    def __init__(self, db_path: str):
+        path = Path(db_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                tag TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(content_cache)")}
+        if "tag" not in columns:
+            self._conn.execute("ALTER TABLE content_cache ADD COLUMN tag TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_content_cache_tag ON content_cache (tag)")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, expires_at, tag FROM content_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+        if entry.is_expired():
+            self.delete(key)
+            return None
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content_cache (key, value, created_at, expires_at, tag) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(entry.value, ensure_ascii=False), entry.created_at, entry.expires_at, entry.tag)
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM content_cache WHERE key = ?", (key,))
+
+    def delete_tag(self, tag: str) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM content_cache WHERE tag = ?", (tag,)).rowcount
+
+
+class RedisStore:
+    """Durable store backed by Redis (settings.REDIS_URL)"""
+
+    def __init__(self, redis_url: str, prefix: str = "content:"):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(redis_url)
+        self._client.ping()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return CacheEntry(data["value"], data["created_at"], data["expires_at"], data.get("tag"))
+
+    def set(self, key: str, entry: CacheEntry):
+        ttl = max(1, int(entry.expires_at - time.time()))
+        payload = json.dumps(
+            {"value": entry.value, "created_at": entry.created_at, "expires_at": entry.expires_at, "tag": entry.tag},
+            ensure_ascii=False
+        )
+        pipe = self._client.pipeline()
+        pipe.set(self.prefix + key, payload, ex=ttl)
+        if entry.tag:
+            tag_key = f"{self.prefix}tag:{entry.tag}"
+            pipe.sadd(tag_key, key)
+            pipe.expire(tag_key, ttl)
+        pipe.execute()
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+    def delete_tag(self, tag: str) -> int:
+        tag_key = f"{self.prefix}tag:{tag}"
+        keys = [k.decode() if isinstance(k, bytes) else k for k in self._client.smembers(tag_key)]
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+        self._client.delete(tag_key)
+        return len(keys)
+
+
+class ContentCache:
+    """
+    Caches generated content by content-addressed key
+    Reads go memory -> durable store; writes go to both tiers
+
+    Entries are fresh for soft_ttl seconds and kept until ttl (the hard TTL);
+    in between they are stale, and callers decide whether to serve them while
+    regenerating.
+    """
+
+    def __init__(
+        self,
+        backend: str = settings.CONTENT_CACHE_BACKEND,
+        ttl: int = settings.CONTENT_CACHE_HARD_TTL,
+        memory_items: int = settings.CONTENT_CACHE_MEMORY_ITEMS,
+        soft_ttl: int = settings.CONTENT_CACHE_SOFT_TTL or settings.REDIS_CACHE_TTL
+    ):
+        self.ttl = ttl
+        self.soft_ttl = min(soft_ttl, ttl)
+        self.memory = MemoryStore(memory_items)
+        self.durable = self._create_durable_store(backend.lower())
+        self.stats = {"memory_hits": 0, "durable_hits": 0, "stale_hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _create_durable_store(self, backend: str):
+        """Create the durable tier, falling back to SQLite if Redis is unavailable"""
+        if backend == "memory":
+            logger.info("Content cache running in memory-only mode")
+            return None
+
+        if backend == "redis":
+            try:
+                store = RedisStore(settings.REDIS_URL)
+                logger.success(f"✅ Content cache using Redis: {settings.REDIS_URL}")
+                return store
+            except Exception as e:
+                logger.warning(f"⚠️  Redis unavailable for content cache ({e}), falling back to SQLite")
+
+        store = SQLiteStore(settings.CONTENT_CACHE_PATH)
+        logger.info(f"Content cache using SQLite: {store.db_path}")
+        return store
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key, stale or not, or None on miss/expiry"""
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.stats["memory_hits"] += 1
+        elif self.durable is not None:
+            try:
+                entry = self.durable.get(key)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Content cache read failed for {key}: {e}")
+                entry = None
+
+            if entry is not None:
+                self.memory.set(key, entry)
+                self.stats["durable_hits"] += 1
+
+        if entry is None:
+            self.stats["misses"] += 1
+        elif self.is_stale(entry):
+            self.stats["stale_hits"] += 1
+        return entry
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached value for a key, stale or not, or None on miss/expiry"""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key without touching hit/miss counters or the memory tier"""
+        entry = self.memory.get(key)
+        if entry is not None or self.durable is None:
+            return entry
+        try:
+            return self.durable.get(key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Content cache read failed for {key}: {e}")
+            return None
+
+    def is_stale(self, entry: CacheEntry) -> bool:
+        return entry.is_stale(self.soft_ttl)
+
+    def contains(self, key: str) -> bool:
+        """Whether a fresh (not stale) entry exists, without touching hit/miss counters"""
+        entry = self.peek(key)
+        return entry is not None and not self.is_stale(entry)
+
+    def set(self, key: str, value: Dict, tag: Optional[str] = None):
+        """Store a value in both tiers, optionally tagged for group invalidation"""
+        now = time.time()
+        entry = CacheEntry(value, now, now + self.ttl, tag)
+        self.memory.set(key, entry)
+        self.stats["writes"] += 1
+
+        if self.durable is not None:
+            try:
+                self.durable.set(key, entry)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Content cache write failed for {key}: {e}")
+
+    def delete(self, key: str):
+        """Remove a key from both tiers"""
+        self.memory.delete(key)
+        if self.durable is not None:
+            try:
+                self.durable.delete(key)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Content cache delete failed for {key}: {e}")
+
+    def delete_tag(self, tag: str) -> int:
+        """Remove every entry stored with a tag from both tiers"""
+        removed = self.memory.delete_tag(tag)
+        if self.durable is not None:
+            try:
+                removed = max(removed, self.durable.delete_tag(tag))
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Content cache tag invalidation failed for {tag}: {e}")
+        return removed
+
+
+# Global content cache instance
+content_cache = ContentCache()
@@ -0,0 +1,55 @@
+"""
+Content Schemas
+Shapes the model must produce for lessons, quizzes and mini-games; responses
+are validated against these before they are served or cached
+"""
+
+from typing import Dict, List
+from pydantic import BaseModel, Field, model_validator
+
+
+class PracticeChallenge(BaseModel):
+    description: str
+    starter_code: str
+    expected_output: str
+
+
+class LessonContent(BaseModel):
+    explanation: str
+    analogy: str
+    why_it_matters: str
+    code_example: str
+    breakdown: List[str]
+    common_mistakes: List[str]
+    practice_challenge: PracticeChallenge
+
+
+class QuizQuestion(BaseModel):
+    question: str
+    options: Dict[str, str]
+    correct_answer: str
+    explanation: str
+
+    @model_validator(mode="after")
+    def answer_is_an_option(self) -> "QuizQuestion":
+        if self.correct_answer not in self.options:
+            raise ValueError(f"correct_answer '{self.correct_answer}' is not one of the options")
+        return self
+
+
+class Quiz(BaseModel):
+    questions: List[QuizQuestion] = Field(min_length=1)
+
+
+class MiniGame(BaseModel):
+    game_name: str
+    description: str
+    instructions: List[str]
+    starter_code: str
+    learning_goal: str
+
+
+class ContentBundle(BaseModel):
+    lesson: LessonContent
+    quiz: Quiz
+    game: MiniGame
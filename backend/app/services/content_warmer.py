@@ -0,0 +1,183 @@
+"""
+Content Warmer Service
+Pre-generates lesson content, quizzes and mini-games for the whole XML catalogue
+so learners get a cache read instead of a model round trip on first visit
+
+Usage (from the backend directory):
+    python -m app.services.content_warmer --concurrency 4
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.services.lesson_content import lesson_content, LessonContentService, CONTENT_KINDS
+from app.services.llm_scheduler import background_priority
+from app.services.xml_parser import xml_parser, Topic
+
+
+class WarmReport:
+    """Per-topic outcome of a warming run"""
+
+    def __init__(self, total_topics: int, kinds: Iterable[str]):
+        self.total_topics = total_topics
+        self.kinds = list(kinds)
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.topics: Dict[str, Dict] = {}
+        self.counts = {"generated": 0, "skipped": 0, "failed": 0}
+
+    def record(self, topic: Topic, kind: str, status: str, latency: float, error: Optional[str] = None):
+        entry = self.topics.setdefault(topic.id, {"title": topic.title, "results": {}})
+        result = {"status": status, "latency": round(latency, 3)}
+        if error:
+            result["error"] = error
+        entry["results"][kind] = result
+        self.counts[status] += 1
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def to_dict(self) -> Dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "running": self.running,
+            "total_topics": self.total_topics,
+            "kinds": self.kinds,
+            "elapsed": round(elapsed, 3),
+            **self.counts,
+            "failures": [
+                {"topic_id": topic_id, "kind": kind, "error": result["error"]}
+                for topic_id, entry in self.topics.items()
+                for kind, result in entry["results"].items()
+                if result["status"] == "failed"
+            ],
+            "topics": self.topics
+        }
+
+
+class ContentWarmer:
+    """
+    Walks every topic and fills the content cache with bounded parallelism
+
+    Each artifact is written to the durable cache as soon as it is generated,
+    so an interrupted run resumes where it stopped: entries that are already
+    fresh for the current model and prompt version are skipped.
+    """
+
+    def __init__(self, service: LessonContentService):
+        self.service = service
+        self.last_report: Optional[WarmReport] = None
+
+    @property
+    def running(self) -> bool:
+        return self.last_report is not None and self.last_report.running
+
+    async def _warm_one(self, topic: Topic, kind: str, force: bool, report: WarmReport):
+        start = time.perf_counter()
+        try:
+            # Interactive requests go ahead of warming when the model is rate limited
+            with background_priority():
+                generated = await self.service.warm(kind, topic, force=force)
+            report.record(topic, kind, "generated" if generated else "skipped", time.perf_counter() - start)
+        except Exception as e:
+            report.record(topic, kind, "failed", time.perf_counter() - start, str(e) or type(e).__name__)
+            logger.warning(f"Failed to warm {kind} for {topic.id}: {e}")
+
+    def begin(
+        self,
+        topics: Optional[List[Topic]] = None,
+        kinds: Iterable[str] = CONTENT_KINDS
+    ) -> Tuple[List[Topic], WarmReport]:
+        """
+        Mark a run as started by publishing its report, before any work is done
+
+        Callers that start the run later (e.g. as a background task) call this
+        first, so a second request already sees a run in progress.
+
+        Returns:
+            (topics to warm, report to pass to warm_all)
+        """
+        if topics is None:
+            if not xml_parser.courses:
+                xml_parser.load_all_courses()
+            topics = xml_parser.get_all_topics()
+
+        report = WarmReport(len(topics), kinds)
+        self.last_report = report
+        return topics, report
+
+    async def warm_all(
+        self,
+        topics: Optional[List[Topic]] = None,
+        kinds: Iterable[str] = CONTENT_KINDS,
+        concurrency: int = settings.CONTENT_WARM_CONCURRENCY,
+        force: bool = False,
+        report: Optional[WarmReport] = None
+    ) -> WarmReport:
+        """
+        Pre-generate content for topics
+
+        Args:
+            topics: Topics to warm (default: every topic in the catalogue)
+            kinds: Content kinds to generate
+            concurrency: Maximum generations running at once
+            force: Regenerate entries even when they are fresh
+            report: Report from begin(), if the run was already marked as started
+
+        Returns:
+            WarmReport with per-topic latency and failures
+        """
+        kinds = list(kinds)
+        if report is None:
+            topics, report = self.begin(topics, kinds)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        logger.info(f"Warming {len(kinds)} content kinds for {len(topics)} topics (concurrency={concurrency})")
+
+        async def bounded(topic: Topic, kind: str):
+            async with semaphore:
+                await self._warm_one(topic, kind, force, report)
+
+        try:
+            await asyncio.gather(*(bounded(topic, kind) for topic in topics for kind in kinds))
+        finally:
+            report.finished_at = time.time()
+
+        logger.success(
+            f"✅ Content warming finished: {report.counts['generated']} generated, "
+            f"{report.counts['skipped']} fresh, {report.counts['failed']} failed"
+        )
+        return report
+
+
+# Global content warmer instance
+content_warmer = ContentWarmer(lesson_content)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Pre-generate AI content for all lessons")
+    parser.add_argument("--concurrency", type=int, default=settings.CONTENT_WARM_CONCURRENCY)
+    parser.add_argument("--kinds", default=",".join(CONTENT_KINDS), help="Comma-separated: lesson,quiz,game")
+    parser.add_argument("--force", action="store_true", help="Regenerate entries that are already fresh")
+    parser.add_argument("--report", help="Write the full JSON report to this file")
+    args = parser.parse_args()
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    result = asyncio.run(content_warmer.warm_all(kinds=kinds, concurrency=args.concurrency, force=args.force))
+    summary = result.to_dict()
+
+    for topic_id, entry in summary["topics"].items():
+        line = ", ".join(f"{kind}={r['status']} {r['latency']:.2f}s" for kind, r in entry["results"].items())
+        print(f"{topic_id:<24} {line}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    raise SystemExit(1 if summary["failed"] else 0)
@@ -0,0 +1,131 @@
+"""
+Execution Cache
+Results of deterministic code runs, so byte-identical submissions (starter
+code, generated examples) are answered without running them again
+"""
+
+import ast
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.core.config import settings
+
+
+# Set displays and comprehensions iterate in hash order, see is_deterministic
+SET_NODES = (ast.Set, ast.SetComp)
+
+# Code whose output can differ between runs of the same source and input:
+# randomness, clocks, process/environment state, files, threads and sockets,
+# and set/hash/id based output (str hashes are randomized per process, and
+# each worker process has its own seed)
+NONDETERMINISTIC_PATTERN = re.compile(
+    r"\b(random|secrets|uuid|time|datetime|os|threading|multiprocessing|"
+    r"asyncio|socket|subprocess|tempfile|glob|pathlib|shutil|signal)\b"
+    r"|\b(set|frozenset|hash|id|open|exec|eval|__import__)\s*\("
+)
+
+
+def is_deterministic(code: str) -> bool:
+    """
+    Heuristic: False when the code might produce different output for the same input
+
+    Errs on the side of not caching; a program it rejects just runs as usual.
+    Besides the names in NONDETERMINISTIC_PATTERN, set literals and set
+    comprehensions ({"a", "b"}, {w for w in words}) are rejected: their
+    iteration order depends on the worker's hash seed.
+    """
+    if NONDETERMINISTIC_PATTERN.search(code) is not None:
+        return False
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        # Fails the same way on every run
+        return True
+    return not any(isinstance(node, SET_NODES) for node in ast.walk(tree))
+
+
+def make_execution_key(code: str, stdin: Optional[str], language: str, interpreter: str, limits: Dict) -> str:
+    """Hash of everything that determines a run's result"""
+    payload = json.dumps(
+        {"code": code, "stdin": stdin or "", "language": language, "interpreter": interpreter, "limits": limits},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExecutionCache:
+    """
+    In-process LRU of sandbox results, bounded by entry count and total output size
+
+    Only clean completions are stored: timeouts, truncated output and killed
+    runs depend on machine load, not just on the program.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.EXECUTION_CACHE_MAX_ENTRIES,
+        max_bytes: int = settings.EXECUTION_CACHE_MAX_BYTES
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "evicted": 0, "saved_cpu_seconds": 0.0}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+
+    @staticmethod
+    def _size(result: Dict) -> int:
+        return len(result["stdout"].encode("utf-8")) + len(result["stderr"].encode("utf-8"))
+
+    def get(self, key: str) -> Optional[Dict]:
+        result = self._entries.get(key)
+        if result is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        self.stats["saved_cpu_seconds"] += result.get("cpu_time") or result["wall_time"]
+        return result
+
+    def put(self, key: str, result: Dict):
+        if result["timed_out"] or result.get("output_truncated") or result.get("cancelled") or result["exit_code"] < 0:
+            return
+        size = self._size(result)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self.size_bytes -= self._size(self._entries.pop(key))
+        self._entries[key] = result
+        self.size_bytes += size
+        self.stats["stored"] += 1
+
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= self._size(evicted)
+            self.stats["evicted"] += 1
+
+    def record_bypass(self):
+        """Count a run that was not eligible for caching"""
+        self.stats["bypassed"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def status(self) -> Dict:
+        """Size, hit ratio and saved CPU time"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": settings.EXECUTION_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            **self.stats,
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0
+        }
+
+
+# Global execution cache instance
+execution_cache = ExecutionCache()
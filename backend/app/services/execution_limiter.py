@@ -0,0 +1,121 @@
+"""
+Execution Limiter
+Admission control for code execution: a fixed number of runs at a time and a
+bounded queue behind them, so a burst of submissions is either queued briefly
+or turned away instead of piling up without limit
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, NamedTuple
+from app.core.config import settings
+
+
+# Weight of the latest run in the moving average used for Retry-After
+RUN_TIME_SMOOTHING = 0.2
+
+
+class QueueFull(Exception):
+    """The wait queue is full; retry after the suggested number of seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Execution queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Admission(NamedTuple):
+    """How a run got its slot"""
+    queue_depth: int  # Runs waiting ahead of this one when it arrived
+    wait_time: float  # Seconds spent waiting for a slot
+
+
+class ExecutionLimiter:
+    """
+    Semaphore with a bounded wait queue
+
+    Usage:
+        async with limiter.slot() as admission:
+            ...
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.SANDBOX_MAX_CONCURRENCY,
+        max_queue: int = settings.SANDBOX_MAX_QUEUE
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"admitted": 0, "rejected": 0, "queued": 0, "total_wait": 0.0, "max_wait": 0.0}
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._average_run = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to admit a new run"""
+        backlog = self.waiting + self.active
+        return max(1, math.ceil(self._average_run * backlog / self.max_concurrency))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Admission]:
+        """
+        Wait for an execution slot
+
+        Raises:
+            QueueFull: if every slot is busy and max_queue runs are already waiting
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFull(self.retry_after())
+
+        queue_depth = self.waiting
+        if self._semaphore.locked():
+            self.stats["queued"] += 1
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        wait_time = time.perf_counter() - start
+
+        self.stats["admitted"] += 1
+        self.stats["total_wait"] += wait_time
+        self.stats["max_wait"] = max(self.stats["max_wait"], wait_time)
+
+        self.active += 1
+        run_start = time.perf_counter()
+        try:
+            yield Admission(queue_depth, wait_time)
+        finally:
+            self.active -= 1
+            run_time = time.perf_counter() - run_start
+            self._average_run += RUN_TIME_SMOOTHING * (run_time - self._average_run)
+            self._semaphore.release()
+
+    def status(self) -> Dict:
+        """Current load and lifetime counters"""
+        admitted = self.stats["admitted"]
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            **self.stats,
+            "average_wait": self.stats["total_wait"] / admitted if admitted else 0.0,
+            "average_run": self._average_run
+        }
+
+
+# Global execution limiter instance
+execution_limiter = ExecutionLimiter()
+
+# Interactive (/stream) sessions spend most of their time waiting for input,
+# so they are capped separately and never hold slots that batch runs need
+interactive_limiter = ExecutionLimiter(
+    max_concurrency=settings.SANDBOX_INTERACTIVE_MAX_SESSIONS,
+    max_queue=settings.SANDBOX_INTERACTIVE_MAX_QUEUE
+)
@@ -0,0 +1,260 @@
+"""
+JSON Extraction Utilities
+Pulls JSON objects out of free-form model responses
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+# How many cut points (commas) to try when repairing a truncated object
+MAX_REPAIR_ATTEMPTS = 16
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONExtractionError(ValueError):
+    """No usable JSON object in a model response"""
+
+
+def _repairs(
+    text: str,
+    stack: List[str],
+    in_string: bool,
+    escape: bool,
+    cuts: List[Tuple[int, List[str]]]
+) -> Iterator[Dict]:
+    """
+    Ways to close a JSON object that was cut off mid-way, most complete first
+
+    First closes the open string and brackets as they are, then drops the
+    trailing incomplete member by cutting back to each earlier comma. Only
+    candidates that parse as an object are yielded.
+    """
+    candidate = text
+    if in_string:
+        # A dangling backslash would escape the closing quote
+        candidate = (candidate[:-1] if escape else candidate) + '"'
+    attempts = [(candidate.rstrip().rstrip(","), stack)] + [(text[:cut], cut_stack) for cut, cut_stack in reversed(cuts)]
+
+    for prefix, open_brackets in attempts[:MAX_REPAIR_ATTEMPTS + 1]:
+        closing = "".join(CLOSERS[bracket] for bracket in reversed(open_brackets))
+        try:
+            value = json.loads(prefix + closing)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            yield value
+
+
+def _scan(text: str, problems: List[str]) -> Iterator[Tuple[Dict, bool]]:
+    """Candidates for json_object_candidates; why candidates were skipped is appended to problems"""
+    start = text.find("{")
+
+    while start != -1:
+        stack: List[str] = []
+        in_string = False
+        escape = False
+        # Positions of commas outside strings, with the brackets open there
+        cuts: List[Tuple[int, List[str]]] = []
+        end = None
+
+        for index in range(start, len(text)):
+            ch = text[index]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+                continue
+
+            if ch == '"':
+                in_string = True
+            elif ch in CLOSERS:
+                stack.append(ch)
+            elif ch in "}]":
+                stack.pop()
+                if not stack:
+                    end = index + 1
+                    break
+            elif ch == ",":
+                cuts.append((index, list(stack)))
+
+        if end is None:
+            for repaired in _repairs(text[start:], stack, in_string, escape, [(cut - start, s) for cut, s in cuts]):
+                yield repaired, True
+            # May be an unbalanced brace in prose before the real object; try the next one
+            problems.append("response ended before the JSON object was complete and could not be repaired")
+        else:
+            try:
+                value = json.loads(text[start:end])
+                if isinstance(value, dict):
+                    yield value, False
+                else:
+                    problems.append("JSON value is not an object")
+            except ValueError as e:
+                problems.append(f"invalid JSON: {e}")
+        # Braces in prose before the real object; try the next one
+        start = text.find("{", start + 1)
+
+
+def json_object_candidates(text: str) -> Iterator[Tuple[Dict, bool]]:
+    """
+    Every JSON object that free-form text could be read as, best first
+
+    Prose and markdown fences around the object are ignored, and braces or
+    fences inside string values (e.g. a code example) do not confuse it. If
+    the text ends before an object is closed, repairs are yielded in order:
+    closing what is open, then dropping trailing members one at a time. A
+    caller with a schema takes the first candidate that validates, so a
+    repair that keeps a half-written item does not hide a shorter valid one.
+
+    Args:
+        text: Model response
+
+    Yields:
+        (object, repaired) where repaired is True if truncation was fixed
+
+    Raises:
+        JSONExtractionError: if no object could be parsed or repaired
+    """
+    problems: List[str] = []
+    found = False
+    for candidate in _scan(text, problems):
+        found = True
+        yield candidate
+    if not found:
+        raise JSONExtractionError(problems[-1] if problems else "no JSON object found")
+
+
+def extract_json_object(text: str) -> Tuple[Dict, bool]:
+    """
+    Find the first JSON object in free-form text (see json_object_candidates)
+
+    Args:
+        text: Model response
+
+    Returns:
+        (object, repaired) where repaired is True if truncation was fixed
+
+    Raises:
+        JSONExtractionError: if no object could be parsed or repaired
+    """
+    return next(json_object_candidates(text))
+
+
+class IncrementalJSONObjectParser:
+    """
+    Parses a streamed JSON object one top-level member at a time
+
+    Text is fed in arbitrary chunks (e.g. as the model streams it). Anything
+    before the opening brace (markdown fences, prose) is skipped, and each
+    top-level "key": value pair is returned as soon as it is complete.
+
+    Like extract_json_object, a brace in prose before the real object (e.g.
+    "Here is {your} lesson:") is skipped: until the first member parses, the
+    text after the brace is kept, and if what follows is not a "key": value
+    member it is scanned again from the next brace.
+    """
+
+    def __init__(self):
+        self.result: Dict[str, Any] = {}
+        self.started = False
+        self.complete = False
+        self._reset()
+
+    def _reset(self):
+        self.started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+        # Text after the opening brace, kept until the first member is parsed
+        self._candidate: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of text
+
+        Returns:
+            (key, value) pairs completed by this chunk, in document order
+
+        Raises:
+            ValueError: if a completed member after the first is not valid JSON
+        """
+        completed: List[Tuple[str, Any]] = []
+        while text:
+            text = self._consume(text, completed)
+        return completed
+
+    def _consume(self, text: str, completed: List[Tuple[str, Any]]) -> str:
+        """Parse text; returns text to scan again if the opening brace turned out to be prose"""
+        for index, ch in enumerate(text):
+            if self.complete:
+                break
+
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self._depth = 1
+                continue
+
+            first_member = not self.result
+            if first_member:
+                self._candidate.append(ch)
+
+            if self._in_string:
+                self._member.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if (first_member and self._depth == 1 and not ch.isspace() and ch != '"'
+                    and not "".join(self._member).strip()):
+                # Objects start with a quoted key; this brace belongs to prose
+                return self._rescan(text[index + 1:])
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]" or (ch == "," and self._depth == 1):
+                if ch != ",":
+                    self._depth -= 1
+                    if self._depth > 0:
+                        self._member.append(ch)
+                        continue
+                try:
+                    self._flush(completed)
+                except ValueError:
+                    if first_member:
+                        return self._rescan(text[index + 1:])
+                    raise
+                if ch != ",":
+                    self.complete = True
+                continue
+
+            self._member.append(ch)
+
+        return ""
+
+    def _rescan(self, rest: str) -> str:
+        """Give up on the current opening brace; the text after it is scanned again"""
+        text = "".join(self._candidate) + rest
+        self._reset()
+        return text
+
+    def _flush(self, completed: List[Tuple[str, Any]]):
+        member = "".join(self._member).strip()
+        self._member = []
+        if not member:
+            return
+
+        for key, value in json.loads("{" + member + "}").items():
+            self.result[key] = value
+            completed.append((key, value))
@@ -0,0 +1,540 @@
+"""
+Lesson Content Service
+Serves AI-generated lessons, quizzes and mini-games through the content cache
+"""
+
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+from app.services.ai_generator import (
+    ai_generator,
+    AIContentGenerator,
+    GenerationError,
+    LESSON_SECTIONS,
+    PROMPT_VERSION
+)
+from app.services.content_cache import content_cache, ContentCache, make_cache_key
+from app.services.llm_scheduler import background_priority
+from app.services.single_flight import SingleFlight
+from app.services.xml_parser import xml_parser, Topic
+
+
+# Content kinds produced for every topic
+CONTENT_KINDS = ("lesson", "quiz", "game")
+
+DEFAULT_QUIZ_QUESTIONS = 5
+
+# Runs a coroutine function after the response is sent (e.g. BackgroundTasks.add_task)
+Scheduler = Callable[..., Any]
+
+
+class SectionFeed:
+    """
+    Lesson sections of one in-flight streamed generation
+
+    The generation publishes sections as they arrive; every client streaming
+    the same lesson follows the feed from the first section, so late joiners
+    replay what they missed and then continue live.
+    """
+
+    def __init__(self):
+        self.sections: List[Tuple[str, Any]] = []
+        self.finished = False
+        self._updated = asyncio.Event()
+
+    def _wake(self):
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def publish(self, name: str, value: Any):
+        self.sections.append((name, value))
+        self._wake()
+
+    def finish(self):
+        self.finished = True
+        self._wake()
+
+    async def follow(self) -> AsyncIterator[Tuple[str, Any]]:
+        """All sections from the first, until the generation finishes"""
+        position = 0
+        while True:
+            while position < len(self.sections):
+                yield self.sections[position]
+                position += 1
+            if self.finished:
+                return
+            await self._updated.wait()
+
+
+class LessonContentService:
+    """
+    Sits in front of AIContentGenerator and caches its output
+    Concurrent misses for the same content share one generation call
+    Fallback content is returned to the caller but never cached
+
+    Stale entries (older than the cache's soft TTL) are served immediately
+    when the caller passes a schedule function, which regenerates them after
+    the response; otherwise the caller waits for regeneration. Whenever
+    generation fails, the last good content is served instead of fallback.
+    """
+
+    def __init__(self, generator: AIContentGenerator, cache: ContentCache):
+        self.generator = generator
+        self.cache = cache
+        self.flights = SingleFlight()
+        self._feeds: Dict[str, SectionFeed] = {}
+
+    def cache_key(self, kind: str, **params) -> str:
+        """Cache key for generated content of a kind, tied to model and prompt version"""
+        return make_cache_key(
+            kind,
+            model=self.generator.backend.model_name,
+            prompt_version=PROMPT_VERSION,
+            **params
+        )
+
+    def _plan(
+        self,
+        kind: str,
+        topic: Topic,
+        num_questions: int = DEFAULT_QUIZ_QUESTIONS
+    ) -> Tuple[str, Callable[[], Awaitable[Dict]]]:
+        """
+        Resolve the cache key and generator call for one piece of content
+
+        Returns:
+            (cache key, zero-argument coroutine function that generates strictly)
+        """
+        if kind == "lesson":
+            key = self.cache_key(
+                "lesson",
+                title=topic.title,
+                keywords=topic.keywords,
+                difficulty=topic.difficulty
+            )
+            return key, lambda: self.generator.agenerate_lesson_content(
+                title=topic.title,
+                keywords=topic.keywords,
+                difficulty=topic.difficulty,
+                strict=True
+            )
+
+        if kind == "quiz":
+            key = self.cache_key(
+                "quiz",
+                title=topic.title,
+                keywords=topic.keywords,
+                num_questions=num_questions
+            )
+            return key, lambda: self.generator.agenerate_quiz(
+                title=topic.title,
+                keywords=topic.keywords,
+                num_questions=num_questions,
+                strict=True
+            )
+
+        if kind == "game":
+            key = self.cache_key(
+                "game",
+                title=topic.title,
+                keywords=topic.keywords
+            )
+            return key, lambda: self.generator.agenerate_mini_game(
+                title=topic.title,
+                keywords=topic.keywords,
+                strict=True
+            )
+
+        raise ValueError(f"Unknown content kind: {kind}")
+
+    async def _generate_and_store(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[Dict]],
+        topic: Topic
+    ) -> Dict:
+        """Generate strictly and cache the result; GenerationError propagates uncached"""
+        content = await generate()
+        self.cache.set(key, content, tag=topic.id)
+        return content
+
+    def _cached(self, kind: str, topic: Topic, key: str, schedule: Optional[Scheduler], **params) -> Optional[Dict]:
+        """
+        Cached content to serve now, or None if the caller should generate
+
+        A stale entry is served only when a refresh can be scheduled for after
+        the response.
+        """
+        entry = self.cache.get_entry(key)
+        if entry is None:
+            return None
+        if not self.cache.is_stale(entry):
+            logger.info(f"Content cache hit: {key}")
+            return entry.value
+        if schedule is None:
+            return None
+        logger.info(f"Serving stale content, revalidating in background: {key}")
+        schedule(self.revalidate, kind, topic, **params)
+        return entry.value
+
+    def _last_good(self, key: str) -> Optional[Dict]:
+        """Content still in the cache (stale or not) for a key whose generation failed"""
+        entry = self.cache.peek(key)
+        if entry is None:
+            return None
+        logger.warning(f"Generation failed, serving last good content for {key}")
+        return entry.value
+
+    async def revalidate(self, kind: str, topic: Topic, **params):
+        """
+        Regenerate stale content at background priority
+
+        Does nothing if the entry was refreshed since it was scheduled. If
+        generation fails, the stale entry stays in place.
+        """
+        key, generate = self._plan(kind, topic, **params)
+        if self.cache.contains(key):
+            return
+        with background_priority():
+            try:
+                await self.flights.do(
+                    key,
+                    lambda: self._generate_and_store(key, generate, topic),
+                    group=kind
+                )
+            except GenerationError:
+                logger.warning(f"Revalidation failed for {key}, keeping stale content")
+
+    async def _get_or_generate(
+        self,
+        kind: str,
+        topic: Topic,
+        regenerate: bool = False,
+        schedule: Optional[Scheduler] = None,
+        **params
+    ) -> Dict:
+        """Serve from cache, or generate (coalesced per key) and store unless generation fell back"""
+        key, generate = self._plan(kind, topic, **params)
+
+        if not regenerate:
+            cached = self._cached(kind, topic, key, schedule, **params)
+            if cached is not None:
+                return cached
+
+        try:
+            return await self.flights.do(
+                key,
+                lambda: self._generate_and_store(key, generate, topic),
+                group=kind
+            )
+        except GenerationError as e:
+            last_good = self._last_good(key)
+            if last_good is not None:
+                return last_good
+            logger.warning(f"Serving uncached fallback content for {key}")
+            return e.fallback
+
+    async def get_lesson_content(
+        self,
+        topic: Topic,
+        regenerate: bool = False,
+        schedule: Optional[Scheduler] = None
+    ) -> Dict:
+        """Get lesson content for a topic"""
+        return await self._get_or_generate("lesson", topic, regenerate, schedule)
+
+    def _end_feed(self, key: str, feed: SectionFeed):
+        feed.finish()
+        if self._feeds.get(key) is feed:
+            del self._feeds[key]
+
+    async def _stream_and_store(self, key: str, topic: Topic, feed: SectionFeed) -> Dict:
+        """
+        Stream one lesson generation into feed, then cache the assembled lesson
+
+        Runs as the single flight for the lesson key, so GET requests for the
+        same lesson wait for this generation instead of starting their own.
+
+        Raises:
+            GenerationError: if any section is missing or the lesson is still
+                invalid after a retry (nothing is cached)
+        """
+        content: Dict = {}
+        try:
+            sections = self.generator.astream_lesson_content(
+                title=topic.title,
+                keywords=topic.keywords,
+                difficulty=topic.difficulty
+            )
+            async with aclosing(sections):
+                async for name, value in sections:
+                    content[name] = value
+                    feed.publish(name, value)
+        except Exception as e:
+            logger.error(f"❌ Error streaming lesson content: {e}")
+        finally:
+            self._end_feed(key, feed)
+
+        missing = [name for name in LESSON_SECTIONS if name not in content]
+        if missing:
+            raise GenerationError(
+                f"Lesson stream ended without: {', '.join(missing)}",
+                self.generator._get_fallback_content(topic.title)
+            )
+        content = await self.generator.avalidate_streamed_lesson(
+            title=topic.title,
+            keywords=topic.keywords,
+            difficulty=topic.difficulty,
+            content=content
+        )
+        self.cache.set(key, content, tag=topic.id)
+        return content
+
+    async def stream_lesson_content(
+        self,
+        topic: Topic,
+        regenerate: bool = False,
+        schedule: Optional[Scheduler] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream lesson content section by section
+
+        Cached content is replayed immediately. Otherwise sections are yielded
+        as the model completes them and the assembled lesson is validated and
+        cached once every section has arrived; sections replaced by the
+        validation retry are sent again. Concurrent requests for the same lesson
+        share one generation: streams follow the same sections, and if a
+        non-streamed generation is already running its result is replayed. If
+        generation fails part-way, the missing sections are filled from the
+        last good content if any is cached, else from fallback content, which
+        is not cached.
+
+        Yields:
+            {"event": "section", "name": ..., "value": ...} per section, then
+            {"event": "done", "cached": bool, "fallback": bool}
+        """
+        key, generate = self._plan("lesson", topic)
+
+        if not regenerate:
+            cached = self._cached("lesson", topic, key, schedule)
+            if cached is not None:
+                for name, value in cached.items():
+                    yield {"event": "section", "name": name, "value": value}
+                yield {"event": "done", "cached": True, "fallback": False}
+                return
+
+        feed = self._feeds.get(key)
+        if feed is None and not self.flights.running(key):
+            feed = SectionFeed()
+            self._feeds[key] = feed
+        if feed is not None:
+            flight = asyncio.ensure_future(self.flights.do(
+                key,
+                lambda: self._stream_and_store(key, topic, feed),
+                group="lesson"
+            ))
+            # The flight may have joined a non-streamed generation that never
+            # feeds sections; stop following once it settles either way
+            flight.add_done_callback(lambda done: done.cancelled() or self._end_feed(key, feed))
+        else:
+            flight = asyncio.ensure_future(self.flights.do(
+                key,
+                lambda: self._generate_and_store(key, generate, topic),
+                group="lesson"
+            ))
+
+        sent: Dict[str, Any] = {}
+        try:
+            if feed is not None:
+                async with aclosing(feed.follow()) as sections:
+                    async for name, value in sections:
+                        sent[name] = value
+                        yield {"event": "section", "name": name, "value": value}
+
+            failed = None
+            try:
+                content = await flight
+            except GenerationError as e:
+                failed = e
+                content = self._last_good(key) or e.fallback
+
+            # Missing sections, and any the validation retry replaced
+            for name in LESSON_SECTIONS:
+                if name not in sent or sent[name] != content[name]:
+                    yield {"event": "section", "name": name, "value": content[name]}
+            fallback = failed is not None and content is failed.fallback
+            if fallback:
+                logger.warning(f"Serving uncached fallback sections for {key}")
+            yield {"event": "done", "cached": False, "fallback": fallback}
+        finally:
+            # A client leaving only cancels the generation if nobody else follows it
+            if not flight.done():
+                flight.cancel()
+
+    async def get_quiz(
+        self,
+        topic: Topic,
+        num_questions: int = DEFAULT_QUIZ_QUESTIONS,
+        regenerate: bool = False,
+        schedule: Optional[Scheduler] = None
+    ) -> Dict:
+        """Get a quiz for a topic"""
+        return await self._get_or_generate("quiz", topic, regenerate, schedule, num_questions=num_questions)
+
+    async def get_mini_game(
+        self,
+        topic: Topic,
+        regenerate: bool = False,
+        schedule: Optional[Scheduler] = None
+    ) -> Dict:
+        """Get a mini-game for a topic"""
+        return await self._get_or_generate("game", topic, regenerate, schedule)
+
+    async def _generate_bundle_and_store(self, topic: Topic, num_questions: int) -> Tuple[Dict, Dict]:
+        """Generate all kinds in one call and cache each; GenerationError propagates uncached"""
+        bundle, report = await self.generator.agenerate_bundle(
+            title=topic.title,
+            keywords=topic.keywords,
+            difficulty=topic.difficulty,
+            num_questions=num_questions,
+            strict=True
+        )
+        for kind in CONTENT_KINDS:
+            key, _ = self._plan(kind, topic, num_questions=num_questions)
+            self.cache.set(key, bundle[kind], tag=topic.id)
+        return bundle, report
+
+    def _serve_failed(self, content: Dict, sources: Dict[str, str], kind: str, key: str, fallback: Dict):
+        """Fill in a kind whose generation failed: last good content if cached, else fallback"""
+        last_good = self._last_good(key)
+        if last_good is not None:
+            content[kind] = last_good
+            sources[kind] = "stale"
+        else:
+            logger.warning(f"Serving uncached fallback content for {key}")
+            content[kind] = fallback
+            sources[kind] = "fallback"
+
+    async def get_bundle(
+        self,
+        topic: Topic,
+        num_questions: int = DEFAULT_QUIZ_QUESTIONS,
+        regenerate: bool = False,
+        schedule: Optional[Scheduler] = None
+    ) -> Dict:
+        """
+        Get the lesson, quiz and mini-game for a topic together
+
+        Cached kinds are served from cache (stale ones are refreshed per kind
+        through schedule). If two or more are missing, all three are generated
+        in one model call and each is cached under the key its own endpoint
+        uses; a single missing kind is generated on its own.
+
+        Returns:
+            {"lesson", "quiz", "game", "sources": {kind: "cache" | "bundle" |
+            "single" | "stale" | "fallback"}, "generation": bundle call report or None}
+        """
+        plans = {kind: self._plan(kind, topic, num_questions=num_questions) for kind in CONTENT_KINDS}
+        content: Dict = {}
+        sources: Dict[str, str] = {}
+
+        if not regenerate:
+            for kind, (key, _) in plans.items():
+                cached = self._cached(kind, topic, key, schedule, num_questions=num_questions)
+                if cached is not None:
+                    content[kind] = cached
+                    sources[kind] = "cache"
+        missing = [kind for kind in CONTENT_KINDS if kind not in content]
+
+        report = None
+        if len(missing) == 1:
+            kind = missing[0]
+            key, generate = plans[kind]
+            try:
+                content[kind] = await self.flights.do(
+                    key,
+                    lambda: self._generate_and_store(key, generate, topic),
+                    group=kind
+                )
+                sources[kind] = "single"
+            except GenerationError as e:
+                self._serve_failed(content, sources, kind, key, e.fallback)
+
+        elif missing:
+            bundle_key = self.cache_key(
+                "bundle",
+                title=topic.title,
+                keywords=topic.keywords,
+                difficulty=topic.difficulty,
+                num_questions=num_questions
+            )
+            try:
+                bundle, report = await self.flights.do(
+                    bundle_key,
+                    lambda: self._generate_bundle_and_store(topic, num_questions),
+                    group="bundle"
+                )
+                # The bundle replaced every kind in the cache, so serve all of it
+                content = {kind: bundle[kind] for kind in CONTENT_KINDS}
+                sources = {kind: "bundle" for kind in CONTENT_KINDS}
+            except GenerationError as e:
+                for kind in missing:
+                    key, _ = plans[kind]
+                    self._serve_failed(content, sources, kind, key, e.fallback[kind])
+
+        return {**content, "sources": sources, "generation": report}
+
+    def is_fresh(self, kind: str, topic: Topic, **params) -> bool:
+        """Whether fresh (not stale) content for the current model and prompt version is cached"""
+        key, _ = self._plan(kind, topic, **params)
+        return self.cache.contains(key)
+
+    async def warm(self, kind: str, topic: Topic, force: bool = False, **params) -> bool:
+        """
+        Make sure content is cached, generating it if needed
+
+        Args:
+            kind: lesson, quiz or game
+            topic: Topic to generate for
+            force: Regenerate even if a fresh entry exists
+
+        Returns:
+            True if content was generated, False if it was already fresh
+
+        Raises:
+            GenerationError: if the model could not produce valid content
+        """
+        key, generate = self._plan(kind, topic, **params)
+        if not force and self.cache.contains(key):
+            return False
+
+        await self.flights.do(
+            key,
+            lambda: self._generate_and_store(key, generate, topic),
+            group=kind
+        )
+        return True
+
+    def invalidate_topics(self, topics: Iterable[Topic]):
+        """Drop all cached content for topics whose title, keywords or difficulty changed"""
+        for topic in topics:
+            removed = self.cache.delete_tag(topic.id)
+            logger.info(f"Invalidated {removed} cached entries for changed topic: {topic.id}")
+
+    def stats(self) -> Dict:
+        """Cache and coalescing counters"""
+        return {
+            "cache": dict(self.cache.stats),
+            "generation": self.generator.generation_stats(),
+            "coalescing": {
+                "in_flight": self.flights.in_flight(),
+                **self.flights.totals(),
+                "by_kind": {kind: dict(c) for kind, c in self.flights.stats.items()}
+            }
+        }
+
+
+# Global lesson content service instance
+lesson_content = LessonContentService(ai_generator, content_cache)
+xml_parser.add_change_listener(lesson_content.invalidate_topics)
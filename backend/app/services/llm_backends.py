@@ -0,0 +1,367 @@
+"""
+LLM Backends
+The model behind AIContentGenerator, selected with settings.LLM_BACKEND:
+
+    gemini  Google Gemini (needs GEMINI_API_KEY)
+    stub    Deterministic local content with configurable latency and error
+            rates, for load-testing the lesson endpoints without the network
+
+Backends only move text; prompts, JSON parsing, retries on malformed output
+and rate limiting stay in AIContentGenerator and LLMScheduler.
+"""
+
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.services.llm_scheduler import estimate_tokens
+
+
+class LLMBackend(ABC):
+    """
+    Generates text for a prompt
+
+    Backends must implement generate, stream and count_tokens; a backend
+    missing one cannot be instantiated, so create_backend fails at startup.
+    """
+
+    name = ""
+
+    def __init__(self, model_name: str):
+        # Part of content cache keys, so content from different models never mixes
+        self.model_name = model_name
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> Tuple[str, Dict[str, int]]:
+        """
+        Run one call
+
+        Returns:
+            (response text, {"prompt_tokens", "completion_tokens"}); counts are 0 when unknown
+
+        Raises:
+            Exception: API errors carry their HTTP status in .code where known
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stream(self, prompt: str, usage: Dict[str, int]) -> AsyncIterator[str]:
+        """
+        Run one call, yielding text chunks as they arrive
+
+        Args:
+            prompt: Prompt text
+            usage: Filled with prompt_tokens and completion_tokens once known
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_tokens(self, text: str) -> int:
+        """Tokens text would use as a prompt for this model"""
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini through the google-generativeai SDK
+
+    Blocking SDK calls run on a bounded thread pool (GEMINI_MAX_CONCURRENCY)
+    so they never stall the event loop. Without an API key the backend still
+    loads, and every call fails, so callers serve their fallback content.
+    """
+
+    name = "gemini"
+
+    def __init__(
+        self,
+        api_key: str = settings.GEMINI_API_KEY,
+        model_name: str = settings.GEMINI_MODEL,
+        timeout: int = settings.GEMINI_TIMEOUT,
+        max_concurrency: int = settings.GEMINI_MAX_CONCURRENCY
+    ):
+        import google.generativeai as genai
+
+        super().__init__(model_name)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self.model = None
+        if not api_key:
+            logger.warning("⚠️  GEMINI_API_KEY is not set; lessons will be served with fallback content")
+            return
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        logger.success("✅ Gemini AI initialized successfully")
+
+    def _require_model(self):
+        if self.model is None:
+            raise RuntimeError("GEMINI_API_KEY is not set")
+
+    @staticmethod
+    def _usage(metadata) -> Dict[str, int]:
+        return {
+            "prompt_tokens": getattr(metadata, "prompt_token_count", 0) or 0,
+            "completion_tokens": getattr(metadata, "candidates_token_count", 0) or 0
+        }
+
+    async def generate(self, prompt: str) -> Tuple[str, Dict[str, int]]:
+        """
+        Run one call on the worker pool
+
+        The timeout covers queueing and generation. The SDK request carries the
+        same timeout so a worker thread is released even if the caller is
+        cancelled (e.g. the client disconnected) while the call is running.
+        """
+        self._require_model()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            self.model.generate_content,
+            prompt,
+            request_options={"timeout": self.timeout}
+        )
+        response = await asyncio.wait_for(
+            loop.run_in_executor(self._executor, call),
+            timeout=self.timeout
+        )
+        return response.text, self._usage(getattr(response, "usage_metadata", None))
+
+    async def stream(self, prompt: str, usage: Dict[str, int]) -> AsyncIterator[str]:
+        """
+        Stream one call from the worker pool
+
+        The timeout applies to the gap between chunks. Closing the iterator
+        (e.g. on client disconnect) stops the worker at the next chunk.
+        """
+        self._require_model()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stop = threading.Event()
+
+        def publish(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed; nobody is listening any more
+                pass
+
+        def produce():
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    stream=True,
+                    request_options={"timeout": self.timeout}
+                )
+                for chunk in response:
+                    if stop.is_set():
+                        break
+                    metadata = getattr(chunk, "usage_metadata", None)
+                    if metadata is not None:
+                        usage.update(self._usage(metadata))
+                    publish(chunk.text)
+            except Exception as e:
+                publish(e)
+            finally:
+                publish(finished)
+
+        loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item = await asyncio.wait_for(queue.get(), timeout=self.timeout)
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    async def count_tokens(self, text: str) -> int:
+        """Count on the worker pool, under the same timeout as a call"""
+        self._require_model()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.model.count_tokens, text, request_options={"timeout": self.timeout})
+        response = await asyncio.wait_for(loop.run_in_executor(self._executor, call), timeout=self.timeout)
+        return response.total_tokens
+
+
+class StubAPIError(Exception):
+    """Simulated API error; .code is the HTTP status, as on google.api_core errors"""
+
+    def __init__(self, code: int):
+        super().__init__(f"{code} simulated by the stub LLM backend")
+        self.code = code
+
+
+def parse_error_rates(value: str) -> Dict[str, float]:
+    """Parse "429:0.05,503:0.01,malformed:0.02" into {outcome: probability}"""
+    rates = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        outcome, _, probability = item.partition(":")
+        outcome = outcome.strip()
+        if outcome != "malformed" and not outcome.isdigit():
+            raise ValueError(f"Unknown stub error outcome: {outcome!r} (use an HTTP status or 'malformed')")
+        rates[outcome] = float(probability)
+    if sum(rates.values()) > 1:
+        raise ValueError("Stub error rates add up to more than 1")
+    return rates
+
+
+class StubBackend(LLMBackend):
+    """
+    Offline stand-in for the model
+
+    Answers each prompt with schema-valid content (lesson, quiz, mini-game or
+    bundle, recognised from the JSON shape the prompt asks for) built only
+    from the prompt, so the same prompt always gets the same content. Latency
+    is log-normal around a median, and each call fails with the configured
+    probabilities: HTTP statuses raise StubAPIError, "malformed" returns
+    truncated JSON. Latency and errors come from a seeded generator, so a run
+    with the same seed and call order behaves the same.
+    """
+
+    name = "stub"
+
+    # Characters per streamed chunk
+    CHUNK_SIZE = 80
+
+    def __init__(
+        self,
+        latency_median: float = settings.LLM_STUB_LATENCY_MEDIAN,
+        latency_sigma: float = settings.LLM_STUB_LATENCY_SIGMA,
+        error_rates: str = settings.LLM_STUB_ERROR_RATES,
+        seed: int = settings.LLM_STUB_SEED
+    ):
+        super().__init__("stub")
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rates = parse_error_rates(error_rates)
+        self._random = random.Random(seed)
+        logger.info(
+            f"🧪 Using stub LLM backend (median latency {latency_median}s, "
+            f"errors {self.error_rates or 'none'})"
+        )
+
+    def _latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self._random.lognormvariate(0, self.latency_sigma) * self.latency_median
+
+    def _outcome(self) -> str:
+        roll = self._random.random()
+        for outcome, probability in self.error_rates.items():
+            if roll < probability:
+                return outcome
+            roll -= probability
+        return "ok"
+
+    @staticmethod
+    def _topic(prompt: str) -> str:
+        match = re.search(r"(?:Topic|topic|practice):\s*(.+)", prompt)
+        return match.group(1).strip() if match else "this topic"
+
+    @staticmethod
+    def _lesson(topic: str, digest: str) -> Dict:
+        return {
+            "explanation": f"{topic} is explained here in simple words (stub content {digest}).",
+            "analogy": f"Learning {topic} is like learning a recipe: follow the steps in order.",
+            "why_it_matters": f"{topic} shows up in almost every real program.",
+            "code_example": f"# {topic}\nvalue = 42\nprint(value)",
+            "breakdown": ["value = 42 stores a number", "print(value) shows it"],
+            "common_mistakes": ["Forgetting to save the file", "Mixing tabs and spaces", "Misspelling names"],
+            "practice_challenge": {
+                "description": f"Print the number 42 using what you learned about {topic}.",
+                "starter_code": "# Your code here\n",
+                "expected_output": "42"
+            }
+        }
+
+    @staticmethod
+    def _quiz(topic: str, num_questions: int) -> Dict:
+        return {
+            "questions": [
+                {
+                    "question": f"Question {i + 1} about {topic}: which option is correct?",
+                    "options": {"A": "This one", "B": "Not this", "C": "Nor this", "D": "None of them"},
+                    "correct_answer": "A",
+                    "explanation": "The stub backend always marks option A as correct."
+                }
+                for i in range(num_questions)
+            ]
+        }
+
+    @staticmethod
+    def _game(topic: str) -> Dict:
+        return {
+            "game_name": f"{topic} Challenge",
+            "description": f"Answer quick questions about {topic} to score points.",
+            "instructions": ["Read the question", "Type your answer", "Score a point for each correct answer"],
+            "starter_code": "score = 0\nprint('Score:', score)",
+            "learning_goal": f"Practice {topic}"
+        }
+
+    def _content(self, prompt: str) -> Dict:
+        topic = self._topic(prompt)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        match = re.search(r"(\d+) multiple-choice", prompt)
+        num_questions = int(match.group(1)) if match else 5
+
+        if '"lesson":' in prompt:
+            return {
+                "lesson": self._lesson(topic, digest),
+                "quiz": self._quiz(topic, num_questions),
+                "game": self._game(topic)
+            }
+        if '"questions":' in prompt:
+            return self._quiz(topic, num_questions)
+        if '"game_name":' in prompt:
+            return self._game(topic)
+        return self._lesson(topic, digest)
+
+    def _respond(self, prompt: str) -> Tuple[str, Dict[str, int]]:
+        outcome = self._outcome()
+        if outcome.isdigit():
+            raise StubAPIError(int(outcome))
+        text = json.dumps(self._content(prompt), ensure_ascii=False)
+        if outcome == "malformed":
+            text = text[:len(text) // 2]
+        return text, {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+
+    async def generate(self, prompt: str) -> Tuple[str, Dict[str, int]]:
+        await asyncio.sleep(self._latency())
+        return self._respond(prompt)
+
+    async def stream(self, prompt: str, usage: Dict[str, int]) -> AsyncIterator[str]:
+        latency = self._latency()
+        text, call_usage = self._respond(prompt)
+        chunks = [text[i:i + self.CHUNK_SIZE] for i in range(0, len(text), self.CHUNK_SIZE)]
+        # Time to first chunk is a third of the latency; the rest is spread over the chunks
+        await asyncio.sleep(latency / 3)
+        for i, chunk in enumerate(chunks):
+            if i == len(chunks) - 1:
+                usage.update(call_usage)
+            yield chunk
+            await asyncio.sleep(latency * 2 / 3 / len(chunks))
+
+    async def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+
+BACKENDS = {"gemini": GeminiBackend, "stub": StubBackend}
+
+
+def create_backend(name: str = settings.LLM_BACKEND) -> LLMBackend:
+    """Backend named by settings.LLM_BACKEND"""
+    backend = BACKENDS.get(name.lower())
+    if backend is None:
+        raise ValueError(f"Unknown LLM_BACKEND: {name!r} (choose from {', '.join(BACKENDS)})")
+    return backend()
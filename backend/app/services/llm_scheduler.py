@@ -0,0 +1,321 @@
+"""
+LLM Call Scheduler
+Rate limiting, retries and accounting for model calls
+
+Every call first takes one request and an estimate of its tokens from two
+token buckets (requests/minute and tokens/minute); the estimate is corrected
+from the usage the API reports once the call returns. Callers waiting for
+capacity are served interactive first, then background (cache warming), in
+arrival order within each priority. Rate-limit (429) and server (5xx) errors
+are retried with jittered exponential backoff, and a 429 pauses every caller
+for the backoff period, not just the one that received it.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from app.core.config import settings
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Per-call records kept for the metrics endpoint
+RECENT_CALLS = 100
+
+# Priority of model calls made from the current context. Coalesced calls run
+# in a task created by the first caller, so they keep that caller's priority.
+call_priority: ContextVar[int] = ContextVar("call_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """Run model calls made inside the block at background priority"""
+    token = call_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        call_priority.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for scheduling"""
+    return len(text) // 4 + 1
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status carried by an API error (google.api_core errors set .code), or None"""
+    status = getattr(error, "code", None)
+    if status is None:
+        status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = error_status(error)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 per second up to one minute's worth
+
+    A rate of 0 means unlimited. The level may go negative when a call turns
+    out to use more than was reserved for it; later callers wait off the debt.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(0, per_minute))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity == 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (a call bigger than the bucket waits for a full one)"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self._refill()
+            self.level -= amount
+
+    def status(self) -> Dict:
+        if self.unlimited:
+            return {"per_minute": 0, "available": None}
+        self._refill()
+        return {"per_minute": int(self.capacity), "available": round(self.level, 1)}
+
+
+class LLMScheduler:
+    """Admits model calls within the configured limits and records what each one cost"""
+
+    def __init__(
+        self,
+        requests_per_minute: int = settings.GEMINI_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = settings.GEMINI_TOKENS_PER_MINUTE,
+        max_retries: int = settings.GEMINI_MAX_RETRIES,
+        base_delay: float = settings.GEMINI_RETRY_BASE_DELAY,
+        max_delay: float = settings.GEMINI_RETRY_MAX_DELAY
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._changed: Optional[asyncio.Condition] = None
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self.recent: deque = deque(maxlen=RECENT_CALLS)
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so the scheduler binds to the running event loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _wait_time(self, tokens: int) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens)
+        )
+
+    async def acquire(self, tokens: int, priority: int = INTERACTIVE) -> float:
+        """
+        Wait for capacity for one call
+
+        Args:
+            tokens: Estimated prompt + completion tokens
+            priority: INTERACTIVE or BACKGROUND
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiting, ticket)
+        changed = self._condition()
+        try:
+            # Checked under the lock so a notify between check and wait is not lost
+            async with changed:
+                while True:
+                    wait = None
+                    if self._waiting[0] == ticket:
+                        wait = self._wait_time(tokens)
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            return time.monotonic() - start
+                    try:
+                        await asyncio.wait_for(changed.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            async with changed:
+                changed.notify_all()
+
+    def settle(self, reserved: int, used: int):
+        """Correct a reservation once the real token count is known"""
+        if used:
+            self.tokens.take(used - reserved)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _totals(self, kind: str) -> Dict[str, float]:
+        return self.totals.setdefault(kind, {
+            "calls": 0, "attempts": 0, "failures": 0, "rate_limited": 0, "server_errors": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0, "queued": 0.0
+        })
+
+    def _count_error(self, kind: str, status: Optional[int]):
+        if status == 429:
+            self._totals(kind)["rate_limited"] += 1
+        elif status is not None and status >= 500:
+            self._totals(kind)["server_errors"] += 1
+
+    def _record(self, kind: str, priority: int, usage: Dict[str, int], latency: float, queued: float,
+                attempts: int, status: str):
+        totals = self._totals(kind)
+        totals["calls"] += 1
+        totals["attempts"] += attempts
+        totals["failures"] += status == "error"
+        totals["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        totals["completion_tokens"] += usage.get("completion_tokens", 0)
+        totals["latency"] += latency
+        totals["queued"] += queued
+        self.recent.append({
+            "at": time.time(),
+            "kind": kind,
+            "priority": PRIORITY_NAMES[priority],
+            "status": status,
+            "attempts": attempts,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "latency": round(latency, 3),
+            "queued": round(queued, 3)
+        })
+
+    def _reservation(self, prompt: str) -> int:
+        return estimate_tokens(prompt) + settings.GEMINI_COMPLETION_TOKEN_ESTIMATE
+
+    async def call(
+        self,
+        kind: str,
+        prompt: str,
+        fn: Callable[[], Awaitable[Tuple[str, Dict[str, int]]]]
+    ) -> Tuple[str, Dict[str, int]]:
+        """
+        Run one model call within the limits, retrying rate-limit and server errors
+
+        Args:
+            kind: Label for the metrics (lesson, quiz, ...)
+            prompt: Prompt text, used to estimate the tokens to reserve
+            fn: Zero-argument coroutine function making the call and returning
+                (text, {"prompt_tokens", "completion_tokens"})
+
+        Returns:
+            Result of fn
+        """
+        priority = call_priority.get()
+        reserved = self._reservation(prompt)
+        start = time.monotonic()
+        queued = 0.0
+        attempt = 0
+        while True:
+            queued += await self.acquire(reserved, priority)
+            attempt += 1
+            try:
+                text, usage = await fn()
+            except Exception as e:
+                status = error_status(e)
+                self._count_error(kind, status)
+                if not is_retryable(e) or attempt > self.max_retries:
+                    self._record(kind, priority, {}, time.monotonic() - start, queued, attempt, "error")
+                    raise
+                delay = self._backoff(attempt - 1)
+                if status == 429:
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                logger.warning(f"⏳ Model call for {kind} failed with {status}, retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.settle(reserved, usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+            self._record(kind, priority, usage, time.monotonic() - start, queued, attempt, "ok")
+            return text, usage
+
+    @asynccontextmanager
+    async def streaming(self, kind: str, prompt: str) -> AsyncIterator[Dict[str, int]]:
+        """
+        Admit one streamed model call
+
+        Streams are not retried, since part of the response may already have
+        been sent. The caller fills in the yielded dict with the usage the
+        API reports so it can be settled and recorded on exit.
+        """
+        priority = call_priority.get()
+        reserved = self._reservation(prompt)
+        start = time.monotonic()
+        queued = await self.acquire(reserved, priority)
+        usage: Dict[str, int] = {}
+        status = "cancelled"
+        try:
+            yield usage
+            status = "ok"
+        except Exception as e:
+            status = "error"
+            self._count_error(kind, error_status(e))
+            raise
+        finally:
+            if status == "cancelled" and usage:
+                # Closed by the consumer, but only after the final chunk arrived
+                status = "ok"
+            self.settle(reserved, usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+            self._record(kind, priority, usage, time.monotonic() - start, queued, 1, status)
+
+    def metrics(self) -> Dict:
+        """Limits, current capacity, per-kind totals and the most recent calls"""
+        by_kind = {}
+        for kind, totals in self.totals.items():
+            calls = totals["calls"] or 1
+            by_kind[kind] = {
+                **totals,
+                "avg_latency": totals["latency"] / calls,
+                "avg_queued": totals["queued"] / calls
+            }
+        return {
+            "requests_per_minute": self.requests.status(),
+            "tokens_per_minute": self.tokens.status(),
+            "waiting": {
+                name: sum(1 for priority, _ in self._waiting if priority == level)
+                for level, name in PRIORITY_NAMES.items()
+            },
+            "paused_for": max(0.0, round(self._paused_until - time.monotonic(), 3)),
+            "by_kind": by_kind,
+            "recent": list(self.recent)
+        }
@@ -0,0 +1,198 @@
+"""
+Code Pre-flight
+Static checks on Python submissions before a process is spent on them:
+syntax errors, modules and builtins the policy forbids, and loops that can
+obviously never end
+
+These checks answer common mistakes instantly; they are not a security
+boundary. The sandbox limits still apply to everything that does run.
+"""
+
+import ast
+import traceback
+from typing import Dict, Iterator, List, Optional, Set
+from app.core.config import settings
+from app.services.sandbox_worker import FILENAME
+
+
+# Calls that cannot end a loop or change its condition. Anything else might
+# (raise, exit, read input until EOF, mutate state), so loops calling it are
+# given the benefit of the doubt.
+INERT_CALLS = {
+    "print", "len", "str", "int", "float", "bool", "abs", "min", "max", "sum",
+    "round", "repr", "format", "range", "sleep", "append", "upper", "lower"
+}
+# itertools iterators that never run out (repeat only without a count)
+ENDLESS_ITERATORS = {"count", "cycle", "repeat"}
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _call_name(call: ast.Call) -> Optional[str]:
+    func = call.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _walk_scope(node: ast.AST) -> Iterator[ast.AST]:
+    """Like ast.walk, but does not descend into nested functions, lambdas or classes"""
+    for child in ast.iter_child_nodes(node):
+        yield child
+        if not isinstance(child, SCOPE_NODES):
+            yield from _walk_scope(child)
+
+
+def _can_leave(loop: ast.AST) -> bool:
+    """Whether anything in the loop body might end it"""
+    def visit(node: ast.AST, nested_loop: bool) -> bool:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, SCOPE_NODES):
+                continue
+            if isinstance(child, ast.Break) and not nested_loop:
+                return True
+            if isinstance(child, (ast.Return, ast.Raise, ast.Yield, ast.YieldFrom, ast.Await, ast.Assert)):
+                return True
+            if isinstance(child, ast.Call) and _call_name(child) not in INERT_CALLS:
+                return True
+            if visit(child, nested_loop or isinstance(child, (ast.While, ast.For, ast.AsyncFor))):
+                return True
+        return False
+
+    return visit(ast.Module(body=loop.body, type_ignores=[]), False)
+
+
+def _changed_names(loop: ast.AST) -> Set[str]:
+    """Names the loop body rebinds or mutates (x = ..., x[i] = ..., x.append(...))"""
+    changed = set()
+    for node in _walk_scope(loop):
+        target = None
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            target = node
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            target = node.value
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            target = node.func.value
+        while isinstance(target, (ast.Attribute, ast.Subscript)):
+            target = target.value
+        if isinstance(target, ast.Name):
+            changed.add(target.id)
+    return changed
+
+
+def _endless_reason(loop: ast.AST) -> Optional[str]:
+    """Why a loop can never finish on its own, or None"""
+    if isinstance(loop, ast.While):
+        test = loop.test
+        if isinstance(test, ast.Constant):
+            return "nothing inside it can stop it (add a break or change its condition)" if test.value else None
+        if any(isinstance(node, (ast.Call, ast.NamedExpr, ast.Await)) for node in ast.walk(test)):
+            return None
+        names = sorted({node.id for node in ast.walk(test) if isinstance(node, ast.Name)})
+        if names and not set(names) & _changed_names(loop):
+            listed = ", ".join(f"'{name}'" for name in names)
+            return f"its condition uses {listed}, which nothing inside the loop changes"
+        return None
+
+    if isinstance(loop, ast.For) and isinstance(loop.iter, ast.Call):
+        name = _call_name(loop.iter)
+        if name == "repeat" and (len(loop.iter.args) > 1 or loop.iter.keywords):
+            return None
+        if name in ENDLESS_ITERATORS:
+            return f"{name}() never runs out (add a break)"
+    return None
+
+
+class CodePreflight:
+    """Policy checks on Python source, configured from settings"""
+
+    def __init__(
+        self,
+        forbidden_modules: str = settings.PREFLIGHT_FORBIDDEN_MODULES,
+        forbidden_builtins: str = settings.PREFLIGHT_FORBIDDEN_BUILTINS,
+        reject_endless_loops: bool = settings.PREFLIGHT_REJECT_ENDLESS_LOOPS
+    ):
+        self.forbidden_modules = set(_split(forbidden_modules))
+        self.forbidden_builtins = set(_split(forbidden_builtins))
+        self.reject_endless_loops = reject_endless_loops
+        self.stats = {"checked": 0, "syntax_errors": 0, "forbidden": 0, "endless_loops": 0}
+
+    def check(self, code: str, endless_loops: bool = True) -> Optional[str]:
+        """
+        Check a submission
+
+        Args:
+            code: Python source
+            endless_loops: Whether to reject loops that never end. Interactive
+                sessions pass False: there the learner stops the run, so a
+                loop that prints and sleeps forever is legitimate
+
+        Returns:
+            Error text for the response (same shape as the interpreter's own
+            syntax error output), or None if the code should run
+        """
+        self.stats["checked"] += 1
+        try:
+            tree = ast.parse(code, FILENAME)
+            # Second pass catches what the parser accepts but the compiler does not
+            # ('return' outside function, misplaced nonlocal, ...)
+            compile(tree, FILENAME, "exec")
+        except (SyntaxError, ValueError) as e:
+            self.stats["syntax_errors"] += 1
+            return "".join(traceback.format_exception_only(type(e), e))
+
+        problem = self._forbidden(tree)
+        if problem:
+            self.stats["forbidden"] += 1
+            return problem
+
+        if self.reject_endless_loops and endless_loops:
+            problem = self._endless_loop(tree)
+            if problem:
+                self.stats["endless_loops"] += 1
+                return problem
+        return None
+
+    def _forbidden(self, tree: ast.AST) -> Optional[str]:
+        for node in ast.walk(tree):
+            modules = []
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            for module in modules:
+                if module.split(".")[0] in self.forbidden_modules:
+                    return f"🚫 Importing '{module}' is not allowed here (line {node.lineno})"
+
+            if isinstance(node, ast.Name) and node.id in self.forbidden_builtins:
+                return f"🚫 Using '{node.id}' is not allowed here (line {node.lineno})"
+        return None
+
+    def _endless_loop(self, tree: ast.AST) -> Optional[str]:
+        scopes = [tree] + [
+            node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
+        for scope in scopes:
+            for node in _walk_scope(scope):
+                if not isinstance(node, (ast.While, ast.For)) or _can_leave(node):
+                    continue
+                reason = _endless_reason(node)
+                if reason:
+                    return f"⏱️ The loop on line {node.lineno} never ends: {reason}"
+        return None
+
+    def status(self) -> Dict:
+        return {
+            "forbidden_modules": sorted(self.forbidden_modules),
+            "forbidden_builtins": sorted(self.forbidden_builtins),
+            **self.stats
+        }
+
+
+# Global pre-flight instance
+code_preflight = CodePreflight()
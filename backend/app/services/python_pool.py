@@ -0,0 +1,389 @@
+"""
+Python Worker Pool
+Keeps warm, pre-imported Python interpreters ready for code execution so a
+submission does not pay interpreter startup on every run
+"""
+
+import asyncio
+import json
+import struct
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set
+from loguru import logger
+from app.core.config import settings
+from app.services.sandbox import sandbox_env, scratch_dir, scratch_root
+
+
+WORKER_SCRIPT = Path(__file__).with_name("sandbox_worker.py")
+HEADER = struct.Struct(">I")
+
+# Extra time a worker gets beyond the run timeout to report back before it is
+# considered hung (the worker enforces the run timeout itself)
+WORKER_GRACE = 2.0
+SPAWN_RETRY_DELAY = 1.0
+
+
+class WorkerCrashed(Exception):
+    """A worker process died, hung or broke the request protocol"""
+
+
+class PythonWorker:
+    """One warm interpreter process (see sandbox_worker.py)"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.runs = 0
+        self.info: Dict = {}
+
+    @classmethod
+    async def spawn(cls) -> "PythonWorker":
+        """Start a worker and wait until it has finished importing"""
+        # Same environment as one-shot runs: no server secrets, and no access
+        # to the server's working directory through relative paths
+        home = scratch_root() or tempfile.gettempdir()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", str(WORKER_SCRIPT),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=sandbox_env(home),
+            cwd=home,
+            # Own session: Ctrl+C on the server must not hit workers mid-run
+            start_new_session=True
+        )
+        worker = cls(process)
+        try:
+            worker.info = await asyncio.wait_for(worker._read_frame(), timeout=30)
+        except BaseException:
+            worker.kill()
+            raise
+        return worker
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    async def request(self, message: Dict, timeout: float) -> Dict:
+        """
+        Send one request and wait for its result
+
+        Raises:
+            WorkerCrashed: if the worker exits, hangs past timeout or sends garbage
+        """
+        await self.send(message)
+        return await self.read(timeout)
+
+    async def send(self, message: Dict):
+        """Write one frame to the worker"""
+        body = json.dumps(message, ensure_ascii=False).encode("utf-8")
+        try:
+            self.process.stdin.write(HEADER.pack(len(body)) + body)
+            await self.process.stdin.drain()
+        except ConnectionError as e:
+            raise WorkerCrashed(f"worker {self.pid} failed: {str(e) or type(e).__name__}")
+
+    async def read(self, timeout: float) -> Dict:
+        """Wait for the next frame from the worker"""
+        try:
+            return await asyncio.wait_for(self._read_frame(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise WorkerCrashed(f"worker {self.pid} did not answer within {timeout:.1f}s")
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            raise WorkerCrashed(f"worker {self.pid} failed: {str(e) or type(e).__name__}")
+
+    async def _read_frame(self) -> Dict:
+        header = await self.process.stdout.readexactly(HEADER.size)
+        body = await self.process.stdout.readexactly(HEADER.unpack(header)[0])
+        return json.loads(body.decode("utf-8"))
+
+    def terminate(self):
+        """Stop the worker now, together with any submission it is running"""
+        if self.process.returncode is None:
+            try:
+                self.process.terminate()
+            except ProcessLookupError:
+                pass
+
+    def kill(self):
+        if self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def close(self):
+        """Ask the worker to exit (EOF on its channel), killing it if it lingers"""
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=2)
+        except Exception:
+            self.kill()
+            await self.process.wait()
+
+
+class RunSession:
+    """
+    An interactive run on one worker: output arrives as it is produced and
+    stdin can be sent while the program is running
+
+    Usage:
+        async with pool.session(code) as session:
+            async for event in session.events():
+                ...  # {"type": "stdout" | "stderr", "data": str}
+            session.result  # Same shape as PythonWorkerPool.run()
+    """
+
+    def __init__(self, worker: PythonWorker, timeout: float):
+        self.worker = worker
+        self.timeout = timeout
+        self.result: Optional[Dict] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None
+
+    async def events(self) -> AsyncIterator[Dict]:
+        """Output frames until the run finishes; the final frame is kept as result"""
+        while self.result is None:
+            frame = await self.worker.read(self.timeout)
+            if frame.get("type") == "result":
+                self.result = frame
+            else:
+                yield frame
+
+    async def send_stdin(self, data: str):
+        if not self.finished:
+            await self.worker.send({"type": "stdin", "data": data})
+
+    async def close_stdin(self):
+        if not self.finished:
+            await self.worker.send({"type": "stdin_eof"})
+
+    async def cancel(self):
+        """Stop the program; events() then ends with a cancelled result"""
+        if not self.finished:
+            await self.worker.send({"type": "cancel"})
+
+
+class PythonWorkerPool:
+    """
+    Fixed-size pool of warm Python workers
+
+    Each worker forks a fresh child per submission, so runs never share
+    globals or interpreter state. Workers are still replaced after
+    max_runs submissions, and immediately when one crashes, hangs or a
+    run is cancelled part-way.
+    """
+
+    def __init__(self, size: int = settings.SANDBOX_POOL_SIZE, max_runs: int = settings.SANDBOX_POOL_MAX_RUNS):
+        self.size = size
+        self.max_runs = max_runs
+        self.stats = {"runs": 0, "spawned": 0, "recycled": 0, "crashed": 0}
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: Set[PythonWorker] = set()
+        self._spawning: Set[asyncio.Task] = set()
+        self._closing: Set[asyncio.Task] = set()
+        self._closed = False
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def start(self):
+        """Spawn the workers (idempotent)"""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        self._closed = False
+        await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+        logger.success(f"✅ Python worker pool ready with {len(self._workers)} workers")
+
+    async def _spawn(self):
+        """Start one worker and make it available, retrying until it comes up"""
+        delay = SPAWN_RETRY_DELAY
+        while not self._closed:
+            try:
+                worker = await PythonWorker.spawn()
+            except Exception as e:
+                logger.error(f"❌ Failed to start Python worker: {e}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+
+            self.stats["spawned"] += 1
+            self._workers.add(worker)
+            self._idle.put_nowait(worker)
+            return
+
+    def _replace(self, worker: PythonWorker, crashed: bool):
+        """Retire a worker and start its replacement in the background"""
+        self._workers.discard(worker)
+        self.stats["crashed" if crashed else "recycled"] += 1
+
+        if crashed:
+            worker.terminate()
+        task = asyncio.create_task(worker.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+        if not self._closed:
+            task = asyncio.create_task(self._spawn())
+            self._spawning.add(task)
+            task.add_done_callback(self._spawning.discard)
+
+    async def run(
+        self,
+        code: str,
+        stdin: Optional[str] = None,
+        timeout: float = 5,
+        limits: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Run Python code on the next free worker
+
+        Args:
+            code: Source code to run as __main__
+            stdin: Text fed to the program's standard input
+            timeout: Wall-clock limit in seconds
+            limits: Resource limits applied to the run (see sandbox_worker)
+
+        Returns:
+            stdout, stderr, exit_code, timed_out, wall_time, cpu_time, max_rss_kb
+
+        Raises:
+            WorkerCrashed: if the worker failed while running the code
+        """
+        return await self._request(
+            {"code": code, "stdin": stdin, "timeout": timeout, "limits": limits or {}},
+            timeout + WORKER_GRACE
+        )
+
+    async def run_tests(
+        self,
+        code: str,
+        cases: List[Dict],
+        timeout: float = 5,
+        limits: Optional[Dict] = None,
+        stop_on_failure: bool = False
+    ) -> List[Dict]:
+        """
+        Run Python code against several test cases on one worker
+
+        Args:
+            code: Source code to run as __main__
+            cases: Dicts with "stdin" and "expected_output"
+            timeout: Wall-clock limit per case in seconds
+            limits: Resource limits applied to each case
+            stop_on_failure: Skip the remaining cases after the first failure
+
+        Returns:
+            One run() result per executed case, each with "passed"
+
+        Raises:
+            WorkerCrashed: if the worker failed while running the code
+        """
+        result = await self._request(
+            {
+                "code": code, "cases": cases, "timeout": timeout,
+                "limits": limits or {}, "stop_on_failure": stop_on_failure
+            },
+            timeout * len(cases) + WORKER_GRACE
+        )
+        return result["cases"]
+
+    async def _request(self, message: Dict, timeout: float) -> Dict:
+        """Send one request to the next free worker and wait for its result"""
+        await self.start()
+        worker = await self._idle.get()
+
+        # Each submission runs in its own scratch directory (see sandbox_worker._child)
+        with scratch_dir() as workdir:
+            try:
+                result = await worker.request({**message, "workdir": workdir}, timeout)
+            except BaseException as e:
+                # Includes cancellation: the worker's state is unknown mid-request
+                logger.warning(f"Python worker {worker.pid} discarded: {str(e) or type(e).__name__}")
+                self._replace(worker, crashed=True)
+                raise
+
+        self._release(worker)
+        return result
+
+    @asynccontextmanager
+    async def session(
+        self,
+        code: str,
+        stdin: Optional[str] = None,
+        timeout: float = 5,
+        limits: Optional[Dict] = None
+    ) -> AsyncIterator[RunSession]:
+        """
+        Start an interactive run on the next free worker
+
+        Args are as for run(). stdin stays open for send_stdin() until
+        close_stdin(). Leaving the block before the run has finished cancels it.
+
+        Raises:
+            WorkerCrashed: if the worker failed while running the code
+        """
+        await self.start()
+        worker = await self._idle.get()
+        session = RunSession(worker, timeout + WORKER_GRACE)
+
+        with scratch_dir() as workdir:
+            try:
+                await worker.send({
+                    "code": code, "stdin": stdin, "timeout": timeout,
+                    "limits": limits or {}, "stream": True, "workdir": workdir
+                })
+                yield session
+                if not session.finished:
+                    await session.cancel()
+                    async for _ in session.events():
+                        pass
+            except BaseException as e:
+                logger.warning(f"Python worker {worker.pid} discarded: {str(e) or type(e).__name__}")
+                self._replace(worker, crashed=True)
+                raise
+
+        self._release(worker)
+
+    def _release(self, worker: PythonWorker):
+        """Return a worker after a completed run, recycling it at max_runs"""
+        self.stats["runs"] += 1
+        worker.runs += 1
+        if worker.runs >= self.max_runs:
+            self._replace(worker, crashed=False)
+        else:
+            self._idle.put_nowait(worker)
+
+    def status(self) -> Dict:
+        """Pool size, idle workers and lifetime counters"""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            **self.stats
+        }
+
+    async def close(self):
+        """Stop all workers"""
+        self._closed = True
+        for task in list(self._spawning):
+            task.cancel()
+        await asyncio.gather(
+            *(worker.close() for worker in list(self._workers)),
+            *list(self._closing),
+            return_exceptions=True
+        )
+        self._workers.clear()
+        self._idle = None
+
+
+# Global Python worker pool instance: SANDBOX_POOL_SIZE workers for batch runs
+# plus one per interactive session, so sessions idling at input() never leave
+# /execute and /run-tests waiting for a worker
+python_pool = PythonWorkerPool(
+    size=settings.SANDBOX_POOL_SIZE + settings.SANDBOX_INTERACTIVE_MAX_SESSIONS if settings.SANDBOX_POOL_SIZE > 0 else 0
+)
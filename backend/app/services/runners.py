@@ -0,0 +1,337 @@
+"""
+Language Runners
+Sandboxed runners for the languages in ALLOWED_LANGUAGES besides Python
+(Python runs on the warm worker pool, see python_pool.py)
+
+Every runner goes through sandbox.run_process, so all languages share the
+same limits. Compiled languages keep their build output in a cache keyed by
+a hash of the toolchain, flags and source, so re-running unchanged code
+skips compilation.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.services.sandbox import run_process, sandbox_env, scratch_dir, SandboxLimits
+from app.services.single_flight import SingleFlight
+
+
+# Build output may be much larger than what a submission is allowed to write
+COMPILE_MAX_FILE_BYTES = 64 * 1024 * 1024
+
+
+class CompileCache:
+    """
+    Directory of build outputs, one subdirectory per source hash
+
+    Entries are written to a temporary directory and renamed into place, so a
+    reader never sees a half-written build. The least recently used entries
+    are removed beyond max_entries.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.COMPILE_CACHE_DIR,
+        max_entries: int = settings.COMPILE_CACHE_MAX_ENTRIES
+    ):
+        self.directory = Path(directory).resolve()
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "compiled": 0, "failed": 0, "evicted": 0}
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self.directory / key
+        if not path.is_dir():
+            self.stats["misses"] += 1
+            return None
+        # Directory mtime doubles as the last-used time for eviction
+        os.utime(path)
+        self.stats["hits"] += 1
+        return path
+
+    def new_build_dir(self) -> Path:
+        """Scratch directory on the cache's filesystem, so store() can rename it"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix=".build-", dir=self.directory))
+
+    def store(self, key: str, build_dir: Path) -> Path:
+        path = self.directory / key
+        try:
+            os.replace(build_dir, path)
+        except OSError:
+            # Another process stored the same build first
+            shutil.rmtree(build_dir, ignore_errors=True)
+        self.stats["compiled"] += 1
+        self._prune()
+        return path
+
+    def _prune(self):
+        cutoff = time.time() - 3600
+        for path in self.directory.glob(".build-*"):
+            # Left behind by a server that died mid-compile
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+        entries = [p for p in self.directory.iterdir() if p.is_dir() and not p.name.startswith(".")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda p: p.stat().st_mtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            shutil.rmtree(path, ignore_errors=True)
+            self.stats["evicted"] += 1
+
+    def status(self) -> Dict:
+        return {"directory": str(self.directory), **self.stats}
+
+
+class Runner(ABC):
+    """
+    Runs one language under the sandbox limits
+
+    Subclasses implement run; a runner missing it cannot be instantiated, so
+    registering it fails at import rather than on a student's first run.
+    """
+
+    language = ""
+    executable = ""
+
+    def __init__(self):
+        self._version: Optional[str] = None
+
+    def available(self) -> bool:
+        return shutil.which(self.executable) is not None
+
+    def version_argv(self) -> List[str]:
+        return [self.executable, "--version"]
+
+    async def version(self) -> str:
+        """Toolchain identification, used in cache keys"""
+        if self._version is None:
+            completed = await asyncio.to_thread(
+                subprocess.run, self.version_argv(), capture_output=True, text=True, timeout=30
+            )
+            self._version = (completed.stdout or completed.stderr).strip().splitlines()[0]
+        return self._version
+
+    def run_limits(self, limits: SandboxLimits) -> SandboxLimits:
+        return limits
+
+    @abstractmethod
+    async def run(self, code: str, stdin: Optional[str], limits: SandboxLimits) -> Dict:
+        """
+        Run a submission
+
+        Returns:
+            sandbox.run_process result plus compile_time (None for interpreted
+            languages), compile_cached and compile_error
+        """
+        raise NotImplementedError
+
+
+class NodeRunner(Runner):
+    language = "javascript"
+    executable = "node"
+
+    def run_limits(self, limits: SandboxLimits) -> SandboxLimits:
+        # V8 reserves far more address space than it uses; cap the heap instead
+        return limits._replace(memory_bytes=0)
+
+    async def run(self, code: str, stdin: Optional[str], limits: SandboxLimits) -> Dict:
+        heap_mb = max(16, limits.memory_bytes // (1024 * 1024))
+        with scratch_dir() as workdir:
+            Path(workdir, "main.js").write_text(code, encoding="utf-8")
+            result = await run_process(
+                [self.executable, f"--max-old-space-size={heap_mb}", "main.js"],
+                self.run_limits(limits),
+                stdin=stdin,
+                env=sandbox_env(workdir),
+                cwd=workdir
+            )
+        return {**result, "compile_time": None, "compile_cached": False, "compile_error": False}
+
+
+class CompiledRunner(Runner):
+    """
+    Compiles into the compile cache, then runs the cached build in a scratch directory
+    Subclasses implement source_name, compile_argv and run_argv
+    """
+
+    flags: Tuple[str, ...] = ()
+
+    def __init__(self, cache: CompileCache, flights: SingleFlight):
+        super().__init__()
+        self.cache = cache
+        self.flights = flights
+
+    @abstractmethod
+    def source_name(self, code: str) -> str:
+        """File name the source is written to in the build directory"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def compile_argv(self, source: str) -> List[str]:
+        """Compiler command line, run in the build directory"""
+        raise NotImplementedError
+
+    def compile_limits(self, limits: SandboxLimits) -> SandboxLimits:
+        return limits._replace(
+            timeout=settings.SANDBOX_COMPILE_TIMEOUT,
+            cpu_seconds=settings.SANDBOX_COMPILE_TIMEOUT + 1,
+            memory_bytes=settings.SANDBOX_COMPILE_MEMORY_MB * 1024 * 1024,
+            max_file_bytes=COMPILE_MAX_FILE_BYTES
+        )
+
+    @abstractmethod
+    def run_argv(self, build: Path, code: str, limits: SandboxLimits) -> List[str]:
+        """Command line that runs the build"""
+        raise NotImplementedError
+
+    async def cache_key(self, code: str) -> str:
+        payload = "\0".join((self.language, await self.version(), *self.flags, code))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def compile(self, code: str, limits: SandboxLimits) -> Tuple[Optional[Path], Optional[Dict], bool]:
+        """
+        Build the source, or reuse the cached build
+
+        Returns:
+            (build directory, None, cached) on success, (None, compiler result, False) on failure
+        """
+        key = await self.cache_key(code)
+        build = self.cache.lookup(key)
+        if build is not None:
+            return build, None, True
+        # Identical submissions arriving together compile once
+        build, failure = await self.flights.do(key, lambda: self._compile(key, code, limits), group=self.language)
+        return build, failure, False
+
+    async def _compile(self, key: str, code: str, limits: SandboxLimits) -> Tuple[Optional[Path], Optional[Dict]]:
+        build_dir = self.cache.new_build_dir()
+        try:
+            source = self.source_name(code)
+            (build_dir / source).write_text(code, encoding="utf-8")
+            result = await run_process(
+                self.compile_argv(source),
+                self.compile_limits(limits),
+                env=sandbox_env(str(build_dir)),
+                cwd=str(build_dir)
+            )
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        if result["exit_code"] != 0 or result["timed_out"] or result["output_truncated"]:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            self.cache.stats["failed"] += 1
+            return None, result
+        logger.info(f"🔨 Compiled {self.language} submission in {result['wall_time']:.2f}s")
+        return self.cache.store(key, build_dir), None
+
+    async def run(self, code: str, stdin: Optional[str], limits: SandboxLimits) -> Dict:
+        start = time.monotonic()
+        build, failure, compile_cached = await self.compile(code, limits)
+        compile_time = time.monotonic() - start
+
+        if failure is not None:
+            return {**failure, "compile_time": compile_time, "compile_cached": False, "compile_error": True}
+
+        with scratch_dir() as workdir:
+            result = await run_process(
+                self.run_argv(build, code, limits),
+                self.run_limits(limits),
+                stdin=stdin,
+                env=sandbox_env(workdir),
+                cwd=workdir
+            )
+        return {**result, "compile_time": compile_time, "compile_cached": compile_cached, "compile_error": False}
+
+
+class CppRunner(CompiledRunner):
+    language = "cpp"
+    executable = "g++"
+    flags = ("-std=c++17", "-O2", "-pipe")
+
+    def source_name(self, code: str) -> str:
+        return "main.cpp"
+
+    def compile_argv(self, source: str) -> List[str]:
+        return [self.executable, *self.flags, "-o", "main", source]
+
+    def run_argv(self, build: Path, code: str, limits: SandboxLimits) -> List[str]:
+        return [str(build / "main")]
+
+
+class JavaRunner(CompiledRunner):
+    language = "java"
+    executable = "javac"
+    flags = ("-encoding", "UTF-8")
+
+    PUBLIC_CLASS = re.compile(r"\bpublic\s+(?:final\s+)?class\s+([A-Za-z_$][\w$]*)")
+
+    def available(self) -> bool:
+        return super().available() and shutil.which("java") is not None
+
+    def version_argv(self) -> List[str]:
+        return [self.executable, "-version"]
+
+    def main_class(self, code: str) -> str:
+        match = self.PUBLIC_CLASS.search(code)
+        return match.group(1) if match else "Main"
+
+    def source_name(self, code: str) -> str:
+        # javac requires a public class to live in a file of the same name
+        return f"{self.main_class(code)}.java"
+
+    def compile_argv(self, source: str) -> List[str]:
+        return [self.executable, "-J-Xmx512m", *self.flags, source]
+
+    def compile_limits(self, limits: SandboxLimits) -> SandboxLimits:
+        # The JVM reserves far more address space than it uses; -J-Xmx caps the heap
+        return super().compile_limits(limits)._replace(memory_bytes=0)
+
+    def run_limits(self, limits: SandboxLimits) -> SandboxLimits:
+        return limits._replace(memory_bytes=0)
+
+    def run_argv(self, build: Path, code: str, limits: SandboxLimits) -> List[str]:
+        heap_mb = max(16, limits.memory_bytes // (1024 * 1024))
+        return [
+            "java", f"-Xmx{heap_mb}m", "-XX:+UseSerialGC", "-XX:TieredStopAtLevel=1",
+            "-Dfile.encoding=UTF-8", "-cp", str(build), self.main_class(code)
+        ]
+
+
+class RunnerRegistry:
+    """Runners by language name"""
+
+    def __init__(self):
+        self.compile_cache = CompileCache()
+        self.flights = SingleFlight()
+        self._runners: Dict[str, Runner] = {}
+
+    def register(self, runner: Runner):
+        self._runners[runner.language] = runner
+
+    def get(self, language: str) -> Optional[Runner]:
+        return self._runners.get(language.lower())
+
+    def status(self) -> Dict:
+        return {
+            "languages": {language: runner.available() for language, runner in self._runners.items()},
+            "compile_cache": self.compile_cache.status()
+        }
+
+
+# Global runner registry instance
+runner_registry = RunnerRegistry()
+runner_registry.register(NodeRunner())
+runner_registry.register(CppRunner(runner_registry.compile_cache, runner_registry.flights))
+runner_registry.register(JavaRunner(runner_registry.compile_cache, runner_registry.flights))
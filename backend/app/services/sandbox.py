@@ -0,0 +1,198 @@
+"""
+Sandbox Service
+Resource limits for code execution and a runner for one-shot processes
+
+The same limits, environment (sandbox_env) and per-run scratch directory
+(scratch_dir) are applied to pooled Python runs (see python_pool.py and
+sandbox_worker.py) and to processes started directly, so every path shares
+one policy.
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from app.core.config import settings
+from app.services.sandbox_worker import apply_sandbox
+
+
+READ_CHUNK = 65536
+SCRATCH_PREFIX = "sandbox-run-"
+
+
+class SandboxLimits(NamedTuple):
+    """Limits for one run; 0 means unlimited for the rlimit fields"""
+    timeout: float  # Wall-clock seconds
+    cpu_seconds: int  # RLIMIT_CPU
+    memory_bytes: int  # RLIMIT_AS
+    max_processes: int  # RLIMIT_NPROC (counted per user; not enforced for root)
+    max_file_bytes: int  # RLIMIT_FSIZE
+    max_output_bytes: int  # Combined stdout + stderr before the run is killed
+    namespaces: bool  # Unshare user, network and IPC namespaces (Linux)
+    seccomp: bool  # Deny network and admin syscalls (needs libseccomp bindings)
+
+    @classmethod
+    def from_settings(cls) -> "SandboxLimits":
+        return cls(
+            timeout=settings.SANDBOX_TIMEOUT,
+            cpu_seconds=settings.SANDBOX_CPU_SECONDS or int(settings.SANDBOX_TIMEOUT) + 1,
+            memory_bytes=settings.SANDBOX_MEMORY_MB * 1024 * 1024,
+            max_processes=settings.SANDBOX_MAX_PROCESSES,
+            max_file_bytes=settings.SANDBOX_MAX_FILE_BYTES,
+            max_output_bytes=settings.SANDBOX_MAX_OUTPUT_BYTES,
+            namespaces=settings.SANDBOX_NAMESPACES,
+            seccomp=settings.SANDBOX_SECCOMP
+        )
+
+
+def scratch_root() -> Optional[str]:
+    """Where run directories go: SANDBOX_SCRATCH_DIR, else RAM-backed /dev/shm, else the system default"""
+    if settings.SANDBOX_SCRATCH_DIR:
+        return settings.SANDBOX_SCRATCH_DIR
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return None
+
+
+def scratch_dir() -> tempfile.TemporaryDirectory:
+    """Fresh working directory for one run, removed when the context exits"""
+    return tempfile.TemporaryDirectory(prefix=SCRATCH_PREFIX, dir=scratch_root())
+
+
+def sweep_scratch(max_age: float = 3600) -> int:
+    """
+    Remove run directories left behind by a crashed server
+
+    Only directories older than max_age are touched, so runs in progress in
+    other server processes are safe.
+
+    Returns:
+        Number of directories removed
+    """
+    root = scratch_root() or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name.startswith(SCRATCH_PREFIX) and entry.is_dir(follow_symlinks=False):
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+    return removed
+
+
+def sandbox_env(workdir: str) -> Dict[str, str]:
+    """Minimal environment for submitted programs (no server secrets)"""
+    return {
+        "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+        "HOME": workdir,
+        "LANG": "C.UTF-8",
+        "LC_ALL": "C.UTF-8"
+    }
+
+
+async def run_process(
+    argv: List[str],
+    limits: SandboxLimits,
+    stdin: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    cwd: Optional[str] = None,
+    pass_fds: Sequence[int] = ()
+) -> Dict:
+    """
+    Run a command in a new process under the sandbox limits
+
+    Output is read as it is produced; once stdout + stderr exceed
+    max_output_bytes the process group is killed.
+
+    Raises:
+        OSError: if the process could not be started or confined
+
+    Returns:
+        Same shape as a pooled run (stdout, stderr, exit_code, timed_out,
+        output_truncated, wall_time). cpu_time and max_rss_kb are None:
+        the event loop reaps the process, so its rusage is not available.
+    """
+    start = time.monotonic()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=cwd,
+            pass_fds=pass_fds,
+            preexec_fn=partial(apply_sandbox, limits._asdict()),
+            start_new_session=True
+        )
+    except subprocess.SubprocessError as e:
+        # apply_sandbox failed in the child, e.g. requested isolation is unavailable
+        raise OSError(f"Sandbox setup failed: {e}") from e
+
+    outputs = {"stdout": bytearray(), "stderr": bytearray()}
+    truncated = False
+
+    def kill_group():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def pump(stream: asyncio.StreamReader, buffer: bytearray):
+        nonlocal truncated
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                return
+            room = limits.max_output_bytes - len(outputs["stdout"]) - len(outputs["stderr"])
+            if limits.max_output_bytes and len(chunk) > room:
+                buffer += chunk[:room]
+                truncated = True
+                kill_group()
+                return
+            buffer += chunk
+
+    async def feed():
+        try:
+            if stdin:
+                process.stdin.write(stdin.encode("utf-8"))
+                await process.stdin.drain()
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                pump(process.stdout, outputs["stdout"]),
+                pump(process.stderr, outputs["stderr"]),
+                feed(),
+                process.wait()
+            ),
+            timeout=limits.timeout
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        # Timeout, overflow or cancellation; also reaps leftover grandchildren
+        kill_group()
+        if process.returncode is None:
+            await process.wait()
+
+    return {
+        "stdout": outputs["stdout"].decode("utf-8", errors="replace"),
+        "stderr": outputs["stderr"].decode("utf-8", errors="replace"),
+        "exit_code": process.returncode,
+        "timed_out": timed_out,
+        "output_truncated": truncated,
+        "wall_time": time.monotonic() - start,
+        "cpu_time": None,
+        "max_rss_kb": None
+    }
@@ -0,0 +1,531 @@
+"""
+Sandbox Worker
+Long-lived Python process used by the code execution pool
+
+The pool starts this script with its stdin/stdout as a request channel. The
+worker imports commonly used modules once, then forks a child per request
+that runs the submitted code with fresh globals. Every run starts from the
+same warm, unmodified interpreter without paying interpreter startup, and a
+crash or timeout in submitted code only ever takes down the child.
+
+Frames on the channel are a 4-byte big-endian length followed by UTF-8 JSON.
+A request is answered by a {"type": "result"} frame, preceded by output
+frames when the request asked for streaming.
+Run with --run it executes a single program instead (see run_once and
+ONE_SHOT_BOOTSTRAP).
+This file only uses the standard library and must not import the app package.
+"""
+
+import builtins
+import codecs
+import io
+import linecache
+import os
+import resource
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional
+
+
+# Imported once in the worker so submissions get them for free
+PRELOAD_MODULES = (
+    "collections", "datetime", "decimal", "fractions", "functools", "heapq",
+    "itertools", "json", "math", "random", "re", "statistics", "string",
+    "textwrap", "time", "typing"
+)
+
+HEADER = struct.Struct(">I")
+FILENAME = "main.py"
+READ_CHUNK = 65536
+# How often a running child is checked for exit while its pipes stay open
+POLL_INTERVAL = 0.05
+PR_SET_PDEATHSIG = 1
+PR_SET_NO_NEW_PRIVS = 38
+CLONE_NEWIPC = 0x08000000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+
+# Syscalls refused with EPERM when seccomp filtering is enabled
+SECCOMP_DENIED_SYSCALLS = (
+    "socket", "socketpair", "connect", "bind", "listen", "accept", "accept4",
+    "ptrace", "process_vm_readv", "process_vm_writev", "mount", "umount2",
+    "pivot_root", "chroot", "setns", "unshare", "bpf", "perf_event_open",
+    "kexec_load", "init_module", "finit_module", "delete_module", "reboot",
+    "swapon", "swapoff", "keyctl", "add_key", "request_key"
+)
+
+# Child currently running a submission, killed if the worker is terminated
+_active_child: Optional[int] = None
+
+# One-shot runs (--run) are already confined by the process that started
+# them and never use the channel, so they skip these imports and start faster
+ONE_SHOT = sys.argv[1:2] == ["--run"]
+
+_libc = None
+seccomp = None
+if not ONE_SHOT:
+    import json
+    import platform
+
+    try:
+        import ctypes
+        _libc = ctypes.CDLL(None, use_errno=True)
+    except (ImportError, OSError):
+        pass
+
+    # Optional: libseccomp Python bindings
+    try:
+        import seccomp
+    except ImportError:
+        pass
+
+
+def read_frame(fd: int) -> Optional[Dict]:
+    """Read one frame, or None when the channel is closed"""
+    header = _read_exact(fd, HEADER.size)
+    if header is None:
+        return None
+    body = _read_exact(fd, HEADER.unpack(header)[0])
+    if body is None:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def write_frame(fd: int, message: Dict):
+    body = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    data = HEADER.pack(len(body)) + body
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_exact(fd: int, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _set_rlimit(limit: int, value: Optional[int]):
+    if value:
+        resource.setrlimit(limit, (value, value))
+
+
+def apply_sandbox(limits: Dict):
+    """
+    Confine the current process before it runs submitted code
+    Called in the forked child, or as preexec_fn for one-shot processes
+
+    Args:
+        limits: timeout, cpu_seconds, memory_bytes, max_processes,
+                max_file_bytes (rlimits; 0 or missing = unlimited) and
+                namespaces / seccomp flags for optional Linux isolation
+
+    Raises:
+        OSError: if requested isolation is unavailable (fail closed)
+    """
+    cpu_seconds = limits.get("cpu_seconds") or int(float(limits.get("timeout") or 5)) + 1
+    # SIGXCPU at the soft limit; SIGKILL one second later if it is ignored
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    _set_rlimit(resource.RLIMIT_AS, limits.get("memory_bytes"))
+    _set_rlimit(resource.RLIMIT_NPROC, limits.get("max_processes"))
+    _set_rlimit(resource.RLIMIT_FSIZE, limits.get("max_file_bytes"))
+    # No core dumps from crashing submissions
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    if limits.get("namespaces"):
+        # New user namespace (no privileges needed) with its own empty network and IPC
+        if _libc is None or _libc.unshare(CLONE_NEWUSER | CLONE_NEWNET | CLONE_NEWIPC) != 0:
+            errno = ctypes.get_errno() if _libc is not None else 0
+            raise OSError(errno, f"namespace isolation unavailable: {os.strerror(errno)}")
+
+    if limits.get("seccomp"):
+        if seccomp is None:
+            raise OSError("seccomp isolation requested but the libseccomp Python bindings are not installed")
+        if _libc is not None:
+            _libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0)
+        syscall_filter = seccomp.SyscallFilter(defaction=seccomp.ALLOW)
+        for name in SECCOMP_DENIED_SYSCALLS:
+            try:
+                syscall_filter.add_rule(seccomp.ERRNO(1), name)
+            except (RuntimeError, ValueError):
+                pass  # Syscall does not exist on this architecture
+        syscall_filter.load()
+
+
+def _exit_status(code) -> int:
+    """Exit status for a SystemExit code, matching the interpreter"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_code(code: str) -> int:
+    """Run submitted code as __main__ and return its exit status"""
+    linecache.cache[FILENAME] = (len(code), None, code.splitlines(True), FILENAME)
+    sys.argv = [FILENAME]
+
+    try:
+        exec(compile(code, FILENAME, "exec"), {"__name__": "__main__", "__builtins__": builtins})
+        return 0
+    except SystemExit as e:
+        return _exit_status(e.code)
+    except BaseException as e:
+        # Drop this function's frame so the traceback starts in the submission
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
+
+
+def _die_with_parent(parent_pid: int):
+    """Have the kernel kill this child if the worker dies (Linux only)"""
+    if _libc is not None and sys.platform.startswith("linux"):
+        _libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+    if os.getppid() != parent_pid:
+        os._exit(1)
+
+
+def _terminate(signum, frame):
+    """SIGTERM from the pool: take the running submission down with the worker"""
+    if _active_child is not None:
+        try:
+            os.killpg(_active_child, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    os._exit(0)
+
+
+def _child(
+    code: str,
+    timeout: float,
+    limits: Dict,
+    workdir: Optional[str],
+    stdin_fd: int,
+    stdout_fd: int,
+    stderr_fd: int,
+    parent_pid: int
+):
+    """Runs in the forked child; never returns"""
+    status = 1
+    try:
+        _die_with_parent(parent_pid)
+        os.setpgid(0, 0)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, signal.SIG_DFL)
+
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        # Hide the request channel and pipe ends from submitted code
+        os.closerange(3, 256)
+
+        sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding="utf-8")
+        sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8")
+        sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding="utf-8", line_buffering=True)
+
+        try:
+            # Relative paths resolve in the run's scratch directory, never the server's
+            if workdir:
+                os.chdir(workdir)
+                os.environ["HOME"] = workdir
+            apply_sandbox({"timeout": timeout, **limits})
+        except OSError as e:
+            os.write(2, f"Sandbox setup failed: {e}\n".encode("utf-8"))
+            os._exit(1)
+        status = _run_code(code)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
+
+
+def run_request(request: Dict, channel_in: int, channel_out: int) -> Dict:
+    """
+    Fork a child for one submission and collect its output
+
+    With "stream" set, output is sent as {"type": "stdout"|"stderr", "data"}
+    frames while the program runs, and the channel is watched for
+    {"type": "stdin", "data"}, {"type": "stdin_eof"} and {"type": "cancel"}.
+    Otherwise stdin is fed up front and output is returned in the result.
+    The child runs in "workdir" (a scratch directory owned by the pool) when given.
+
+    Returns:
+        Result frame: stdout, stderr (empty when streamed), exit_code
+        (negative for a signal), timed_out, output_truncated, cancelled,
+        wall_time, cpu_time and max_rss_kb of the child
+    """
+    global _active_child
+    code = request["code"]
+    timeout = float(request.get("timeout", 5))
+    limits = request.get("limits") or {}
+    max_output = limits.get("max_output_bytes") or 0
+    stream = bool(request.get("stream"))
+    pending = bytearray((request.get("stdin") or "").encode("utf-8"))
+    # Interactive runs keep stdin open until the client sends stdin_eof
+    stdin_open = stream
+
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+
+    parent_pid = os.getpid()
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        _child(code, timeout, limits, request.get("workdir"), stdin_r, stdout_w, stderr_w, parent_pid)
+    _active_child = pid
+
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+
+    outputs = {stdout_r: bytearray(), stderr_r: bytearray()}
+    names = {stdout_r: "stdout", stderr_r: "stderr"}
+    decoders = {fd: codecs.getincrementaldecoder("utf-8")(errors="replace") for fd in outputs}
+    readers = list(outputs)
+    written = 0
+    writer: Optional[int] = stdin_w
+    os.set_blocking(stdin_w, False)
+
+    deadline = start + timeout
+    timed_out = False
+    output_truncated = False
+    cancelled = False
+    reaped = None
+
+    while readers:
+        if writer is not None and not pending and not stdin_open:
+            os.close(writer)
+            writer = None
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+
+        watched = readers + [channel_in] if stream else readers
+        readable, writable, _ = select.select(
+            watched, [writer] if writer is not None and pending else [], [], min(remaining, POLL_INTERVAL)
+        )
+        idle = not readable and not writable
+
+        if channel_in in readable:
+            readable.remove(channel_in)
+            message = read_frame(channel_in)
+            kind = message.get("type") if message else "cancel"
+            if kind == "stdin":
+                pending += (message.get("data") or "").encode("utf-8")
+            elif kind == "stdin_eof":
+                stdin_open = False
+            elif kind == "cancel":
+                # Explicit cancel, or the pool closed the channel
+                cancelled = True
+                break
+
+        for fd in readable:
+            chunk = os.read(fd, READ_CHUNK)
+            if not chunk:
+                readers.remove(fd)
+                continue
+            if max_output and len(chunk) > max_output - written:
+                # Over the output cap: keep what fits and stop the program
+                chunk = chunk[:max_output - written]
+                output_truncated = True
+            written += len(chunk)
+            if stream:
+                text = decoders[fd].decode(chunk)
+                if text:
+                    write_frame(channel_out, {"type": names[fd], "data": text})
+            else:
+                outputs[fd] += chunk
+            if output_truncated:
+                break
+        if output_truncated:
+            break
+
+        if writable:
+            try:
+                del pending[:os.write(writer, pending[:READ_CHUNK])]
+            except BrokenPipeError:
+                pending.clear()
+                stdin_open = False
+
+        if idle:
+            # Pipes still open: the child may have exited leaving a grandchild behind
+            pid_done, status, rusage = os.wait4(pid, os.WNOHANG)
+            if pid_done:
+                reaped = (status, rusage)
+                break
+
+    # Child closed its output but may still be running
+    while reaped is None and not (timed_out or output_truncated or cancelled):
+        pid_done, status, rusage = os.wait4(pid, os.WNOHANG)
+        if pid_done:
+            reaped = (status, rusage)
+        elif time.monotonic() >= deadline:
+            timed_out = True
+        else:
+            time.sleep(0.001)
+
+    # Kill the whole process group: the child on timeout, overflow or cancel, and any leftovers
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    if reaped is None:
+        _, status, rusage = os.wait4(pid, 0)
+        reaped = (status, rusage)
+    _active_child = None
+    wall_time = time.monotonic() - start
+
+    for fd in readers + ([writer] if writer is not None else []):
+        os.close(fd)
+    for fd in outputs:
+        if fd not in readers:
+            os.close(fd)
+
+    if stream:
+        for fd, decoder in decoders.items():
+            text = decoder.decode(b"", final=True)
+            if text:
+                write_frame(channel_out, {"type": names[fd], "data": text})
+
+    status, rusage = reaped
+    return {
+        "type": "result",
+        "stdout": outputs[stdout_r].decode("utf-8", errors="replace"),
+        "stderr": outputs[stderr_r].decode("utf-8", errors="replace"),
+        "exit_code": os.waitstatus_to_exitcode(status),
+        "timed_out": timed_out,
+        "output_truncated": output_truncated,
+        "cancelled": cancelled,
+        "wall_time": wall_time,
+        "cpu_time": rusage.ru_utime + rusage.ru_stime,
+        "max_rss_kb": rusage.ru_maxrss
+    }
+
+
+def normalize_output(text: str) -> str:
+    """Output as compared against expected output: newlines unified, trailing whitespace ignored"""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip("\n")
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    return normalize_output(actual) == normalize_output(expected)
+
+
+def run_tests(request: Dict, channel_in: int, channel_out: int) -> Dict:
+    """
+    Run the same code once per test case, each in its own forked child
+
+    A case passes when the program exits cleanly and its stdout matches the
+    expected output. With "stop_on_failure" the remaining cases are skipped
+    after the first failure.
+
+    Returns:
+        Result frame with "cases": one run result per executed case, plus "passed"
+    """
+    results = []
+    for case in request["cases"]:
+        result = run_request({
+            "code": request["code"],
+            "stdin": case.get("stdin"),
+            "timeout": request.get("timeout", 5),
+            "limits": request.get("limits"),
+            "workdir": request.get("workdir")
+        }, channel_in, channel_out)
+        result["passed"] = (
+            result["exit_code"] == 0
+            and not result["timed_out"]
+            and not result["output_truncated"]
+            and outputs_match(result["stdout"], case.get("expected_output", ""))
+        )
+        results.append(result)
+        if request.get("stop_on_failure") and not result["passed"]:
+            break
+    return {"type": "result", "cases": results}
+
+
+# Loads this file as a module (from its cached bytecode, unlike a script) and
+# hands over to run_once: python3 -I -c ONE_SHOT_BOOTSTRAP --run --fd N
+ONE_SHOT_BOOTSTRAP = (
+    "import sys; sys.path.insert(0, {directory!r}); import sandbox_worker; del sys.path[0]; "
+    "sys.exit(sandbox_worker.run_once(sys.argv[2:]))"
+)
+
+
+def one_shot_command(python: str) -> List[str]:
+    """argv prefix for a one-shot run; append ["--fd", N] or ["--code", source]"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return [python, "-I", "-c", ONE_SHOT_BOOTSTRAP.format(directory=directory), "--run"]
+
+
+def run_once(args: List[str]) -> int:
+    """
+    One-shot mode for a process started without the pool
+
+    "--fd N" reads the program from an inherited descriptor (an in-memory
+    file), "--code SOURCE" takes it inline. Either way nothing is written to
+    disk, so nothing is left behind if the run is killed.
+    """
+    if args[0] == "--fd":
+        with os.fdopen(int(args[1]), "rb") as source:
+            code = source.read().decode("utf-8")
+    else:
+        code = args[1]
+
+    # -I ignores PYTHONIOENCODING; match the pooled runs' UTF-8 streams
+    for stream in (sys.stdin, sys.stdout, sys.stderr):
+        stream.reconfigure(encoding="utf-8")
+    status = _run_code(code)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return status
+
+
+def main():
+    # Move the request channel off fds 0/1 so nothing can write into it by accident
+    channel_in = os.dup(0)
+    channel_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    signal.signal(signal.SIGTERM, _terminate)
+
+    for name in PRELOAD_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+    write_frame(channel_out, {"type": "ready", "pid": os.getpid(), "python": platform.python_version()})
+
+    while True:
+        request = read_frame(channel_in)
+        if request is None:
+            break
+        if "code" not in request:
+            # stdin or cancel that arrived after its run had already finished
+            continue
+        if "cases" in request:
+            write_frame(channel_out, run_tests(request, channel_in, channel_out))
+        else:
+            write_frame(channel_out, run_request(request, channel_in, channel_out))
+
+
+if __name__ == "__main__":
+    if ONE_SHOT:
+        sys.exit(run_once(sys.argv[2:]))
+    main()
@@ -0,0 +1,79 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key share one in-flight call
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key
+
+    The first caller for a key originates the call; everyone arriving while it
+    is still running awaits the same result (or exception). The shared call is
+    cancelled only once every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, group: str, field: str):
+        counters = self.stats.setdefault(group, {"originated": 0, "coalesced": 0})
+        counters[field] += 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], group: str = "default") -> Any:
+        """
+        Run fn once per key among concurrent callers
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine function performing the work
+            group: Counter bucket (e.g. content kind) for stats
+
+        Returns:
+            Result of the shared call
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(group, "coalesced")
+        else:
+            self._count(group, "originated")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # Shield so one caller going away does not cancel the shared work
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+
+    def running(self, key: str) -> bool:
+        """Whether a call for key is in flight"""
+        return key in self._inflight
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        return len(self._inflight)
+
+    def totals(self) -> Dict[str, int]:
+        """Originated/coalesced counts summed over all groups"""
+        return {
+            "originated": sum(c["originated"] for c in self.stats.values()),
+            "coalesced": sum(c["coalesced"] for c in self.stats.values())
+        }
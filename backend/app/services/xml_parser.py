@@ -4,21 +4,48 @@ Parses XML files containing course topics and lessons
 Provides topic data to AI for content generation
 """
 
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
 from loguru import logger
 import xmltodict
+from app.core.config import settings
+
+
+# Bump when the pickled layout of the classes below changes
+SNAPSHOT_VERSION = 1
+# Snapshot files start with this, then an HMAC-SHA256 of the pickled payload
+SNAPSHOT_MAGIC = b"CATSNAP1"
 
 
 class Topic:
-    """Represents a learning topic/lesson"""
+    """
+    Represents a learning topic/lesson
+    Keywords and difficulty are interned: the same few strings repeat across
+    thousands of topics
+    """
+
+    __slots__ = ("id", "title", "keywords", "difficulty")
 
-    def __init__(self, topic_id: str, title: str, keywords: List[str], difficulty: str = "beginner"):
+    def __init__(self, topic_id: str, title: str, keywords: Iterable[str], difficulty: str = "beginner"):
         self.id = topic_id
         self.title = title
-        self.keywords = keywords
-        self.difficulty = difficulty
+        self.keywords: Tuple[str, ...] = tuple(sys.intern(k) for k in keywords)
+        self.difficulty = sys.intern(difficulty)
+
+    def __reduce__(self):
+        # Rebuild through __init__: faster to unpickle than slot state, and re-interns strings
+        return (Topic, (self.id, self.title, self.keywords, self.difficulty))
 
     def __repr__(self):
         return f"Topic(id={self.id}, title={self.title}, difficulty={self.difficulty})"
@@ -27,6 +54,8 @@ class Topic:
 class Module:
     """Represents a course module containing multiple topics"""
 
+    __slots__ = ("id", "name", "topics")
+
     def __init__(self, module_id: str, name: str):
         self.id = module_id
         self.name = name
@@ -42,10 +71,12 @@ class Module:
 class Course:
     """Represents a complete course with modules"""
 
+    __slots__ = ("id", "name", "language", "modules")
+
     def __init__(self, course_id: str, name: str, language: str):
         self.id = course_id
         self.name = name
-        self.language = language
+        self.language = sys.intern(language)
         self.modules: List[Module] = []
 
     def add_module(self, module: Module):
@@ -55,13 +86,244 @@ class Course:
         return f"Course(id={self.id}, name={self.name}, modules={len(self.modules)})"
 
 
+class TopicLocation(NamedTuple):
+    """A topic together with the module and course that contain it"""
+    topic: Topic
+    module: Module
+    course: Course
+
+
+class SourceFile:
+    """An XML file as last seen on disk, with the course parsed from it"""
+
+    __slots__ = ("path", "mtime_ns", "size", "digest", "course")
+
+    def __init__(self, path: Path, mtime_ns: int, size: int, digest: str, course: Optional[Course]):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.course = course
+
+    def __repr__(self):
+        return f"SourceFile(path={self.path.name}, digest={self.digest[:12]})"
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _split_keywords(keywords_str: str) -> List[str]:
+    """Split a comma-separated keyword string"""
+    return [k.strip() for k in keywords_str.split(',') if k.strip()]
+
+
+def _content_signature(topic: Topic) -> Tuple:
+    """Fields that influence generated content for a topic"""
+    return (topic.title, topic.keywords, topic.difficulty)
+
+
+def parse_course_file(xml_file_path: Path, loader: str = "iterparse") -> Optional[Course]:
+    """
+    Parse a single XML course file
+    Module-level so it can run in worker processes
+
+    Args:
+        xml_file_path: Path to XML file
+        loader: iterparse (streaming) or xmltodict
+
+    Returns:
+        Course object or None if parsing fails
+    """
+    try:
+        logger.info(f"Parsing course file: {xml_file_path}")
+
+        if loader == "xmltodict":
+            course = _parse_with_xmltodict(xml_file_path)
+        else:
+            course = _parse_with_iterparse(xml_file_path)
+
+        logger.success(f"Successfully parsed course: {course.name} with {len(course.modules)} modules")
+        return course
+
+    except Exception as e:
+        logger.error(f"Error parsing XML file {xml_file_path}: {e}")
+        return None
+
+
+def _parse_with_iterparse(xml_file_path: Path) -> Course:
+    """
+    Streaming loader: builds each Topic as its <lesson> element closes and
+    then detaches the element, so memory stays flat regardless of file size
+    """
+    course: Optional[Course] = None
+    module: Optional[Module] = None
+    stack: List[ET.Element] = []
+
+    for event, elem in ET.iterparse(str(xml_file_path), events=("start", "end")):
+        if event == "start":
+            if elem.tag == "course" and not stack:
+                course = Course(elem.get("id", ""), "", elem.get("language", "python"))
+            elif elem.tag == "module" and course is not None:
+                module = Module(elem.get("id", ""), "")
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+
+        if elem.tag == "name" and parent is not None:
+            if parent.tag == "course" and course is not None:
+                course.name = (elem.text or "").strip()
+            elif parent.tag == "module" and module is not None:
+                module.name = (elem.text or "").strip()
+
+        elif elem.tag == "lesson" and module is not None:
+            module.add_topic(Topic(
+                elem.get("id", ""),
+                (elem.findtext("title") or "").strip(),
+                _split_keywords(elem.findtext("keywords") or ""),
+                elem.get("difficulty", "beginner")
+            ))
+            parent.remove(elem)
+
+        elif elem.tag == "module" and module is not None:
+            course.add_module(module)
+            module = None
+            parent.remove(elem)
+
+    if course is None:
+        raise ValueError("Missing <course> root element")
+    return course
+
+
+def _parse_with_xmltodict(xml_file_path: Path) -> Course:
+    """Original loader: reads the whole file and builds a full dictionary tree"""
+    with open(xml_file_path, 'r', encoding='utf-8') as f:
+        data = xmltodict.parse(f.read())
+
+    course_data = data.get('course', {})
+    course_id = course_data.get('@id', '')
+    course_name = course_data.get('name', '')
+    language = course_data.get('@language', 'python')
+
+    course = Course(course_id, course_name, language)
+
+    # Parse modules
+    modules_data = course_data.get('modules', {}).get('module', [])
+    if not isinstance(modules_data, list):
+        modules_data = [modules_data]
+
+    for module_data in modules_data:
+        module_id = module_data.get('@id', '')
+        module_name = module_data.get('name', '')
+        module = Module(module_id, module_name)
+
+        # Parse lessons/topics
+        lessons_data = module_data.get('lessons', {}).get('lesson', [])
+        if not isinstance(lessons_data, list):
+            lessons_data = [lessons_data]
+
+        for lesson_data in lessons_data:
+            lesson_id = lesson_data.get('@id', '')
+            title = lesson_data.get('title', '')
+            difficulty = lesson_data.get('@difficulty', 'beginner')
+            keywords = _split_keywords(lesson_data.get('keywords', ''))
+
+            topic = Topic(lesson_id, title, keywords, difficulty)
+            module.add_topic(topic)
+
+        course.add_module(module)
+
+    return course
+
+
+class CatalogueSnapshot:
+    """
+    Immutable view of the loaded courses and their lookup indexes
+
+    A snapshot is built completely before it is published, so readers holding
+    a reference always see a consistent catalogue without taking locks.
+    """
+
+    def __init__(self, courses: Dict[str, Course]):
+        topic_index: Dict[str, TopicLocation] = {}
+        keyword_index: Dict[str, List[Topic]] = {}
+        difficulty_index: Dict[str, List[Topic]] = {}
+        duplicates: List[str] = []
+
+        for course in courses.values():
+            for module in course.modules:
+                for topic in module.topics:
+                    if topic.id in topic_index:
+                        existing = topic_index[topic.id]
+                        message = (
+                            f"Duplicate topic id '{topic.id}' in {course.id}/{module.id}, "
+                            f"keeping {existing.course.id}/{existing.module.id}"
+                        )
+                        logger.warning(message)
+                        duplicates.append(message)
+                        continue
+
+                    topic_index[topic.id] = TopicLocation(topic, module, course)
+                    for keyword in topic.keywords:
+                        keyword_index.setdefault(keyword.lower(), []).append(topic)
+                    difficulty_index.setdefault(topic.difficulty.lower(), []).append(topic)
+
+        self.courses: Mapping[str, Course] = MappingProxyType(dict(courses))
+        self.topics: Tuple[Topic, ...] = tuple(location.topic for location in topic_index.values())
+        self.topic_index: Mapping[str, TopicLocation] = MappingProxyType(topic_index)
+        self.keyword_index: Mapping[str, Tuple[Topic, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in keyword_index.items()}
+        )
+        self.difficulty_index: Mapping[str, Tuple[Topic, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in difficulty_index.items()}
+        )
+        self.duplicate_topics: Tuple[str, ...] = tuple(duplicates)
+
+    def __repr__(self):
+        return f"CatalogueSnapshot(courses={len(self.courses)}, topics={len(self.topics)})"
+
+
 class XMLTopicParser:
     """
     Parses XML topic files and provides structured data
     Supports dynamic topic loading and updates
+
+    The catalogue is published as a CatalogueSnapshot. Loading builds a new
+    snapshot and swaps it in with a single assignment, so concurrent readers
+    never observe a half-loaded catalogue.
+
+    Each file's mtime, size and content hash are tracked, so reloads only
+    re-parse files that were added or changed and drop files that were
+    deleted. Change listeners are told which topics changed.
+
+    When several files need parsing they are parsed across a process pool;
+    results are merged in sorted file order so the outcome is deterministic.
+
+    After a load that parsed anything, the parsed catalogue is written to a
+    binary snapshot (settings.CATALOGUE_SNAPSHOT_PATH). The first load of a
+    process starts from that snapshot and only re-parses files whose content
+    hash no longer matches, so an unchanged catalogue never touches XML.
+    The snapshot is signed with a key derived from SECRET_KEY and only
+    unpickled when the signature matches, so a file written by anything
+    else (e.g. a code submission) is ignored rather than executed.
     """
 
-    def __init__(self, topics_directory: str = "data/topics"):
+    def __init__(
+        self,
+        topics_directory: str = "data/topics",
+        loader: str = settings.XML_LOADER,
+        parallel: bool = settings.XML_PARALLEL_LOAD,
+        workers: int = settings.XML_LOAD_WORKERS,
+        snapshot_path: str = settings.CATALOGUE_SNAPSHOT_PATH,
+        secret_key: str = settings.SECRET_KEY
+    ):
         # If relative path, make it relative to project root
         topics_path = Path(topics_directory)
         if not topics_path.is_absolute():
@@ -71,7 +333,22 @@ class XMLTopicParser:
         else:
             self.topics_dir = topics_path
 
-        self.courses: Dict[str, Course] = {}
+        self.loader = loader.lower()
+        self.parallel = parallel
+        self.workers = workers or os.cpu_count() or 1
+        self.snapshot_path = None
+        if snapshot_path:
+            # Relative paths are taken from the backend directory, not the working directory
+            backend_dir = Path(__file__).resolve().parent.parent.parent
+            self.snapshot_path = backend_dir / snapshot_path
+        self._snapshot_key = hmac.new(secret_key.encode("utf-8"), b"catalogue-snapshot", hashlib.sha256).digest()
+        self._snapshot_checked = False
+        self.snapshot = CatalogueSnapshot({})
+        self.last_reload: Dict[str, int] = {}
+        self.duplicates: List[str] = []
+        self._sources: Dict[Path, SourceFile] = {}
+        self._load_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Topic]], None]] = []
         logger.info(f"Initialized XMLTopicParser with directory: {self.topics_dir}")
 
     def parse_course_file(self, xml_file_path: Path) -> Optional[Course]:
@@ -84,74 +361,236 @@ class XMLTopicParser:
         Returns:
             Course object or None if parsing fails
         """
-        try:
-            logger.info(f"Parsing course file: {xml_file_path}")
-
-            with open(xml_file_path, 'r', encoding='utf-8') as f:
-                data = xmltodict.parse(f.read())
-
-            course_data = data.get('course', {})
-            course_id = course_data.get('@id', '')
-            course_name = course_data.get('name', '')
-            language = course_data.get('@language', 'python')
-
-            course = Course(course_id, course_name, language)
-
-            # Parse modules
-            modules_data = course_data.get('modules', {}).get('module', [])
-            if not isinstance(modules_data, list):
-                modules_data = [modules_data]
+        return parse_course_file(xml_file_path, self.loader)
 
-            for module_data in modules_data:
-                module_id = module_data.get('@id', '')
-                module_name = module_data.get('name', '')
-                module = Module(module_id, module_name)
+    @property
+    def courses(self) -> Mapping[str, Course]:
+        """Read-only mapping of course_id -> Course in the current snapshot"""
+        return self.snapshot.courses
 
-                # Parse lessons/topics
-                lessons_data = module_data.get('lessons', {}).get('lesson', [])
-                if not isinstance(lessons_data, list):
-                    lessons_data = [lessons_data]
-
-                for lesson_data in lessons_data:
-                    lesson_id = lesson_data.get('@id', '')
-                    title = lesson_data.get('title', '')
-                    difficulty = lesson_data.get('@difficulty', 'beginner')
-                    keywords_str = lesson_data.get('keywords', '')
-                    keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
-
-                    topic = Topic(lesson_id, title, keywords, difficulty)
-                    module.add_topic(topic)
-
-                course.add_module(module)
-
-            logger.success(f"Successfully parsed course: {course_name} with {len(course.modules)} modules")
-            return course
+    def add_change_listener(self, listener: Callable[[List[Topic]], None]):
+        """
+        Register a callback run after each load with the topics whose title,
+        keywords or difficulty changed, or that were removed (previous versions)
+        """
+        self._listeners.append(listener)
+
+    def _parse_files(self, xml_files: List[Path]) -> List[Optional[Course]]:
+        """Parse files in order, across a process pool when there is more than one"""
+        if self.parallel and len(xml_files) > 1 and self.workers > 1:
+            workers = min(self.workers, len(xml_files))
+            try:
+                # Spawn, not fork: loads run on worker threads (reload, watcher) of a
+                # multi-threaded server, and a forked child can inherit a held lock
+                # (e.g. the logger's) and deadlock
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as pool:
+                    return list(pool.map(parse_course_file, xml_files, [self.loader] * len(xml_files)))
+            except Exception as e:
+                logger.warning(f"Parallel XML loading failed ({e}), falling back to serial loading")
+
+        return [parse_course_file(xml_file, self.loader) for xml_file in xml_files]
+
+    def _read_snapshot(self):
+        """Seed source tracking from the binary snapshot, if it matches this directory"""
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return
 
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                blob = f.read()
+            header = len(SNAPSHOT_MAGIC) + hashlib.sha256().digest_size
+            if not blob.startswith(SNAPSHOT_MAGIC) or not hmac.compare_digest(
+                    blob[len(SNAPSHOT_MAGIC):header], self._sign(blob[header:])):
+                logger.warning(f"Ignoring catalogue snapshot with a bad signature: {self.snapshot_path}")
+                return
+            # Signed by _write_snapshot with our key, so this is our own data
+            data = pickle.loads(blob[header:])
         except Exception as e:
-            logger.error(f"Error parsing XML file {xml_file_path}: {e}")
-            return None
+            logger.warning(f"Ignoring unreadable catalogue snapshot {self.snapshot_path}: {e}")
+            return
+
+        if (data.get("version") != SNAPSHOT_VERSION
+                or data.get("topics_dir") != str(self.topics_dir)
+                or data.get("loader") != self.loader):
+            logger.info(f"Catalogue snapshot {self.snapshot_path} is stale, parsing XML")
+            return
+
+        self._sources = {source.path: source for source in data["sources"]}
+        logger.info(f"Loaded catalogue snapshot with {len(self._sources)} files: {self.snapshot_path}")
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._snapshot_key, payload, hashlib.sha256).digest()
+
+    def _write_snapshot(self):
+        """Persist the parsed catalogue atomically (temp file + rename)"""
+        if self.snapshot_path is None:
+            return
+
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "topics_dir": str(self.topics_dir),
+            "loader": self.loader,
+            "sources": list(self._sources.values())
+        }
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(tmp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC + self._sign(payload) + payload)
+            os.replace(tmp_path, self.snapshot_path)
+            logger.info(f"Wrote catalogue snapshot: {self.snapshot_path}")
+        except Exception as e:
+            logger.warning(f"Could not write catalogue snapshot {self.snapshot_path}: {e}")
 
-    def load_all_courses(self) -> Dict[str, Course]:
+    def load_all_courses(self) -> Mapping[str, Course]:
         """
         Load all XML course files from topics directory
+        and publish them as a new catalogue snapshot
+        Files unchanged since the last load are not re-parsed
 
         Returns:
-            Dictionary of course_id -> Course objects
+            Read-only mapping of course_id -> Course objects
         """
+        with self._load_lock:
+            if not self._snapshot_checked:
+                self._snapshot_checked = True
+                self._read_snapshot()
+
+            previous_snapshot = self.snapshot
+            counts = {"parsed": 0, "unchanged": 0, "removed": 0}
+            touched = 0
+
+            if not self.topics_dir.exists():
+                logger.warning(f"Topics directory does not exist: {self.topics_dir}")
+                xml_files = []
+            else:
+                xml_files = sorted(self.topics_dir.glob("*.xml"))
+                logger.info(f"Found {len(xml_files)} XML course files")
+
+            # Pass 1: find files whose content changed since the last load
+            sources: Dict[Path, SourceFile] = {}
+            pending: List[Tuple[Path, os.stat_result, str]] = []
+            for xml_file in xml_files:
+                try:
+                    stat = xml_file.stat()
+                    previous = self._sources.get(xml_file)
+
+                    if previous and previous.mtime_ns == stat.st_mtime_ns and previous.size == stat.st_size:
+                        sources[xml_file] = previous
+                        continue
+
+                    digest = _file_digest(xml_file)
+                    if previous and previous.digest == digest:
+                        touched += 1
+                        sources[xml_file] = SourceFile(
+                            xml_file, stat.st_mtime_ns, stat.st_size, digest, previous.course
+                        )
+                        continue
+
+                    pending.append((xml_file, stat, digest))
+                except OSError as e:
+                    # File vanished or became unreadable mid-scan
+                    logger.error(f"Error reading XML file {xml_file}: {e}")
+
+            counts["unchanged"] = len(sources)
+
+            # Pass 2: parse changed files (in parallel when there are several)
+            parsed = self._parse_files([xml_file for xml_file, _, _ in pending])
+            for (xml_file, stat, digest), course in zip(pending, parsed):
+                previous = self._sources.get(xml_file)
+                if course is None and previous is not None:
+                    logger.warning(f"Keeping last good version of {xml_file.name} until it parses again")
+                    course = previous.course
+                sources[xml_file] = SourceFile(xml_file, stat.st_mtime_ns, stat.st_size, digest, course)
+            counts["parsed"] = len(pending)
+            counts["removed"] = len(set(self._sources) - set(sources))
+
+            # Merge in sorted file order; the first file defining a course id wins
+            courses: Dict[str, Course] = {}
+            duplicates: List[str] = []
+            for xml_file in sorted(sources):
+                course = sources[xml_file].course
+                if course is None:
+                    continue
+                if course.id in courses:
+                    message = f"Duplicate course id '{course.id}' in {xml_file.name}, keeping the earlier file"
+                    logger.warning(message)
+                    duplicates.append(message)
+                    continue
+                courses[course.id] = course
+
+            snapshot = CatalogueSnapshot(courses)
+
+            # Atomic swap: readers see either the old or the new catalogue
+            self._sources = sources
+            self.snapshot = snapshot
+            self.last_reload = counts
+            self.duplicates = duplicates + list(snapshot.duplicate_topics)
+
+            if counts["parsed"] or counts["removed"] or touched:
+                self._write_snapshot()
+
+        changed = self._changed_topics(previous_snapshot, self.snapshot)
+        if changed:
+            logger.info(f"{len(changed)} topics changed: {', '.join(t.id for t in changed)}")
+            for listener in self._listeners:
+                try:
+                    listener(changed)
+                except Exception as e:
+                    logger.error(f"Topic change listener failed: {e}")
+
+        logger.success(
+            f"Loaded {len(courses)} courses successfully "
+            f"({counts['parsed']} parsed, {counts['unchanged']} unchanged, {counts['removed']} removed)"
+        )
+        return self.snapshot.courses
+
+    @staticmethod
+    def _changed_topics(old: CatalogueSnapshot, new: CatalogueSnapshot) -> List[Topic]:
+        """Previous versions of topics that were removed or whose content inputs changed"""
+        changed = []
+        for topic_id, location in old.topic_index.items():
+            current = new.topic_index.get(topic_id)
+            if current is None or _content_signature(current.topic) != _content_signature(location.topic):
+                changed.append(location.topic)
+        return changed
+
+    def has_changes(self) -> bool:
+        """Cheap stat-only check whether any XML file was added, removed or modified"""
         if not self.topics_dir.exists():
-            logger.warning(f"Topics directory does not exist: {self.topics_dir}")
-            return {}
-
-        xml_files = list(self.topics_dir.glob("*.xml"))
-        logger.info(f"Found {len(xml_files)} XML course files")
-
-        for xml_file in xml_files:
-            course = self.parse_course_file(xml_file)
-            if course:
-                self.courses[course.id] = course
-
-        logger.success(f"Loaded {len(self.courses)} courses successfully")
-        return self.courses
+            return bool(self._sources)
+
+        xml_files = set(self.topics_dir.glob("*.xml"))
+        if xml_files != set(self._sources):
+            return True
+
+        for xml_file, source in self._sources.items():
+            try:
+                stat = xml_file.stat()
+            except OSError:
+                return True
+            if stat.st_mtime_ns != source.mtime_ns or stat.st_size != source.size:
+                return True
+        return False
+
+    async def watch(self, interval: float = 2.0):
+        """
+        Poll the topics directory and apply changes incrementally
+        Runs until cancelled; start it as a background task
+        """
+        logger.info(f"👀 Watching {self.topics_dir} for topic changes every {interval}s")
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.has_changes):
+                    logger.info("Topic files changed, reloading...")
+                    await asyncio.to_thread(self.load_all_courses)
+            except Exception as e:
+                logger.error(f"Topic watcher error: {e}")
 
     def get_course(self, course_id: str) -> Optional[Course]:
         """Get a specific course by ID"""
@@ -159,25 +598,37 @@ class XMLTopicParser:
 
     def get_all_topics(self) -> List[Topic]:
         """Get all topics from all courses"""
-        topics = []
-        for course in self.courses.values():
-            for module in course.modules:
-                topics.extend(module.topics)
-        return topics
+        return list(self.snapshot.topics)
 
     def get_topic_by_id(self, topic_id: str) -> Optional[Topic]:
         """Find a topic by its ID across all courses"""
-        for course in self.courses.values():
-            for module in course.modules:
-                for topic in module.topics:
-                    if topic.id == topic_id:
-                        return topic
-        return None
+        location = self.snapshot.topic_index.get(topic_id)
+        return location.topic if location else None
+
+    def get_topic_location(self, topic_id: str) -> Optional[TopicLocation]:
+        """Find a topic by its ID together with its module and course"""
+        return self.snapshot.topic_index.get(topic_id)
+
+    def get_topics_by_keyword(self, keyword: str) -> Tuple[Topic, ...]:
+        """Get all topics tagged with a keyword (case-insensitive)"""
+        return self.snapshot.keyword_index.get(keyword.strip().lower(), ())
 
-    def reload_courses(self):
-        """Reload all courses from disk (for dynamic updates)"""
-        logger.info("Reloading all courses...")
-        self.courses.clear()
+    def get_topics_by_difficulty(self, difficulty: str) -> Tuple[Topic, ...]:
+        """Get all topics of a difficulty level (case-insensitive)"""
+        return self.snapshot.difficulty_index.get(difficulty.strip().lower(), ())
+
+    def reload_courses(self, full: bool = False) -> Mapping[str, Course]:
+        """
+        Reload courses from disk (for dynamic updates)
+        The current snapshot keeps serving readers until the new one is ready
+
+        Args:
+            full: Re-parse every file instead of only changed ones
+        """
+        logger.info("Reloading all courses..." if full else "Reloading changed courses...")
+        if full:
+            with self._load_lock:
+                self._sources = {}
         return self.load_all_courses()
 
 
@@ -0,0 +1,80 @@
+"""
+Catalogue Startup Benchmark
+Measures memory retained per 10k topics and cold-start load time, parsing
+XML versus starting from the binary catalogue snapshot
+
+Usage (from the backend directory):
+    python scripts/benchmark_catalogue.py --files 4 --lessons 12500
+"""
+
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger  # noqa: E402
+from app.services.xml_parser import XMLTopicParser  # noqa: E402
+from benchmark_xml_loader import write_catalogue  # noqa: E402
+
+
+def timed_load(topics_dir: Path, snapshot_path: str, repeat: int) -> float:
+    """Best wall time of a first load in a fresh parser"""
+    best = float("inf")
+    for _ in range(repeat):
+        parser = XMLTopicParser(str(topics_dir), parallel=False, snapshot_path=snapshot_path)
+        start = time.perf_counter()
+        parser.load_all_courses()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_mib_per_10k(topics_dir: Path) -> float:
+    """Memory held by a loaded catalogue (objects and indexes) per 10k topics"""
+    gc.collect()
+    tracemalloc.start()
+    parser = XMLTopicParser(str(topics_dir), parallel=False, snapshot_path="")
+    parser.load_all_courses()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / (1024 * 1024) / len(parser.get_all_topics()) * 10000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--files", type=int, default=4)
+    arg_parser.add_argument("--lessons", type=int, default=12500, help="Lessons per file")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    # Keep parser logging out of the results
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        topics_dir = Path(tmp) / "topics"
+        topics_dir.mkdir()
+        for i in range(args.files):
+            write_catalogue(topics_dir / f"course-{i}.xml", args.lessons, course_id=f"course-{i}")
+        snapshot_path = str(Path(tmp) / "catalogue.pickle")
+
+        # First load writes the snapshot; later loads start from it
+        XMLTopicParser(str(topics_dir), parallel=False, snapshot_path=snapshot_path).load_all_courses()
+        snapshot_mib = Path(snapshot_path).stat().st_size / (1024 * 1024)
+
+        xml_seconds = timed_load(topics_dir, "", args.repeat)
+        snapshot_seconds = timed_load(topics_dir, snapshot_path, args.repeat)
+        per_10k = retained_mib_per_10k(topics_dir)
+
+    topics = args.files * args.lessons
+    print(f"topics:                 {topics}")
+    print(f"memory per 10k topics:  {per_10k:.2f} MiB")
+    print(f"cold start, XML:        {xml_seconds:.3f} s")
+    print(f"cold start, snapshot:   {snapshot_seconds:.3f} s ({snapshot_mib:.1f} MiB file)")
+
+
+if __name__ == "__main__":
+    main()
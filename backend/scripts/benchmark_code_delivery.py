@@ -0,0 +1,108 @@
+"""
+Code Delivery Benchmark
+Compares ways of handing a submission to a fresh python3 process: a source
+file written with NamedTemporaryFile (the old approach), an in-memory file
+(memfd) and the code inline on the command line
+
+Point --dir at the disk the server would use for temp files (e.g. a network
+mount) to see what the file round trip costs there.
+
+Usage (from the backend directory):
+    python scripts/benchmark_code_delivery.py --runs 100 [--dir /mnt/shared/tmp]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger  # noqa: E402
+from app.services.sandbox import run_process, SandboxLimits  # noqa: E402
+from app.services.sandbox_worker import one_shot_command  # noqa: E402
+
+
+PROGRAM = "numbers = [1, 2, 3]\nprint(sum(numbers))\n"
+RUNNER = one_shot_command("python3")
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def via_temp_file(limits: SandboxLimits, directory: str):
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False, dir=directory) as f:
+        f.write(PROGRAM)
+        path = f.name
+    try:
+        return await run_process(["python3", path], limits)
+    finally:
+        os.unlink(path)
+
+
+async def via_memfd(limits: SandboxLimits, directory: str):
+    source = os.memfd_create("main.py")
+    try:
+        os.write(source, PROGRAM.encode("utf-8"))
+        os.lseek(source, 0, os.SEEK_SET)
+        return await run_process(RUNNER + ["--fd", str(source)], limits, pass_fds=(source,))
+    finally:
+        os.close(source)
+
+
+async def via_argv(limits: SandboxLimits, directory: str):
+    return await run_process(RUNNER + ["--code", PROGRAM], limits)
+
+
+def file_round_trip(directory: str) -> float:
+    """Milliseconds to create, write, close and delete one temp file"""
+    start = time.perf_counter()
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False, dir=directory) as f:
+        f.write(PROGRAM)
+    os.unlink(f.name)
+    return (time.perf_counter() - start) * 1000
+
+
+async def measure(deliver, limits: SandboxLimits, directory: str, runs: int):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await deliver(limits, directory)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result["stdout"] == "6\n", result
+    return latencies
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=100)
+    arg_parser.add_argument("--dir", default=tempfile.gettempdir(), help="Directory for the temp-file variant")
+    args = arg_parser.parse_args()
+
+    logger.remove()
+
+    limits = SandboxLimits.from_settings()
+    modes = {"tempfile": via_temp_file, "argv": via_argv}
+    if hasattr(os, "memfd_create"):
+        modes["memfd"] = via_memfd
+
+    results = {mode: await measure(deliver, limits, args.dir, args.runs) for mode, deliver in modes.items()}
+    results["file only"] = [file_round_trip(args.dir) for _ in range(args.runs)]
+
+    print(f"temp files in {args.dir}")
+    print(f"{'mode':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for mode, latencies in results.items():
+        print(
+            f"{mode:>10} {percentile(latencies, 0.5):>8.2f} "
+            f"{percentile(latencies, 0.95):>8.2f} {statistics.mean(latencies):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Code Execution Benchmark
+Compares latency of the warm worker pool with spawning python3 per run
+for a trivial program
+
+Usage (from the backend directory):
+    python scripts/benchmark_code_execution.py --runs 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger  # noqa: E402
+from app.api.routes.code_execution import execute_in_subprocess  # noqa: E402
+from app.services.python_pool import PythonWorkerPool  # noqa: E402
+from app.services.sandbox import SandboxLimits  # noqa: E402
+
+
+PROGRAM = "numbers = [1, 2, 3]\nprint(sum(numbers))\n"
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measure(run, runs: int):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=200)
+    arg_parser.add_argument("--workers", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    logger.remove()
+
+    limits = SandboxLimits.from_settings()
+    pool = PythonWorkerPool(size=args.workers)
+    await pool.start()
+    try:
+        results = {
+            "subprocess": await measure(lambda: execute_in_subprocess(PROGRAM, None, limits), args.runs),
+            "pool": await measure(lambda: pool.run(PROGRAM, limits=limits._asdict()), args.runs)
+        }
+    finally:
+        await pool.close()
+
+    print(f"{'mode':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for mode, latencies in results.items():
+        print(
+            f"{mode:>10} {percentile(latencies, 0.5):>8.2f} "
+            f"{percentile(latencies, 0.95):>8.2f} {statistics.mean(latencies):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
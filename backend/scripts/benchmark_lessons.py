@@ -0,0 +1,99 @@
+"""
+Lesson Content Benchmark
+Load-tests lesson, quiz and mini-game serving against the stub LLM backend,
+so caching, request coalescing and throughput can be measured offline. The
+same random workload runs twice: cold (generation and coalescing) and warm
+(cache hits).
+
+Usage (from the backend directory):
+    python scripts/benchmark_lessons.py --requests 500 --concurrency 50 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_workload(service, workload, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(kind, topic):
+        async with semaphore:
+            start = time.perf_counter()
+            if kind == "lesson":
+                await service.get_lesson_content(topic)
+            elif kind == "quiz":
+                await service.get_quiz(topic)
+            else:
+                await service.get_mini_game(topic)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(kind, topic) for kind, topic in workload))
+    return latencies, time.perf_counter() - start
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=500)
+    arg_parser.add_argument("--concurrency", type=int, default=50)
+    arg_parser.add_argument("--topics", type=int, default=10, help="Distinct topics the requests are spread over")
+    arg_parser.add_argument("--latency", type=float, default=0.5, help="Median stub latency in seconds")
+    arg_parser.add_argument("--errors", default="", help='Stub error rates, e.g. "429:0.05,malformed:0.02"')
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    # Settings are read at import time, so configure the stub before importing the app
+    os.environ.update({
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_LATENCY_MEDIAN": str(args.latency),
+        "LLM_STUB_ERROR_RATES": args.errors,
+        "LLM_STUB_SEED": str(args.seed),
+        "CONTENT_CACHE_BACKEND": "memory",
+        "GEMINI_REQUESTS_PER_MINUTE": "0",
+        "GEMINI_TOKENS_PER_MINUTE": "0",
+        "GEMINI_RETRY_BASE_DELAY": "0.05"
+    })
+    from loguru import logger
+    from app.services.lesson_content import lesson_content, CONTENT_KINDS
+    from app.services.xml_parser import xml_parser
+
+    logger.remove()
+    xml_parser.load_all_courses()
+    topics = xml_parser.get_all_topics()[:args.topics]
+    rng = random.Random(args.seed)
+    workload = [(rng.choice(CONTENT_KINDS), rng.choice(topics)) for _ in range(args.requests)]
+
+    print(f"{args.requests} requests over {len(topics)} topics, concurrency {args.concurrency}")
+    print(f"{'pass':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for label in ("cold", "warm"):
+        latencies, elapsed = await run_workload(lesson_content, workload, args.concurrency)
+        print(
+            f"{label:>6} {len(latencies) / elapsed:>8.1f} {percentile(latencies, 0.5):>8.2f} "
+            f"{percentile(latencies, 0.95):>8.2f} {statistics.mean(latencies):>8.2f}"
+        )
+
+    stats = lesson_content.stats()
+    calls = lesson_content.generator.call_metrics()["by_kind"]
+    print(f"model calls: {sum(c['calls'] for c in calls.values())}, "
+          f"attempts: {sum(c['attempts'] for c in calls.values())}, "
+          f"failed: {sum(c['failures'] for c in calls.values())}")
+    print(f"coalesced: {stats['coalescing']['coalesced']}, originated: {stats['coalescing']['originated']}")
+    print(f"cache: {stats['cache']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
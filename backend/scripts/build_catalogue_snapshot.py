@@ -0,0 +1,36 @@
+"""
+Catalogue Snapshot Builder
+Parses every XML course file and writes the binary catalogue snapshot the
+server loads at startup (settings.CATALOGUE_SNAPSHOT_PATH)
+
+The server also refreshes the snapshot itself whenever a source file's hash
+changes; run this as a build/deploy step so the first start is already fast.
+
+Usage (from the backend directory):
+    python scripts/build_catalogue_snapshot.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.xml_parser import xml_parser  # noqa: E402
+
+
+def main():
+    if xml_parser.snapshot_path is None:
+        print("CATALOGUE_SNAPSHOT_PATH is empty, nothing to build")
+        return 1
+
+    # A full reload re-parses every file and rewrites the snapshot
+    xml_parser.reload_courses(full=True)
+    print(
+        f"Wrote {xml_parser.snapshot_path} "
+        f"({len(xml_parser.courses)} courses, {len(xml_parser.get_all_topics())} topics)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
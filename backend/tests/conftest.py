@@ -0,0 +1,14 @@
+"""
+Test configuration
+Makes the app package importable and gives the settings the values they
+require, so unit tests run without a .env file
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
@@ -0,0 +1,30 @@
+"""
+Tests for deciding which runs the execution cache may replay
+"""
+
+import pytest
+from app.services.execution_cache import is_deterministic
+
+
+@pytest.mark.parametrize("code", [
+    "print('hello')",
+    "numbers = [1, 2, 3]\nprint(sum(numbers))",
+    "squares = {n: n * n for n in range(3)}\nprint(squares)",
+    "print('unfinished'",
+])
+def test_deterministic_code_is_cached(code):
+    assert is_deterministic(code)
+
+
+@pytest.mark.parametrize("code", [
+    "import random\nprint(random.randint(1, 6))",
+    "import time\nprint(time.time())",
+    "print(set('hello'))",
+    "print(frozenset([1, 2]))",
+    "print(id(object()))",
+    "print({'apple', 'kiwi'})",
+    "words = ['a', 'b']\nprint({w for w in words})",
+    "for fruit in {'apple', 'kiwi', 'pear'}:\n    print(fruit)",
+])
+def test_nondeterministic_code_is_not_cached(code):
+    assert not is_deterministic(code)
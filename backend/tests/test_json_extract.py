@@ -0,0 +1,159 @@
+"""
+Tests for pulling JSON objects out of model responses
+"""
+
+import json
+import pytest
+from pydantic import ValidationError
+from app.services.ai_generator import AIContentGenerator
+from app.services.content_schemas import Quiz
+from app.services.json_extract import (
+    extract_json_object,
+    IncrementalJSONObjectParser,
+    json_object_candidates,
+    JSONExtractionError
+)
+from app.services.llm_backends import StubBackend
+
+
+QUESTION = {
+    "question": "What does len([1, 2]) return?",
+    "options": {"A": "2", "B": "1"},
+    "correct_answer": "A",
+    "explanation": "The list has two items."
+}
+# Cut off part-way through the second question's options
+TRUNCATED_QUIZ = json.dumps({"questions": [QUESTION, QUESTION]})[:-60]
+
+
+def test_plain_object():
+    assert extract_json_object('{"a": 1}') == ({"a": 1}, False)
+
+
+def test_markdown_fence_and_prose_are_ignored():
+    text = 'Here is the lesson:\n```json\n{"title": "Loops", "steps": [1, 2]}\n```\nEnjoy!'
+    assert extract_json_object(text) == ({"title": "Loops", "steps": [1, 2]}, False)
+
+
+def test_braces_and_fences_inside_strings():
+    text = '{"code": "def f():\\n    return {\\"k\\": [1]}", "note": "```python``` and }"}'
+    value, repaired = extract_json_object(text)
+    assert value == {"code": 'def f():\n    return {"k": [1]}', "note": "```python``` and }"}
+    assert not repaired
+
+
+def test_escaped_quote_before_brace_in_string():
+    value, _ = extract_json_object('{"text": "say \\"}\\" please", "n": 2}')
+    assert value == {"text": 'say "}" please', "n": 2}
+
+
+def test_balanced_braces_in_prose_before_object():
+    text = 'Use {braces} like this. {"a": 1}'
+    assert extract_json_object(text) == ({"a": 1}, False)
+
+
+def test_stray_unbalanced_brace_in_prose_before_object():
+    assert extract_json_object('Note: like { this.\n{"a": 1}') == ({"a": 1}, False)
+
+
+def test_truncated_inside_string_is_closed():
+    value, repaired = extract_json_object('{"a": 1, "b": "unfinished sent')
+    assert repaired
+    assert value == {"a": 1, "b": "unfinished sent"}
+
+
+def test_truncated_nested_structure_is_closed():
+    value, repaired = extract_json_object('{"a": [1, {"b": 2}, {"c": [3, 4')
+    assert repaired
+    assert value == {"a": [1, {"b": 2}, {"c": [3, 4]}]}
+
+
+def test_truncated_member_is_dropped():
+    value, repaired = extract_json_object('{"a": 1, "b": {"c": tr')
+    assert repaired
+    assert value == {"a": 1}
+
+
+def test_dangling_backslash_in_truncated_string():
+    value, repaired = extract_json_object('{"a": "line\\')
+    assert repaired
+    assert value == {"a": "line"}
+
+
+def test_candidates_drop_trailing_members_one_at_a_time():
+    candidates = list(json_object_candidates('{"a": 1, "b": 2, "c": [3, 4'))
+    assert candidates == [
+        ({"a": 1, "b": 2, "c": [3, 4]}, True),
+        ({"a": 1, "b": 2, "c": [3]}, True),
+        ({"a": 1, "b": 2}, True),
+        ({"a": 1}, True)
+    ]
+
+
+def test_quiz_truncated_mid_question_has_a_valid_shorter_candidate():
+    candidates = [data for data, _ in json_object_candidates(TRUNCATED_QUIZ)]
+    with pytest.raises(ValidationError):
+        Quiz.model_validate(candidates[0])
+    valid = [data for data in candidates if not _invalid_quiz(data)]
+    assert valid[0] == {"questions": [QUESTION]}
+
+
+def _invalid_quiz(data) -> bool:
+    try:
+        Quiz.model_validate(data)
+    except ValidationError:
+        return True
+    return False
+
+
+def test_parse_uses_first_candidate_that_matches_the_schema():
+    generator = AIContentGenerator(backend=StubBackend(latency_median=0))
+    quiz = generator._parse("quiz", TRUNCATED_QUIZ, Quiz)
+    assert quiz == {"questions": [QUESTION]}
+    assert generator.stats["quiz"]["repaired"] == 1
+
+
+def test_parse_reports_the_best_candidates_error():
+    generator = AIContentGenerator(backend=StubBackend(latency_median=0))
+    with pytest.raises(ValidationError) as error:
+        generator._parse("quiz", '{"questions": []}', Quiz)
+    assert "questions" in str(error.value)
+
+
+def test_non_object_json_is_rejected():
+    with pytest.raises(JSONExtractionError):
+        extract_json_object("[1, 2, 3]")
+
+
+def test_no_object_at_all():
+    with pytest.raises(JSONExtractionError):
+        extract_json_object("The model refused to answer.")
+
+
+def test_incremental_parser_yields_members_as_they_complete():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('```json\n{"explanation": "Loops rep') == []
+    assert parser.feed('eat", "breakdown": ["a", ') == [("explanation", "Loops repeat")]
+    assert parser.feed('"b, c"], "code": "x = {1: 2}"}\n```') == [
+        ("breakdown", ["a", "b, c"]),
+        ("code", "x = {1: 2}")
+    ]
+    assert parser.complete
+    assert parser.result == {"explanation": "Loops repeat", "breakdown": ["a", "b, c"], "code": "x = {1: 2}"}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_incremental_parser_skips_braces_in_prose(chunk_size):
+    text = 'Here is {your} lesson, with { a stray brace and {"not": json}:\n{"explanation": "x", "code": "y"}'
+    parser = IncrementalJSONObjectParser()
+    completed = []
+    for start in range(0, len(text), chunk_size):
+        completed += parser.feed(text[start:start + chunk_size])
+    assert completed == [("explanation", "x"), ("code", "y")]
+    assert parser.complete
+
+
+def test_incremental_parser_rejects_invalid_member():
+    parser = IncrementalJSONObjectParser()
+    with pytest.raises(ValueError):
+        parser.feed('{"a": 1, "b": nope, "c": 2}')
@@ -0,0 +1,158 @@
+"""
+Tests for the static pre-flight checks on Python submissions
+"""
+
+import textwrap
+import pytest
+from app.services.preflight import CodePreflight
+
+
+@pytest.fixture
+def preflight():
+    return CodePreflight(
+        forbidden_modules="subprocess,socket",
+        forbidden_builtins="__import__",
+        reject_endless_loops=True
+    )
+
+
+def check(preflight: CodePreflight, code: str):
+    return preflight.check(textwrap.dedent(code))
+
+
+def test_valid_code_passes(preflight):
+    assert check(preflight, "print('hello')") is None
+
+
+def test_syntax_error_is_reported_like_the_interpreter(preflight):
+    problem = check(preflight, "print('hi'")
+    assert problem is not None
+    assert "SyntaxError" in problem
+    assert "main.py" in problem
+
+
+def test_compile_only_errors_are_caught(preflight):
+    assert "SyntaxError" in check(preflight, "return 1")
+
+
+def test_forbidden_import(preflight):
+    assert "subprocess" in check(preflight, "import subprocess")
+    assert "socket" in check(preflight, "from socket import socket")
+
+
+def test_forbidden_builtin(preflight):
+    assert "__import__" in check(preflight, "__import__('os')")
+
+
+@pytest.mark.parametrize("code", [
+    """
+    import time
+    while True:
+        time.sleep(1)
+    """,
+    """
+    while True:
+        print("again")
+    """,
+    """
+    i = 0
+    while i < 10:
+        print(i)
+    """,
+    """
+    import itertools
+    for n in itertools.count():
+        print(n)
+    """,
+    """
+    while True:
+        for i in range(3):
+            break
+    """,
+    """
+    def spin():
+        while 1:
+            pass
+    """,
+])
+def test_endless_loops_are_rejected(preflight, code):
+    problem = check(preflight, code)
+    assert problem is not None
+    assert "never ends" in problem
+
+
+@pytest.mark.parametrize("code", [
+    """
+    i = 0
+    while i < 10:
+        i += 1
+    """,
+    """
+    items = [1, 2, 3]
+    while items:
+        items.pop()
+    """,
+    """
+    while True:
+        line = input()
+        print(line)
+    """,
+    """
+    while True:
+        if len("abc") > 2:
+            break
+    """,
+    """
+    def step():
+        global done
+        done = True
+
+    done = False
+    while not done:
+        step()
+    """,
+    """
+    count = 0
+    def tick():
+        raise SystemExit
+
+    while count < 3:
+        tick()
+    """,
+    """
+    import itertools
+    for n in itertools.repeat("x", 3):
+        print(n)
+    """,
+    """
+    while False:
+        print("never")
+    """,
+    """
+    def gen():
+        while True:
+            yield 1
+    """,
+])
+def test_finite_or_unknowable_loops_run(preflight, code):
+    assert check(preflight, code) is None
+
+
+def test_endless_loop_check_can_be_disabled():
+    preflight = CodePreflight(forbidden_modules="", forbidden_builtins="", reject_endless_loops=False)
+    assert preflight.check("while True:\n    pass\n") is None
+
+
+def test_streaming_sessions_allow_endless_loops(preflight):
+    code = "import time\nwhile True:\n    print('tick')\n    time.sleep(1)\n"
+    assert "never ends" in preflight.check(code)
+    assert preflight.check(code, endless_loops=False) is None
+    assert "subprocess" in preflight.check("import subprocess\nwhile True:\n    pass\n", endless_loops=False)
+
+
+def test_stats_count_each_outcome(preflight):
+    check(preflight, "print(1)")
+    check(preflight, "print(")
+    check(preflight, "import socket")
+    check(preflight, "while True:\n    pass")
+    assert preflight.stats == {"checked": 4, "syntax_errors": 1, "forbidden": 1, "endless_loops": 1}
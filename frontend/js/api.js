@@ -41,6 +41,36 @@ class APIService {
         return this.request(CONFIG.API_ENDPOINTS.lesson(lessonId) + params);
     }
 
+    // Stream lesson sections over server-sent events
+    // handlers: { onInfo(lessonInfo), onSection(name, value), onDone(meta), onError(error) }
+    // Returns the EventSource so the caller can close it early
+    streamLesson(lessonId, handlers, regenerate = false) {
+        const params = regenerate ? '?regenerate=true' : '';
+        const source = new EventSource(`${this.baseURL}${CONFIG.API_ENDPOINTS.lessonStream(lessonId)}${params}`);
+
+        source.addEventListener('lesson_info', (event) => {
+            handlers.onInfo && handlers.onInfo(JSON.parse(event.data));
+        });
+
+        source.addEventListener('section', (event) => {
+            const { name, value } = JSON.parse(event.data);
+            handlers.onSection && handlers.onSection(name, value);
+        });
+
+        source.addEventListener('done', (event) => {
+            source.close();
+            handlers.onDone && handlers.onDone(JSON.parse(event.data));
+        });
+
+        source.onerror = (error) => {
+            source.close();
+            console.error('Lesson stream failed:', error);
+            handlers.onError && handlers.onError(error);
+        };
+
+        return source;
+    }
+
     async getQuiz(lessonId, numQuestions = 5) {
         return this.request(`${CONFIG.API_ENDPOINTS.quiz(lessonId)}?num_questions=${numQuestions}`);
     }
@@ -56,6 +86,55 @@ class APIService {
         });
     }
 
+    streamCode(code, language, handlers, stdin = null) {
+        const base = this.baseURL || window.location.origin;
+        const url = new URL(CONFIG.API_ENDPOINTS.codeStream, base);
+        url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(url);
+        let finished = false;
+
+        const send = (message) => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify(message));
+            }
+        };
+
+        socket.onopen = () => send({ type: 'run', code, language, stdin });
+
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === 'started') {
+                handlers.onStarted && handlers.onStarted(message);
+            } else if (message.type === 'stdout' || message.type === 'stderr') {
+                handlers.onOutput && handlers.onOutput(message.type, message.data);
+            } else if (message.type === 'exit') {
+                finished = true;
+                handlers.onExit && handlers.onExit(message);
+            } else if (message.type === 'error') {
+                finished = true;
+                handlers.onError && handlers.onError(new Error(message.message));
+            }
+        };
+
+        socket.onclose = () => {
+            if (!finished) {
+                finished = true;
+                handlers.onError && handlers.onError(new Error('Connection to the code runner was lost'));
+            }
+        };
+
+        return {
+            sendInput: (data) => send({ type: 'stdin', data }),
+            closeInput: () => send({ type: 'stdin_eof' }),
+            cancel: () => send({ type: 'cancel' }),
+            // Closing on purpose (e.g. starting another run) is not a lost connection
+            close: () => {
+                finished = true;
+                socket.close();
+            }
+        };
+    }
+
     async getUserProgress() {
         return this.request(CONFIG.API_ENDPOINTS.userProgress);
     }
@@ -2,6 +2,7 @@
 
 let currentLesson = null;
 let currentCourse = null;
+let lessonStream = null;
 
 // Initialize application
 document.addEventListener('DOMContentLoaded', async () => {
@@ -107,12 +108,51 @@ function displayModules(courseData) {
     });
 }
 
-// Load a specific lesson
-async function loadLesson(lessonId) {
-    try {
-        // Show loading
-        document.getElementById('lessonContent').innerHTML = '<div class="loading">Generating lesson content with AI...</div>';
+// Load a specific lesson, rendering sections as they stream in
+function loadLesson(lessonId) {
+    if (lessonStream) {
+        lessonStream.close();
+    }
+
+    // Show loading
+    document.getElementById('lessonContent').innerHTML = '<div class="loading">Generating lesson content with AI...</div>';
+    switchTab('learn');
+
+    if (!window.EventSource) {
+        loadLessonWhole(lessonId);
+        return;
+    }
+
+    let receivedSection = false;
+
+    lessonStream = api.streamLesson(lessonId, {
+        onInfo: (lessonInfo) => {
+            currentLesson = { lesson_info: lessonInfo, content: {} };
+            displayLessonHeader(lessonInfo);
+            prepareLessonSections();
+        },
+        onSection: (name, value) => {
+            receivedSection = true;
+            currentLesson.content[name] = value;
+            renderLessonSection(name, value);
+        },
+        onDone: () => {
+            lessonStream = null;
+            document.querySelectorAll('#lessonContent .section-pending').forEach(section => section.remove());
+        },
+        onError: () => {
+            lessonStream = null;
+            // Nothing arrived yet: fall back to the regular endpoint
+            if (!receivedSection) {
+                loadLessonWhole(lessonId);
+            }
+        }
+    });
+}
 
+// Load a lesson in one request (used when streaming is unavailable)
+async function loadLessonWhole(lessonId) {
+    try {
         const lessonData = await api.getLesson(lessonId);
         currentLesson = lessonData;
 
@@ -129,58 +169,71 @@ async function loadLesson(lessonId) {
 function displayLesson(lessonData) {
     const { lesson_info, content } = lessonData;
 
-    // Update header
+    displayLessonHeader(lesson_info);
+    prepareLessonSections();
+
+    Object.entries(content).forEach(([name, value]) => renderLessonSection(name, value));
+}
+
+// Update lesson header
+function displayLessonHeader(lesson_info) {
     document.getElementById('lessonTitle').textContent = lesson_info.title;
     document.getElementById('difficultyBadge').textContent = lesson_info.difficulty;
     document.getElementById('difficultyBadge').className = `difficulty-badge ${lesson_info.difficulty.toLowerCase()}`;
     document.getElementById('keywords').textContent = lesson_info.keywords.join(', ');
+}
 
-    // Build lesson content HTML
-    let contentHTML = `
-        <section>
-            <h2>📖 What You'll Learn</h2>
-            <p>${content.explanation}</p>
-        </section>
-
-        <section>
-            <h2>🌍 Real-World Analogy</h2>
-            <div class="feature-card">
-                <p>${content.analogy}</p>
-            </div>
-        </section>
-
-        <section>
-            <h2>💡 Why It Matters</h2>
-            <p>${content.why_it_matters}</p>
-        </section>
-
-        <section>
-            <h2>💻 Code Example</h2>
-            <pre><code>${escapeHtml(content.code_example)}</code></pre>
-        </section>
-
-        <section>
-            <h2>🔍 Step-by-Step Breakdown</h2>
-            <ol>
-                ${content.breakdown.map(step => `<li>${step}</li>`).join('')}
-            </ol>
-        </section>
-
-        <section>
-            <h2>⚠️ Common Mistakes</h2>
-            <ul>
-                ${content.common_mistakes.map(mistake => `<li>${mistake}</li>`).join('')}
-            </ul>
+// Lesson sections in display order, with their headings
+const LESSON_SECTIONS = [
+    ['explanation', "📖 What You'll Learn"],
+    ['analogy', '🌍 Real-World Analogy'],
+    ['why_it_matters', '💡 Why It Matters'],
+    ['code_example', '💻 Code Example'],
+    ['breakdown', '🔍 Step-by-Step Breakdown'],
+    ['common_mistakes', '⚠️ Common Mistakes']
+];
+
+// Create an empty placeholder for every section so they appear in order
+function prepareLessonSections() {
+    document.getElementById('lessonContent').innerHTML = LESSON_SECTIONS.map(([name, heading]) => `
+        <section id="section-${name}" class="section-pending">
+            <h2>${heading}</h2>
+            <div class="loading">Generating...</div>
         </section>
-    `;
+    `).join('');
+}
 
-    document.getElementById('lessonContent').innerHTML = contentHTML;
+// Fill in one lesson section
+function renderLessonSection(name, value) {
+    if (name === 'practice_challenge') {
+        document.getElementById('challengeDescription').textContent = value.description;
+        setEditorCode(value.starter_code || CONFIG.CODE_TEMPLATES.python);
+        return;
+    }
 
-    // Update practice challenge
-    if (content.practice_challenge) {
-        document.getElementById('challengeDescription').textContent = content.practice_challenge.description;
-        setEditorCode(content.practice_challenge.starter_code || CONFIG.CODE_TEMPLATES.python);
+    const section = document.getElementById(`section-${name}`);
+    if (!section) return;
+
+    let body;
+    switch (name) {
+        case 'analogy':
+            body = `<div class="feature-card"><p>${value}</p></div>`;
+            break;
+        case 'code_example':
+            body = `<pre><code>${escapeHtml(value)}</code></pre>`;
+            break;
+        case 'breakdown':
+            body = `<ol>${value.map(step => `<li>${step}</li>`).join('')}</ol>`;
+            break;
+        case 'common_mistakes':
+            body = `<ul>${value.map(mistake => `<li>${mistake}</li>`).join('')}</ul>`;
+            break;
+        default:
+            body = `<p>${value}</p>`;
     }
+
+    section.innerHTML = `${section.querySelector('h2').outerHTML}${body}`;
+    section.classList.remove('section-pending');
 }
 
 // Load quiz for current lesson
@@ -302,6 +355,12 @@ async function executeCode() {
     const language = document.getElementById('languageSelect').value;
     const outputElement = document.getElementById('codeOutput');
 
+    // Python runs stream over a WebSocket so programs can read input
+    if (language === 'python' && 'WebSocket' in window) {
+        runCodeInteractive(code, language);
+        return;
+    }
+
     outputElement.textContent = '⏳ Running code...';
 
     try {
@@ -311,7 +370,10 @@ async function executeCode() {
             outputElement.textContent = `❌ Error:\n${result.error}\n\n${result.output || ''}`;
             outputElement.style.color = '#ef4444';
         } else {
-            outputElement.textContent = `✅ Success (${result.execution_time.toFixed(2)}s):\n\n${result.output}`;
+            const timing = result.compile_time != null
+                ? `compiled in ${result.compile_time.toFixed(2)}s${result.compile_cached ? ' (cached)' : ''}, ran in ${result.run_time.toFixed(2)}s`
+                : `${result.execution_time.toFixed(2)}s`;
+            outputElement.textContent = `✅ Success (${timing}):\n\n${result.output}`;
             outputElement.style.color = '#10b981';
         }
     } catch (error) {
@@ -356,6 +418,8 @@ function setupEventListeners() {
 
     // Run code button
     document.getElementById('runCode').addEventListener('click', executeCode);
+    document.getElementById('stopCode').addEventListener('click', stopInteractiveRun);
+    document.getElementById('stdinForm').addEventListener('submit', sendInteractiveInput);
 
     // Mark complete button
     document.getElementById('markComplete').addEventListener('click', () => {
@@ -6,9 +6,11 @@ const CONFIG = {
         courses: '/api/lessons/courses',
         courseModules: (courseId) => `/api/lessons/courses/${courseId}/modules`,
         lesson: (lessonId) => `/api/lessons/${lessonId}`,
+        lessonStream: (lessonId) => `/api/lessons/${lessonId}/stream`,
         quiz: (lessonId) => `/api/lessons/${lessonId}/quiz`,
         game: (lessonId) => `/api/lessons/${lessonId}/game`,
         executeCode: '/api/code/execute',
+        codeStream: '/api/code/stream',
         userProgress: '/api/progress'
     },
     DEFAULT_LANGUAGE: 'python',
@@ -19,6 +21,7 @@ const CONFIG = {
     CODE_TEMPLATES: {
         python: '# Write your Python code here\nprint("Hello, World!")\n',
         javascript: '// Write your JavaScript code here\nconsole.log("Hello, World!");\n',
-        java: 'public class Main {\n    public static void main(String[] args) {\n        System.out.println("Hello, World!");\n    }\n}\n'
+        java: 'public class Main {\n    public static void main(String[] args) {\n        System.out.println("Hello, World!");\n    }\n}\n',
+        cpp: '#include <iostream>\n\nint main() {\n    std::cout << "Hello, World!" << std::endl;\n    return 0;\n}\n'
     }
 };
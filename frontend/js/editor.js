@@ -48,3 +48,103 @@ function setEditorCode(code) {
         monacoEditor.setValue(code);
     }
 }
+
+// Interactive runs: output streams into the output panel while the program runs
+
+let activeRun = null;
+
+function runCodeInteractive(code, language) {
+    const outputElement = document.getElementById('codeOutput');
+    const stdinForm = document.getElementById('stdinForm');
+    const stdinInput = document.getElementById('stdinInput');
+    const stopButton = document.getElementById('stopCode');
+
+    if (activeRun) {
+        activeRun.close();
+        activeRun = null;
+    }
+
+    outputElement.textContent = '⏳ Waiting for a free runner...';
+    outputElement.style.color = '';
+    let started = false;
+
+    const appendOutput = (stream, text) => {
+        if (!started) {
+            outputElement.textContent = '';
+            started = true;
+        }
+        if (stream === 'stderr') {
+            const span = document.createElement('span');
+            span.className = 'stderr';
+            span.textContent = text;
+            outputElement.appendChild(span);
+        } else {
+            outputElement.appendChild(document.createTextNode(text));
+        }
+        outputElement.scrollTop = outputElement.scrollHeight;
+    };
+
+    const finish = (status, color) => {
+        // A replaced run must not touch the output or controls of the new one
+        if (activeRun !== run) return;
+        if (!started) {
+            outputElement.textContent = '';
+        }
+        const span = document.createElement('span');
+        span.textContent = status;
+        span.style.color = color;
+        outputElement.appendChild(span);
+        stdinForm.hidden = true;
+        stopButton.hidden = true;
+        activeRun = null;
+    };
+
+    const run = api.streamCode(code, language, {
+        onStarted: () => {
+            outputElement.textContent = '';
+            started = true;
+            stdinForm.hidden = false;
+            stopButton.hidden = false;
+            stdinInput.value = '';
+            stdinInput.focus();
+        },
+        onOutput: appendOutput,
+        onExit: (result) => {
+            run.close();
+            if (result.error) {
+                finish(`\n\n❌ ${result.error}`, '#ef4444');
+            } else if (result.exit_code !== 0) {
+                finish(`\n\n❌ Exited with code ${result.exit_code}`, '#ef4444');
+            } else {
+                finish(`\n\n✅ Finished (${result.execution_time.toFixed(2)}s)`, '#10b981');
+            }
+        },
+        onError: (error) => {
+            finish(`\n\n❌ Error:\n${error.message}`, '#ef4444');
+        }
+    });
+
+    activeRun = run;
+}
+
+function sendInteractiveInput(event) {
+    event.preventDefault();
+    const stdinInput = document.getElementById('stdinInput');
+    if (!activeRun) return;
+
+    const line = stdinInput.value + '\n';
+    // Echo the line the way a terminal would
+    const echo = document.createElement('span');
+    echo.className = 'stdin-echo';
+    echo.textContent = line;
+    document.getElementById('codeOutput').appendChild(echo);
+
+    activeRun.sendInput(line);
+    stdinInput.value = '';
+}
+
+function stopInteractiveRun() {
+    if (activeRun) {
+        activeRun.cancel();
+    }
+}